@@ -20,12 +20,14 @@
     ],
     'depends': [
         'auth_signup',
+        'mail',
         'portal',
         'website',
     ],
     'data': [
         'security/ir.model.access.csv',
         'data/email_templates.xml',
+        'data/ir_cron.xml',
         'views/signup_templates.xml',
         'views/res_config_settings_views.xml',
     ],
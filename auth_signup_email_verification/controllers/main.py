@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
 import logging
 import json
+import re
 import werkzeug
 from werkzeug.urls import url_encode
 
-from odoo import http, _
+from odoo import http, tools, _
 from odoo.addons.auth_signup.models.res_users import SignupError
 from odoo.addons.auth_signup.controllers.main import AuthSignupHome
 from odoo.exceptions import UserError
@@ -14,10 +16,69 @@ from markupsafe import Markup
 
 _logger = logging.getLogger(__name__)
 
+# Options of many2one signup fields returned per /signup/get_field_options call
+SIGNUP_OPTIONS_PAGE_SIZE = 20
+SIGNUP_OPTIONS_MAX_PAGE_SIZE = 80
+# Seconds during which browsers may reuse an options page
+SIGNUP_OPTIONS_MAX_AGE = 300
+
+# Admission limits of the public signup routes, checked before any ORM work:
+# {scope: {'ip' or 'email': (tokens per second, bucket size)}}
+SIGNUP_ADMISSION_LIMITS = {
+    'signup': {'ip': (20 / 3600.0, 10), 'email': (5 / 3600.0, 3)},
+    'verify': {'ip': (30 / 3600.0, 10)},
+    'resend': {'ip': (20 / 3600.0, 10), 'email': (3 / 3600.0, 3)},
+}
+# Seconds clients are asked to wait when they are rate limited
+SIGNUP_RETRY_AFTER = 60
+# Verification tokens and Odoo signup tokens are URL-safe base64 strings
+SIGNUP_TOKEN_RE = re.compile(r'^[A-Za-z0-9_.=-]{20,512}$')
+
 
 class AuthSignupEmailVerification(AuthSignupHome):
     """Enhanced signup controller with email verification using Odoo's official signup system"""
 
+    def _signup_admission(self, scope, email=None, charge=True):
+        """Front-door admission on the per-IP and per-email token buckets of scope
+
+        Args:
+            charge: take a token from each bucket, otherwise only check that
+                    the buckets are not empty
+
+        Returns:
+            bool: False if the client is over one of the limits
+        """
+        limits = SIGNUP_ADMISSION_LIMITS[scope]
+        buckets = [('%s:ip:%s' % (scope, request.httprequest.remote_addr),) + limits['ip']]
+        if email and 'email' in limits:
+            buckets.append(('%s:email:%s' % (scope, email.strip().lower()),) + limits['email'])
+        throttle = request.env['auth.signup.throttle'].sudo()
+        return throttle._consume_all(buckets) if charge else throttle._check_all(buckets)
+
+    def _signup_email_rejection(self, email):
+        """Cheap pre-checks of a signup email: syntax, then the email validation
+        state if kw_email_validation is installed
+
+        Returns:
+            str: error message, or None if the email is acceptable
+        """
+        normalized = tools.email_normalize(email or '')
+        if not normalized:
+            return _("Please enter a valid email address.")
+        if 'kw.email.validation' in request.env and request.env['kw.email.validation'].sudo().search_count([
+            ('name', '=', normalized), ('state', '=', 'invalid'),
+        ], limit=1):
+            return _("This email address cannot receive emails, please use another one.")
+        return None
+
+    def _render_too_many_requests(self):
+        """Plain 429 answer, no template rendering for rejected floods"""
+        return request.make_response(
+            _('Too many requests, please try again later.'),
+            headers=[('Content-Type', 'text/plain; charset=utf-8'), ('Retry-After', str(SIGNUP_RETRY_AFTER))],
+            status=429,
+        )
+
     def get_auth_signup_qcontext(self):
         """Enhanced qcontext with company toggle setting and custom fields"""
         # Get standard context from parent
@@ -111,22 +172,42 @@ class AuthSignupEmailVerification(AuthSignupHome):
             _logger.info("Request params keys: %s", list(request.params.keys()))
             
             # Add dynamic field values from request params
+            qcontext['dynamic_field_labels'] = {}
             for field_info in selected_fields:
                 field_name = field_info.get('name')
                 if field_name in request.params:
                     qcontext[field_name] = request.params[field_name]
                     _logger.info("Added %s to qcontext: %s", field_name, request.params[field_name])
+                    # Options are loaded lazily: keep the label of the submitted option
+                    if field_info.get('lazy_options') and str(request.params[field_name]).isdigit():
+                        option = request.env[field_info['relation_model']].sudo().browse(
+                            int(request.params[field_name])).exists()
+                        if option:
+                            qcontext['dynamic_field_labels'][field_name] = option.display_name
                 else:
                     _logger.info("Field %s NOT found in request params", field_name)
         else:
             qcontext['dynamic_company_fields'] = []
+            qcontext['dynamic_field_labels'] = {}
         
         return qcontext
 
     @http.route('/web/signup', type='http', auth='public', website=True, sitemap=False)
     def web_auth_signup(self, *args, **kw):
         """Override default signup to add email verification step"""
+        # Admission before building the qcontext: floods are rejected without ORM work.
+        # Tokens are only taken for real attempts, see below
+        email_error = None
+        if request.httprequest.method == 'POST':
+            email = request.params.get('login')
+            if not self._signup_admission('signup', email, charge=False):
+                return self._render_too_many_requests()
+            if not request.params.get('token'):
+                email_error = self._signup_email_rejection(email)
+        
         qcontext = self.get_auth_signup_qcontext()
+        if email_error:
+            qcontext['error'] = email_error
 
         if not qcontext.get('token') and not qcontext.get('signup_enabled'):
             raise werkzeug.exceptions.NotFound()
@@ -183,6 +264,10 @@ class AuthSignupEmailVerification(AuthSignupHome):
                 if password != qcontext.get('confirm_password'):
                     raise UserError(_("Passwords do not match; please retype them."))
 
+                # The form is complete: this is a real attempt, charge the buckets
+                if not self._signup_admission('signup', email):
+                    raise UserError(_("Too many signup attempts, please try again later."))
+
                 # Check if user already exists
                 existing_user = request.env['res.users'].sudo().search([
                     ('login', '=', email)
@@ -394,8 +479,10 @@ class AuthSignupEmailVerification(AuthSignupHome):
     @http.route('/auth/verify/email', type='http', auth='public', website=True, sitemap=False)
     def verify_email(self, token=None, **kw):
         """Verify email address using Odoo's official signup token"""
-        if not token:
-            _logger.warning("Email verification attempted without token")
+        if not self._signup_admission('verify'):
+            return self._render_too_many_requests()
+        if not token or not SIGNUP_TOKEN_RE.match(token):
+            _logger.warning("Email verification attempted without a valid token")
             return self._render_verification_error(_('Invalid verification link.'))
         
         try:
@@ -493,10 +580,20 @@ class AuthSignupEmailVerification(AuthSignupHome):
 
     @http.route('/auth/resend/verification', type='http', auth='public', website=True, sitemap=False)
     def resend_verification(self, email=None, **kw):
-        """Resend verification email"""
+        """Resend verification email
+
+        Resends are throttled per email and per IP: over the limit the pending
+        page is answered again without searching the partner nor sending mail.
+        """
         if not email:
             return request.redirect('/web/signup')
         
+        email = email.strip()
+        if not tools.email_normalize(email):
+            return request.redirect('/web/signup')
+        if not self._signup_admission('resend', email):
+            return self._render_verification_pending(email)
+        
         try:
             # Find partner with pending verification
             partner = request.env['res.partner'].sudo().search([
@@ -510,7 +607,7 @@ class AuthSignupEmailVerification(AuthSignupHome):
                     _('No pending verification found for this email.')
                 )
             
-            # Resend verification email
+            # Resend verification email, the link of the previous email stops working
             partner._send_verification_email()
             
             return self._render_verification_pending(email)
@@ -537,77 +634,67 @@ class AuthSignupEmailVerification(AuthSignupHome):
             _logger.error("Error fetching model fields for %s: %s", model_name, str(e))
             return []
 
-    @http.route('/signup/get_field_options', type='json', auth='public', methods=['POST'], website=True, csrf=False)
-    def get_field_options(self, field_name, model_name, parent_field=None, parent_value=None, **kw):
-        """Get options for a dependent field (e.g., states for a selected country)"""
+    @http.route('/signup/get_field_options', type='http', auth='public', methods=['GET'], website=True, sitemap=False)
+    def get_field_options(self, field_name=None, model_name=None, term='', offset=0, limit=SIGNUP_OPTIONS_PAGE_SIZE,
+                          parent_field=None, parent_value=None, **kw):
+        """Search one page of options of a many2one or many2many signup field (type-ahead)
+
+        Only the fields configured for the signup form can be searched. The
+        response is ``{'options': [{'id', 'name'}], 'has_more': bool}`` with
+        cache headers and an ETag, so repeated searches are answered by the
+        browser or with a 304.
+        """
+        field_info = next((
+            info for info in request.env['res.config.settings'].get_selected_company_fields()
+            if info.get('name') == field_name and info.get('source_model') == model_name
+            and info.get('lazy_options')
+        ), None)
+        if not field_info:
+            return request.make_json_response({'error': 'Invalid field or not a relational field'}, status=400)
+        
         try:
-            # Get the model and field info
-            model = request.env[model_name].sudo()
-            field_obj = model._fields.get(field_name)
-            
-            if not field_obj or field_obj.type != 'many2one':
-                return {'error': 'Invalid field or not a many2one field'}
-            
-            relation_model_name = field_obj.comodel_name
-            relation_model = request.env[relation_model_name].sudo()
-            
-            # Build domain based on parent field selection
-            domain = []
-            
-            # Add active filter if available
-            if 'active' in relation_model._fields:
-                domain.append(('active', '=', True))
-            
-            # Add parent field filter if provided
-            if parent_field and parent_value:
-                try:
-                    parent_value_int = int(parent_value)  # Convert to integer for many2one
-                    domain.append((parent_field, '=', parent_value_int))
-                except ValueError:
-                    # If conversion fails, use string value
-                    domain.append((parent_field, '=', parent_value))
-            
-            # Get the best ordering field
-            order_field = 'id'  # Safe fallback
-            for potential_field in ['name', 'title', 'code', 'sequence']:
-                if potential_field in relation_model._fields:
-                    field_def = relation_model._fields[potential_field]
-                    if getattr(field_def, 'store', True) and not getattr(field_def, 'compute', None):
-                        order_field = potential_field
-                        break
-            
-            # Search records
-            try:
-                records = relation_model.search(domain, order=f'{order_field} asc')
-            except Exception:
-                records = relation_model.search(domain)
-            
-            # Build options list
-            options = []
-            for record in records:
-                display_value = str(record.id)  # Safe fallback
-                
-                # Try different display options
-                for display_attr in ['display_name', 'name', 'title', 'code']:
-                    try:
-                        if hasattr(record, display_attr):
-                            value = getattr(record, display_attr, None)
-                            if value:
-                                display_value = str(value)
-                                break
-                    except Exception:
-                        continue
-                
-                options.append({
-                    'id': record.id,
-                    'name': display_value
-                })
-            
-            return {
-                'options': options,
-                'field_name': field_name
-            }
-            
-        except Exception as e:
-            _logger.error(f"Error getting field options: {e}")
-            return {'error': str(e)} 
\ No newline at end of file
+            offset = max(int(offset), 0)
+            limit = min(max(int(limit), 1), SIGNUP_OPTIONS_MAX_PAGE_SIZE)
+        except (TypeError, ValueError):
+            return request.make_json_response({'error': 'Invalid offset or limit'}, status=400)
+        
+        relation_model = request.env[field_info['relation_model']].sudo()
+        
+        # Build domain based on the search term and the parent field selection
+        domain = []
+        if 'active' in relation_model._fields:
+            domain.append(('active', '=', True))
+        if term:
+            domain.append(('display_name', 'ilike', term))
+        if parent_field and parent_value:
+            parent = relation_model._fields.get(parent_field)
+            if not parent or parent.type != 'many2one' or not str(parent_value).isdigit():
+                return request.make_json_response({'error': 'Invalid parent field'}, status=400)
+            domain.append((parent_field, '=', int(parent_value)))
+        
+        # The ETag is built from the request and a cheap version stamp of the
+        # options (count and last write), so a 304 is answered without searching
+        aggregates = ['__count']
+        if 'write_date' in relation_model._fields:
+            aggregates.append('write_date:max')
+        version = relation_model._read_group([], aggregates=aggregates)[0]
+        etag = hashlib.sha1(json.dumps([
+            field_name, model_name, term, offset, limit, parent_field, parent_value,
+            request.env.lang, [str(value) for value in version],
+        ]).encode()).hexdigest()
+        headers = [
+            ('Cache-Control', 'public, max-age=%s' % SIGNUP_OPTIONS_MAX_AGE),
+            ('ETag', '"%s"' % etag),
+            ('Vary', 'Accept-Language, Cookie'),
+        ]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+        
+        # Read one extra record to know if there is a next page
+        records = relation_model.search_read(domain, ['display_name'], offset=offset, limit=limit + 1)
+        body = json.dumps({
+            'options': [{'id': record['id'], 'name': record['display_name']} for record in records[:limit]],
+            'has_more': len(records) > limit,
+            'field_name': field_name,
+        })
+        return request.make_response(body, headers=headers + [('Content-Type', 'application/json')])
@@ -3,4 +3,5 @@
 from . import res_partner
 from . import res_users
 from . import res_config_settings
-from . import signup_field_selector
\ No newline at end of file
+from . import signup_field_selector
+from . import signup_throttle
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
-from odoo import fields, models, api, _
+from odoo import fields, models, api, tools, _
+import copy
 import json
 
 
@@ -498,12 +499,31 @@ class ResConfigSettings(models.TransientModel):
     
     @api.model
     def get_selected_company_fields(self):
-        """Get selected fields for company signup - format expected by controller with preserved ordering"""
+        """Get selected fields for company signup - format expected by controller with preserved ordering
+
+        The schema is compiled once per configuration value, language and
+        registry sequence, so signup renders do not search the database.
+        """
+        all_configs = self.env['ir.config_parameter'].sudo().get_param(
+            'auth_signup_email_verification.all_field_configurations', '{}'
+        )
+        schema = self._get_signup_field_schema(
+            all_configs, self.env.lang or 'en_US', self.env.registry.registry_sequence
+        )
+        # Deep copy: field infos hold nested lists (selection values) that
+        # callers must not alter in the cache
+        return copy.deepcopy(list(schema))
+
+    @api.model
+    @tools.ormcache('all_configs', 'lang', 'registry_sequence')
+    def _get_signup_field_schema(self, all_configs, lang, registry_sequence):
+        """Compile the signup field schema, cached - see get_selected_company_fields"""
+        return tuple(self.sudo().with_context(lang=lang)._compile_signup_field_schema(all_configs))
+
+    @api.model
+    def _compile_signup_field_schema(self, all_configs):
+        """Build the list of field infos of the configured signup fields"""
         try:
-            all_configs = self.env['ir.config_parameter'].sudo().get_param(
-                'auth_signup_email_verification.all_field_configurations', '{}'
-            )
-            
             config = json.loads(all_configs) if all_configs else {}
             
             # Convert to format expected by controller - list of field info objects
@@ -580,53 +600,9 @@ class ResConfigSettings(models.TransientModel):
                             field_info['relation_model'] = relation_model_name
                             
                             try:
-                                relation_model = self.env[relation_model_name].sudo()  # Use sudo for access
-                                
-                                # Get the best field for ordering (must be stored in database)
-                                order_field = 'id'  # Safe fallback - always exists and stored
-                                
-                                # Try to find a better ordering field (stored only)
-                                for potential_field in ['name', 'title', 'code', 'sequence']:
-                                    if potential_field in relation_model._fields:
-                                        field_def = relation_model._fields[potential_field]
-                                        # Only use if field is stored (not computed or function field)
-                                        if getattr(field_def, 'store', True) and not getattr(field_def, 'compute', None):
-                                            order_field = potential_field
-                                            break
-                                
-                                # Build search domain - handle active field if it exists
-                                domain = []
-                                if 'active' in relation_model._fields:
-                                    domain.append(('active', '=', True))
-                                
-                                # Search with safe ordering - NO LIMIT for complete list
-                                try:
-                                    records = relation_model.search(domain, order=f'{order_field} asc')
-                                except Exception:
-                                    # If ordering fails, search without order
-                                    records = relation_model.search(domain)
-                                
-                                # Build relation options (consistent format)
-                                relation_options = []
-                                for record in records:
-                                    # Get the best display value
-                                    display_value = str(record.id)  # Safe fallback
-                                    
-                                    # Try different display options in order of preference
-                                    for display_attr in ['display_name', 'name', 'title', 'code']:
-                                        try:
-                                            if hasattr(record, display_attr):
-                                                value = getattr(record, display_attr, None)
-                                                if value:
-                                                    display_value = str(value)
-                                                    break
-                                        except Exception:
-                                            continue
-                                    
-                                    # Use tuple format for many2one (backwards compatibility)
-                                    relation_options.append((record.id, display_value))
-                                
-                                field_info['relation_options'] = relation_options
+                                # Options are not embedded in the page: the signup form
+                                # searches them page by page through /signup/get_field_options
+                                field_info['lazy_options'] = True
                                 
                                 # Detect common field dependencies
                                 dependency_map = {
@@ -655,87 +631,28 @@ class ResConfigSettings(models.TransientModel):
                                         field_info['depends_field'] = 'country_id'
                                 
                             except Exception:
-                                # If we can't load options, still include the field but without options
-                                field_info['relation_options'] = []
+                                # If we can't detect dependencies, still include the field
+                                pass
                         except Exception:
                             # Skip field only if we can't even get the relation model name
                             continue
                     
-                    # Add relation options for many2many fields (like Tags)
+                    # Add relation information for many2many fields (like Tags)
                     elif field_type == 'many2many' and hasattr(field, 'comodel_name'):
                         try:
-                            relation_model_name = field.comodel_name
-                            field_info['relation_model'] = relation_model_name
+                            field_info['relation_model'] = field.comodel_name
                             field_info['relation_type'] = field_type
+                            # Options are not embedded in the page (the schema is cached and
+                            # records change): the signup form searches them page by page
+                            # through /signup/get_field_options, as for many2one fields
+                            field_info['lazy_options'] = True
                             
-                            try:
-                                relation_model = self.env[relation_model_name].sudo()  # Use sudo for access
-                                
-                                # Get the best field for ordering (must be stored in database)
-                                order_field = 'id'  # Safe fallback - always exists and stored
-                                
-                                # Try to find a better ordering field (stored only)
-                                for potential_field in ['name', 'title', 'code', 'sequence']:
-                                    if potential_field in relation_model._fields:
-                                        field_def = relation_model._fields[potential_field]
-                                        # Only use if field is stored (not computed or function field)
-                                        if getattr(field_def, 'store', True) and not getattr(field_def, 'compute', None):
-                                            order_field = potential_field
-                                            break
-                                
-                                # Build search domain - handle active field if it exists
-                                domain = []
-                                if 'active' in relation_model._fields:
-                                    domain.append(('active', '=', True))
-                                
-                                # Search with safe ordering - NO LIMIT for complete list
-                                try:
-                                    records = relation_model.search(domain, order=f'{order_field} asc')
-                                except Exception:
-                                    # If ordering fails, search without order
-                                    records = relation_model.search(domain)
-                                
-                                # Build relation options for many2many with color support
-                                relation_options = []
-                                for record in records:
-                                    # Use display_name for display if available, otherwise use name_field
-                                    if hasattr(record, 'display_name'):
-                                        display_value = record.display_name
-                                    else:
-                                        display_value = getattr(record, order_field, str(record.id))
-                                    
-                                    # Include color information if available
-                                    option_data = {
-                                        'id': record.id,
-                                        'name': display_value,
-                                    }
-                                    
-                                    # Check for color field (common in Odoo models)
-                                    if hasattr(record, 'color') and record.color:
-                                        option_data['color'] = record.color
-                                    
-                                    # Check for other color-related fields
-                                    for color_field in ['color_name', 'hex_color', 'bg_color']:
-                                        if hasattr(record, color_field):
-                                            color_value = getattr(record, color_field, None)
-                                            if color_value:
-                                                option_data[color_field] = color_value
-                                    
-                                    relation_options.append(option_data)
-                                
-                                field_info['relation_options'] = relation_options
-                                
-                                # Add widget information for many2many fields
-                                field_info['widget'] = 'many2many_tags'
-                                field_info['widget_options'] = {
-                                    'no_create': True,  # Don't allow creating new tags from signup
-                                    'no_edit': True,    # Don't allow editing tags
-                                }
-                                
-                            except Exception:
-                                # If we can't load options, still include the field but without options
-                                field_info['relation_options'] = []
-                                field_info['widget'] = 'many2many_tags'  # Still add widget info
+                            # Add widget information for many2many fields
+                            field_info['widget'] = 'many2many_tags'
+                            field_info['widget_options'] = {
+                                'no_create': True,  # Don't allow creating new tags from signup
+                                'no_edit': True,    # Don't allow editing tags
+                            }
                         except Exception:
                             # Skip field only if we can't even get the relation model name
                             continue
@@ -1,11 +1,25 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
 import logging
+import secrets
+from datetime import timedelta
+
+from werkzeug.urls import url_encode
+
 from odoo import api, models, fields, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+# Delivery attempts of a verification email before it is marked as failed
+VERIFICATION_MAIL_MAX_ATTEMPTS = 5
+# Minutes before a failed delivery is retried, doubled at each attempt
+VERIFICATION_MAIL_RETRY_DELAY = 1
+# Minutes the generic mail queue leaves a verification email to the verification
+# mail cron before sending it itself, e.g. if the cron is stuck
+VERIFICATION_MAIL_GRACE = 15
+
 
 class ResPartner(models.Model):
     _inherit = 'res.partner'
@@ -28,6 +42,44 @@ class ResPartner(models.Model):
         string='Signup User Data',
         help="Temporary storage for user data during email verification"
     )
+    
+    # Only the hash of the verification token of the latest attempt is stored
+    verification_token_hash = fields.Char(
+        string='Verification Token Hash',
+        index='btree_not_null',
+        copy=False,
+        groups='base.group_system'
+    )
+    verification_token_expiry = fields.Datetime(
+        string='Verification Token Expiry',
+        copy=False,
+        groups='base.group_system'
+    )
+    
+    # Delivery tracking of the verification email, sent by the verification mail queue
+    verification_mail_id = fields.Many2one(
+        'mail.mail',
+        string='Verification Email',
+        ondelete='set null',
+        copy=False
+    )
+    verification_mail_state = fields.Selection([
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ], string='Verification Email Status', index=True, copy=False)
+    verification_mail_attempts = fields.Integer(
+        string='Verification Email Attempts',
+        copy=False
+    )
+    verification_mail_next_try = fields.Datetime(
+        string='Verification Email Next Try',
+        copy=False
+    )
+    verification_mail_error = fields.Char(
+        string='Verification Email Error',
+        copy=False
+    )
 
     def signup_prepare_with_verification(self, user_data):
         """Prepare signup with email verification step"""
@@ -47,60 +99,191 @@ class ResPartner(models.Model):
             'email_verified': False
         })
         
-        # Generate signup token using Odoo's official method
-        token = self._generate_signup_token()
-        
-        # Send verification email
-        self._send_verification_email()
+        # Send verification email with the token of this attempt
+        token = self._send_verification_email()
         
         _logger.info("Email verification initiated for: %s", self.email)
-        return self._generate_signup_token()
+        return token
+
+    @api.model
+    def _hash_verification_token(self, token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _issue_verification_token(self):
+        """Issue the token of a new verification attempt, the tokens of the
+        previous attempts stop working
+
+        Returns:
+            str: the token, only its hash and expiry are stored
+        """
+        self.ensure_one()
+        validity_hours = int(self.env['ir.config_parameter'].sudo().get_param(
+            'auth_signup_email_verification.verification_validity_hours', '144'
+        ) or 144)
+        token = secrets.token_urlsafe(32)
+        self.sudo().write({
+            'verification_token_hash': self._hash_verification_token(token),
+            'verification_token_expiry': fields.Datetime.now() + timedelta(hours=validity_hours),
+        })
+        return token
+
+    @api.model
+    def _signup_retrieve_partner(self, token, check_validity=False, raise_exception=False):
+        """Also accept the verification tokens, looked up by their hash"""
+        if token:
+            partner = self.sudo().search([
+                ('verification_token_hash', '=', self._hash_verification_token(token)),
+            ], limit=1)
+            if partner:
+                expiry = partner.verification_token_expiry
+                if check_validity and (partner.email_verified or not expiry or expiry < fields.Datetime.now()):
+                    if raise_exception:
+                        raise UserError(_("The verification link has expired."))
+                    return self.browse()
+                return self.browse(partner.id)
+        return super()._signup_retrieve_partner(
+            token, check_validity=check_validity, raise_exception=raise_exception
+        )
 
     def _send_verification_email(self):
-        """Send verification email using Odoo's mail template system"""
+        """Queue the verification email with a new token, it is delivered by the
+        verification mail cron so that the signup request does not wait for the mail server
+
+        Returns:
+            str: the verification token sent
+        """
         self.ensure_one()
         
         if not self.email:
             raise UserError(_('Email address is required for verification.'))
         
-        try:
-            template = self.env.ref('auth_signup_email_verification.mail_template_email_verification')
-            
-            # Get partner's language or fallback to English
-            partner_lang = self.lang or 'en_US'
-            
-            # Verify language exists in installed languages
-            installed_langs = [code for code, _ in self.env['res.lang'].get_installed()]
-            if partner_lang not in installed_langs:
-                _logger.warning("Partner language %s not installed, falling back to en_US", partner_lang)
-                partner_lang = 'en_US'
-            
-            _logger.info("Sending verification email in language: %s to: %s", partner_lang, self.email)
-            _logger.info("Partner.lang value: %s", self.lang)
-            _logger.info("Installed languages: %s", installed_langs)
-            
-            # Send email using Odoo 18 compatible method
-            template.with_context(lang=partner_lang).send_mail(
-                self.id,
-                force_send=True,
-                raise_exception=True
-            )
+        template = self.env.ref('auth_signup_email_verification.mail_template_email_verification')
+        
+        # Get partner's language or fallback to English
+        partner_lang = self.lang or 'en_US'
+        
+        # Verify language exists in installed languages
+        installed_langs = [code for code, _ in self.env['res.lang'].get_installed()]
+        if partner_lang not in installed_langs:
+            _logger.warning("Partner language %s not installed, falling back to en_US", partner_lang)
+            partner_lang = 'en_US'
+        
+        # Drop the previous mail if it is still waiting, only the latest link is valid
+        if self.verification_mail_id.state in ('outgoing', 'exception'):
+            self.verification_mail_id.sudo().unlink()
+        
+        # The template renders the link with this token, see get_verification_url
+        token = self._issue_verification_token()
+        mail_id = template.with_context(
+            lang=partner_lang, verification_token=token
+        ).send_mail(self.id, force_send=False)
+        # Outgoing, but scheduled after a grace period: the verification mail cron
+        # sends it first and records its status, the generic mail queue only sends
+        # it if the cron did not. Kept once sent until the cron has seen it
+        now = fields.Datetime.now()
+        self.env['mail.mail'].sudo().browse(mail_id).write({
+            'scheduled_date': now + timedelta(minutes=VERIFICATION_MAIL_GRACE),
+            'auto_delete': False,
+        })
+        self.write({
+            'verification_mail_id': mail_id,
+            'verification_mail_state': 'queued',
+            'verification_mail_attempts': 0,
+            'verification_mail_next_try': now,
+            'verification_mail_error': False,
+        })
+        self.env.ref('auth_signup_email_verification.ir_cron_send_verification_email')._trigger()
+        
+        _logger.info("Verification email queued in language: %s to: %s", partner_lang, self.email)
+        return token
+
+    @api.model
+    def cron_send_verification_emails(self, batch_size=50):
+        """Deliver the queued verification emails before the generic mail queue,
+        failed deliveries are retried with an exponential back-off"""
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            SELECT id FROM res_partner
+            WHERE verification_mail_state = 'queued'
+                AND (verification_mail_next_try IS NULL OR verification_mail_next_try <= %s)
+            ORDER BY verification_mail_next_try NULLS FIRST
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, [now, batch_size])
+        partners = self.browse([row[0] for row in self.env.cr.fetchall()])
+        
+        # Mails deleted before they were sent: nothing tells they were delivered
+        for partner in partners.filtered(lambda p: not p.verification_mail_id):
+            partner.write({
+                'verification_mail_state': 'failed',
+                'verification_mail_error': _('The verification email was deleted before it was sent.'),
+            })
+            _logger.error("Verification email to %s was deleted before it was sent", partner.email)
+        partners = partners.filtered('verification_mail_id')
+        if not partners:
+            return
+        
+        mails = partners.verification_mail_id.sudo()
+        mails.filtered(lambda m: m.state == 'exception').write({'state': 'outgoing'})
+        mails.filtered(lambda m: m.state == 'outgoing').send(auto_commit=False, raise_exception=False)
+        
+        retry_at = None
+        for partner in partners:
+            mail = partner.verification_mail_id.sudo()
+            if mail.state == 'sent':
+                # Sent by this cron or by the generic queue after the grace period
+                partner.verification_mail_state = 'sent'
+                _logger.info("Verification email delivered to: %s", partner.email)
+                continue
+            if mail.state == 'cancel':
+                partner.write({
+                    'verification_mail_state': 'failed',
+                    'verification_mail_error': mail.failure_reason or _('The verification email was cancelled.'),
+                })
+                _logger.error("Verification email to %s was cancelled", partner.email)
+                continue
             
-            _logger.info("Verification email sent successfully to: %s in language: %s", self.email, partner_lang)
-        except Exception as e:
-            _logger.error("Failed to send verification email to %s: %s", self.email, str(e))
-            raise UserError(_('Failed to send verification email. Please try again.'))
+            attempts = partner.verification_mail_attempts + 1
+            vals = {
+                'verification_mail_attempts': attempts,
+                'verification_mail_error': mail.failure_reason,
+            }
+            if attempts >= VERIFICATION_MAIL_MAX_ATTEMPTS:
+                vals['verification_mail_state'] = 'failed'
+                _logger.error("Verification email to %s failed after %s attempts: %s",
+                              partner.email, attempts, mail.failure_reason)
+            else:
+                next_try = now + timedelta(minutes=VERIFICATION_MAIL_RETRY_DELAY * 2 ** (attempts - 1))
+                vals['verification_mail_next_try'] = next_try
+                # Outgoing again, the generic queue only takes over after the grace period
+                mail.write({
+                    'state': 'outgoing',
+                    'scheduled_date': next_try + timedelta(minutes=VERIFICATION_MAIL_GRACE),
+                })
+                retry_at = min(retry_at or next_try, next_try)
+                _logger.warning("Verification email to %s failed (attempt %s), retry at %s: %s",
+                                partner.email, attempts, next_try, mail.failure_reason)
+            partner.write(vals)
+        
+        # The body holds a live verification link, do not keep it once delivered
+        mails.filtered(lambda m: m.state == 'sent').unlink()
+        if retry_at:
+            self.env.ref('auth_signup_email_verification.ir_cron_send_verification_email')._trigger(at=retry_at)
 
     def get_verification_url(self):
-        """Get verification URL for email templates using Odoo's official approach"""
+        """Get verification URL for email templates
+
+        The token is the one issued by _send_verification_email, passed in the
+        rendering context; no token is generated while rendering.
+        """
         self.ensure_one()
         
-        # Use Odoo's official token generation
-        token = self._generate_signup_token()
-        
-        # Generate custom verification URL
         base_url = self.get_base_url()
-        return f"{base_url}/auth/verify/email?token={token}"
+        token = self.env.context.get('verification_token')
+        if not token:
+            # e.g. template preview: there is no token to show
+            return f"{base_url}/auth/verify/email"
+        return f"{base_url}/auth/verify/email?{url_encode({'token': token})}"
 
     def complete_email_verification(self):
         """Complete email verification and mark as verified"""
@@ -109,8 +292,12 @@ class ResPartner(models.Model):
         if self.email_verified:
             raise UserError(_('Email has already been verified.'))
         
-        # Mark email as verified
-        self.write({'email_verified': True})
+        # Mark email as verified, the token cannot be used again
+        self.sudo().write({
+            'email_verified': True,
+            'verification_token_hash': False,
+            'verification_token_expiry': False,
+        })
         
         _logger.info("Email verification completed for: %s", self.email)
         return True
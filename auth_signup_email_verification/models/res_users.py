@@ -15,16 +15,17 @@ class ResUsers(models.Model):
     def signup(self, values, token=None):
         """Override signup to handle email verification completion"""
         
+        verified_partner = None
         if token:
-            # Verify the token using Odoo's official method
+            # Verify the token using Odoo's official method (also accepts verification tokens)
             partner = self.env['res.partner']._signup_retrieve_partner(
                 token, check_validity=True, raise_exception=True
             )
             
             # If this is our email verification flow, complete verification
             if partner.signup_type == 'signup' and hasattr(partner, 'email_verified') and not partner.email_verified:
-                # Mark email as verified
-                partner.complete_email_verification()
+                # Marked as verified once the user is created, the token is still checked by super()
+                verified_partner = partner
                 
                 # Merge stored user data if available
                 if partner.signup_user_data:
@@ -39,6 +40,10 @@ class ResUsers(models.Model):
         # Call original signup method
         result = super().signup(values, token)
         
+        # Mark email as verified, this also revokes the verification token
+        if verified_partner:
+            verified_partner.complete_email_verification()
+        
         if result:
             login, password = result
             _logger.info("User signup completed successfully: %s", login)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from odoo import api, models
+
+_logger = logging.getLogger(__name__)
+
+
+class SignupThrottle(models.AbstractModel):
+    """Token buckets shared by all workers, stored in an UNLOGGED table
+
+    A bucket is identified by a key such as ``resend:email:<email>``, it holds
+    up to ``burst`` tokens and is refilled with ``rate`` tokens per second.
+
+    Buckets are updated in their own cursor, committed at once: the row locks
+    are released before the request does any ORM work.
+    """
+    _name = 'auth.signup.throttle'
+    _description = 'Signup Throttle'
+
+    def init(self):
+        # Not WAL-logged: cheap writes, losing the buckets on a crash is harmless
+        self.env.cr.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS auth_signup_throttle (
+                key VARCHAR PRIMARY KEY,
+                tokens DOUBLE PRECISION NOT NULL,
+                refill_date TIMESTAMP NOT NULL
+            )
+        """)
+
+    @contextmanager
+    def _throttle_cursor(self):
+        """Cursor committed independently of the request transaction, tests
+        use the current cursor"""
+        if getattr(threading.current_thread(), 'testing', False):
+            yield self.env.cr
+            return
+        with self.env.registry.cursor() as cr:
+            yield cr
+
+    @api.model
+    def _consume(self, cr, key, rate, burst):
+        """Take one token from the bucket of key
+
+        Returns:
+            bool: False if the bucket is empty and the action must be refused
+        """
+        if rate <= 0:
+            return True
+        cr.execute("""
+            INSERT INTO auth_signup_throttle AS t (key, tokens, refill_date)
+            VALUES (%(key)s, %(burst)s - 1, CLOCK_TIMESTAMP())
+            ON CONFLICT (key) DO UPDATE SET
+                tokens = GREATEST(-1, LEAST(
+                    %(burst)s,
+                    t.tokens + EXTRACT(EPOCH FROM CLOCK_TIMESTAMP() - t.refill_date) * %(rate)s
+                ) - 1),
+                refill_date = CLOCK_TIMESTAMP()
+            RETURNING tokens
+        """, {'key': key, 'rate': rate, 'burst': burst})
+        return cr.fetchone()[0] >= 0
+
+    @api.model
+    def _consume_all(self, limits):
+        """Take one token from each bucket of limits, ``[(key, rate, burst)]``
+
+        Every bucket is charged, so that a client rejected by one limit still
+        spends its tokens on the others.
+        """
+        allowed = True
+        with self._throttle_cursor() as cr:
+            for key, rate, burst in limits:
+                if not self._consume(cr, key, rate, burst):
+                    _logger.info("Signup throttle: %s is rate limited", key)
+                    allowed = False
+        return allowed
+
+    @api.model
+    def _check_all(self, limits):
+        """Tell if each bucket of limits, ``[(key, rate, burst)]``, has a token
+        left, without taking any and without locking
+
+        Returns:
+            bool: False if one of the buckets is empty
+        """
+        limits = [(key, rate, burst) for key, rate, burst in limits if rate > 0]
+        if not limits:
+            return True
+        self.env.cr.execute("""
+            SELECT 1 FROM auth_signup_throttle AS t
+            JOIN unnest(%s::varchar[], %s::float8[], %s::float8[]) AS l(key, rate, burst)
+                ON l.key = t.key
+            WHERE LEAST(l.burst, t.tokens + EXTRACT(EPOCH FROM CLOCK_TIMESTAMP() - t.refill_date) * l.rate) < 1
+            LIMIT 1
+        """, [[l[0] for l in limits], [l[1] for l in limits], [l[2] for l in limits]])
+        return not self.env.cr.fetchone()
+
+    @api.autovacuum
+    def _gc_throttle(self):
+        """Drop the buckets idle for a day, they are full again by then"""
+        self.env.cr.execute("""
+            DELETE FROM auth_signup_throttle
+            WHERE refill_date < CLOCK_TIMESTAMP() - INTERVAL '1 day'
+        """)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.auth_signup_email_verification.controllers.main import SIGNUP_ADMISSION_LIMITS
+
+
+class TestSignupVerification(TransactionCase):
+    """Verification tokens of the signup partners: one valid token per attempt, expiry"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Partner = cls.env['res.partner']
+        cls.partner = cls.Partner.create({
+            'name': 'Signup Partner',
+            'email': 'signup.partner@example.com',
+        })
+
+    def test_token_retrieves_partner(self):
+        """The token of the attempt retrieves its partner, only its hash is stored"""
+        token = self.partner._issue_verification_token()
+        self.assertEqual(self.Partner._signup_retrieve_partner(token, check_validity=True), self.partner)
+        self.assertNotEqual(self.partner.verification_token_hash, token)
+        self.assertEqual(self.partner.verification_token_hash, self.Partner._hash_verification_token(token))
+
+    def test_token_revoked_by_new_attempt(self):
+        """Issuing a new token revokes the tokens of the previous attempts"""
+        old_token = self.partner._issue_verification_token()
+        new_token = self.partner._issue_verification_token()
+        self.assertNotEqual(old_token, new_token)
+        self.assertFalse(self.Partner._signup_retrieve_partner(old_token))
+        self.assertEqual(self.Partner._signup_retrieve_partner(new_token, check_validity=True), self.partner)
+
+    def test_token_expired(self):
+        """An expired token is refused when its validity is checked"""
+        token = self.partner._issue_verification_token()
+        self.partner.write({
+            'verification_token_expiry': fields.Datetime.now() - timedelta(minutes=1),
+        })
+        self.assertFalse(self.Partner._signup_retrieve_partner(token, check_validity=True))
+        with self.assertRaises(UserError):
+            self.Partner._signup_retrieve_partner(token, check_validity=True, raise_exception=True)
+        # Without the validity check the partner is still found, e.g. to offer a resend
+        self.assertEqual(self.Partner._signup_retrieve_partner(token), self.partner)
+
+    def test_token_used(self):
+        """A token cannot be used again once the email is verified"""
+        token = self.partner._issue_verification_token()
+        self.partner.complete_email_verification()
+        self.assertTrue(self.partner.email_verified)
+        self.assertFalse(self.Partner._signup_retrieve_partner(token, check_validity=True))
+        with self.assertRaises(UserError):
+            self.partner.complete_email_verification()
+
+
+    def test_mail_queued(self):
+        """The verification email is queued as outgoing, the generic mail queue
+        only sends it after the grace period left to the verification mail cron"""
+        self.partner._send_verification_email()
+        mail = self.partner.verification_mail_id
+        self.assertEqual(mail.state, 'outgoing')
+        self.assertFalse(mail.auto_delete)
+        self.assertGreater(mail.scheduled_date, fields.Datetime.now())
+        self.assertEqual(self.partner.verification_mail_state, 'queued')
+
+    def test_mail_cron(self):
+        """The cron sends the queued email, records its status and deletes it"""
+        self.partner._send_verification_email()
+        mail = self.partner.verification_mail_id
+        MailMail = type(self.env['mail.mail'])
+        with patch.object(MailMail, 'send', autospec=True,
+                          side_effect=lambda mails, **kw: mails.write({'state': 'sent'})) as send:
+            self.Partner.cron_send_verification_emails()
+        send.assert_called_once()
+        self.assertEqual(self.partner.verification_mail_state, 'sent')
+        self.assertFalse(mail.exists())
+
+    def test_mail_cron_retry(self):
+        """A failed delivery is retried later, the email stays outgoing"""
+        self.partner._send_verification_email()
+        mail = self.partner.verification_mail_id
+        MailMail = type(self.env['mail.mail'])
+        with patch.object(MailMail, 'send', autospec=True,
+                          side_effect=lambda mails, **kw: mails.write({'state': 'exception'})):
+            self.Partner.cron_send_verification_emails()
+        self.assertEqual(self.partner.verification_mail_state, 'queued')
+        self.assertEqual(self.partner.verification_mail_attempts, 1)
+        self.assertGreater(self.partner.verification_mail_next_try, fields.Datetime.now())
+        self.assertEqual(mail.state, 'outgoing')
+        self.assertGreater(mail.scheduled_date, self.partner.verification_mail_next_try)
+
+    def test_mail_cron_deleted(self):
+        """A queued email deleted before it was sent is a failed delivery"""
+        self.partner._send_verification_email()
+        self.partner.verification_mail_id.unlink()
+        self.Partner.cron_send_verification_emails()
+        self.assertEqual(self.partner.verification_mail_state, 'failed')
+        self.assertTrue(self.partner.verification_mail_error)
+
+
+class TestSignupThrottle(TransactionCase):
+    """Token buckets limiting the resends of the verification email"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Throttle = cls.env['auth.signup.throttle']
+        rate, burst = SIGNUP_ADMISSION_LIMITS['resend']['email']
+        cls.burst = burst
+        cls.limits = [('resend:email:throttle@example.com', rate, burst)]
+        cls.other_limits = [('resend:email:other@example.com', rate, burst)]
+
+    def test_resend_limit(self):
+        """The resends are allowed up to the bucket size, then refused"""
+        for _attempt in range(self.burst):
+            self.assertTrue(self.Throttle._consume_all(self.limits))
+        self.assertFalse(self.Throttle._consume_all(self.limits))
+        self.assertFalse(self.Throttle._check_all(self.limits))
+        # The buckets of the other emails are not affected
+        self.assertTrue(self.Throttle._check_all(self.other_limits))
+        self.assertTrue(self.Throttle._consume_all(self.other_limits))
+
+    def test_check_does_not_consume(self):
+        """Checking the buckets takes no token"""
+        for _attempt in range(self.burst + 1):
+            self.assertTrue(self.Throttle._check_all(self.limits))
+        for _attempt in range(self.burst):
+            self.assertTrue(self.Throttle._consume_all(self.limits))
+        self.assertFalse(self.Throttle._consume_all(self.limits))
+
+    def test_unlimited(self):
+        """A bucket without rate never refuses"""
+        limits = [('resend:email:unlimited@example.com', 0, 1)]
+        for _attempt in range(3):
+            self.assertTrue(self.Throttle._consume_all(limits))
+        self.assertTrue(self.Throttle._check_all(limits))
@@ -12,9 +12,10 @@
 
     'category': 'Customizations',
     'license': 'LGPL-3',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
 
     'depends': [
+        'bus',
         'web',
     ],
 
@@ -31,6 +32,9 @@
         'views/email_validation_views.xml',
         'views/email_validator_views.xml',
         'views/email_validation_rule_views.xml',
+        'views/email_validation_job_views.xml',
+        'views/email_validation_backfill_views.xml',
+        'views/email_validation_result_history_views.xml',
     ],
     'demo': [
         'demo/email_validation.xml',
@@ -0,0 +1,14 @@
+def migrate(cr, version):
+    """Keep only the latest result per email and validator before the
+    unique constraint is added."""
+    cr.execute("""
+        DELETE FROM kw_email_validation_result
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY email_id, validator_id
+                    ORDER BY create_date DESC, id DESC) AS rank
+                FROM kw_email_validation_result
+            ) AS r
+            WHERE rank > 1
+        )""")
@@ -1,7 +1,10 @@
 from . import (
     email_validation,
     email_validation_result,
+    email_validation_result_history,
     email_validator,
     email_validation_rule,
+    email_validation_job,
+    email_validation_backfill,
     email_validation_mixin,
 )
@@ -1,10 +1,32 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools, _
+from odoo.tools import SQL
+
+from .email_validator import (
+    collect_results, threaded_validation, use_threads)
 
 _logger = logging.getLogger(__name__)
 
+PRIORITY_BULK = '0'
+PRIORITY_CRM = '1'
+PRIORITY_INTERACTIVE = '2'
+
+# Candidates read per priority and source model for each email claimed,
+# so that parallel workers skipping locked rows still find work
+CLAIM_POOL_FACTOR = 4
+
+# Whitespace trimmed around emails, in Python and in SQL
+EMAIL_WHITESPACE = ' \t\n\r\f\v'
+
+
+def normalize_email_sql(column):
+    """SQL expression normalizing the email of column like
+    ``_normalize_email`` does."""
+    return SQL('LOWER(BTRIM(%s, %s))', column, EMAIL_WHITESPACE)
+
 
 class EmailValidation(models.Model):
     """Central email validation service.
@@ -37,60 +59,275 @@ class EmailValidation(models.Model):
         inverse_name='email_id',
         string='Validation Results',
         readonly=True, )
+    job_id = fields.Many2one(
+        comodel_name='kw.email.validation.job',
+        string='Bulk Job',
+        index=True,
+        readonly=True,
+        copy=False,
+        help='Bulk validation job waiting for the result of this email', )
+    priority = fields.Selection(
+        selection=[
+            (PRIORITY_BULK, 'Bulk Import'),
+            (PRIORITY_CRM, 'CRM'),
+            (PRIORITY_INTERACTIVE, 'Interactive'),
+        ],
+        default=PRIORITY_CRM,
+        required=True,
+        readonly=True,
+        help='Pending emails are validated by decreasing priority', )
+    source_model = fields.Char(
+        readonly=True,
+        help='Model of the record that first requested the validation, '
+             'the queue is shared fairly between models', )
+    queue_date = fields.Datetime(
+        default=fields.Datetime.now,
+        readonly=True,
+        help='Date the email was queued for validation', )
+    requested_by_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Requested By',
+        readonly=True,
+        copy=False,
+        ondelete='set null',
+        help='User notified of the progress of the validation', )
 
     _sql_constraints = [
         ('email_uniq', 'UNIQUE(name)', 'Email must be unique!')
     ]
 
+    def init(self):
+        tools.create_index(
+            self.env.cr, 'kw_email_validation_queue_index', self._table,
+            ['priority', 'source_model', 'queue_date', 'id'],
+            where="state = 'pending' AND job_id IS NULL")
+
     @api.model
-    def get_validation(self, email: str) -> str:
+    def _normalize_email(self, email):
         if not email or not isinstance(email, str) or '@' not in email:
             return False
+        return email.strip(EMAIL_WHITESPACE).lower()
 
-        email = email.strip().lower()
-        record = self.sudo().search([('name', '=', email)], limit=1)
+    @api.model
+    def get_validations(self, emails, priority=PRIORITY_CRM,
+                        source_model=False) -> dict:
+        """Return the validation records of many emails at once.
 
-        if not record:
-            record = self.sudo().create({'name': email})
+        Existing records are read with one search, the missing ones are
+        inserted with one query and queued with the given priority and
+        source model. Known pending emails are raised to the priority.
 
-        return record
+        Returns:
+            dict: ``{email: kw.email.validation}`` for each given email,
+                  with an empty recordset for malformed emails
+        """
+        names = {self._normalize_email(email) for email in emails} - {False}
+        records = self.sudo().search([('name', 'in', list(names))]) \
+            if names else self.sudo()
+        by_name = {record.name: record for record in records}
 
-    @api.model
-    def get_validation_state(
-            self, email: str, force_check: bool = False) -> str:
-        if not email or not isinstance(email, str) or '@' not in email:
-            return 'invalid'
+        raise_ids = [record.id for record in records
+                     if record.state == 'pending'
+                     and record.priority < priority]
+        if raise_ids:
+            self.browse(raise_ids).sudo().write({'priority': priority})
 
-        email = email.strip().lower()
-        record = self.sudo().search([('name', '=', email)], limit=1)
+        missing = sorted(names - set(by_name))
+        if missing:
+            self.env.cr.execute("""
+                INSERT INTO kw_email_validation (
+                    name, state, priority, source_model, queue_date,
+                    create_uid, create_date, write_uid, write_date)
+                SELECT name, 'pending', %(priority)s, %(source_model)s,
+                       NOW() AT TIME ZONE 'UTC',
+                       %(uid)s, NOW() AT TIME ZONE 'UTC',
+                       %(uid)s, NOW() AT TIME ZONE 'UTC'
+                FROM unnest(%(names)s::varchar[]) AS name
+                ON CONFLICT (name) DO NOTHING
+                RETURNING id""", {
+                'uid': self.env.uid,
+                'names': missing,
+                'priority': priority,
+                'source_model': source_model or None,
+            })
+            created = self.sudo().browse(
+                [row[0] for row in self.env.cr.fetchall()])
+            by_name.update({record.name: record for record in created})
+            concurrent = [name for name in missing if name not in by_name]
+            if concurrent:
+                # Inserted by another transaction in the meantime
+                by_name.update({
+                    record.name: record for record in self.sudo().search(
+                        [('name', 'in', concurrent)])})
 
-        if not record:
-            record = self.sudo().create({'name': email})
+        return {email: by_name.get(self._normalize_email(email), self.sudo())
+                for email in emails}
 
+    @api.model
+    def get_validation_states(self, emails, force_check: bool = False,
+                              **kwargs):
+        """Return the validation states of many emails at once, kwargs
+        are passed to ``get_validations``.
+
+        Returns:
+            dict: ``{email: state}``, malformed emails are invalid
+        """
+        validations = self.get_validations(emails, **kwargs)
         if force_check:
-            record.validate_email()
+            self.sudo().union(*validations.values()).validate_emails()
+        return {email: record.state if record else 'invalid'
+                for email, record in validations.items()}
+
+    @api.model
+    def get_validation(self, email: str) -> str:
+        return self.get_validations(
+            [email], priority=PRIORITY_INTERACTIVE)[email] or False
 
-        return record.state
+    @api.model
+    def get_validation_state(
+            self, email: str, force_check: bool = False) -> str:
+        return self.get_validation_states(
+            [email], force_check=force_check,
+            priority=PRIORITY_INTERACTIVE)[email]
 
     def validate_email(self) -> None:
         """Validate an email using all available validators.
         """
         self.ensure_one()
+        self.validate_emails()
+
+    def validate_emails(self) -> None:
+        """Validate a batch of emails using all available validators.
+
+        Pre-filter validators of the rules reject obviously invalid emails
+        first, then each rule is applied to the emails that passed the
+        previous ones.
+        Recent results of a validator are reused instead of calling it, see
+        ``result_ttl_days``.
+        Results are created at once and states are written with a single
+        ``write`` per state. Emails a validator could not check are left
+        untouched.
+        """
+        if not self:
+            return
         rules = self.env['kw.email.validation.rule'].search([])
         if not rules:
             return
+        emails = self._prefilter(rules)
+        if emails:
+            emails._apply_rules(rules)
+
+    def _prefilter(self, rules):
+        """Reject emails failing the pre-filter validators of the rules in
+        bulk.
 
-        state = 'valid'
-        for rule in rules:
-            res = rule.validator_id.validate_email(self)
+        Returns:
+            the emails that passed
+        """
+        prefilters = rules.validator_id.filtered('is_prefilter')
+        emails = self
+        for validator in prefilters:
+            rejected = validator.prefilter_emails(emails)
+            if rejected:
+                self._reject(validator, rejected)
+                emails = emails.browse(
+                    [i for i in emails.ids if i not in rejected])
+        return emails
+
+    def _reject(self, validator, rejected):
+        """Store invalid results and states with one query each.
+
+        Args:
+            validator: validator that rejected the emails
+            rejected: dict mapping an email id to the rejection message
+        """
+        self.flush_model(['state'])
+        email_ids = list(rejected)
+        self.env['kw.email.validation.result']._upsert([{
+            'email_id': email_id,
+            'validator_id': validator.id,
+            'is_valid': False,
+            'message': rejected[email_id],
+        } for email_id in email_ids])
+        self.env.cr.execute("""
+            UPDATE kw_email_validation
+            SET state = 'invalid', write_uid = %s,
+                write_date = NOW() AT TIME ZONE 'UTC'
+            WHERE id = ANY(%s) AND state != 'invalid'
+        """, [self.env.uid, email_ids])
+        records = self.browse(email_ids)
+        records.invalidate_recordset(['state', 'write_uid', 'write_date'])
+        records.modified(['state'])
+        records._modified_unlinked()
+
+    def _apply_rules(self, rules) -> None:
+        self._apply_stages(rules._get_stages())
+
+    def _apply_stages(self, stages) -> None:
+        """Apply steps of validators, each step receiving the emails that
+        passed the previous ones.
+
+        Args:
+            stages: list of validator recordsets, see ``_get_stages``
+        """
+        remaining_ids = self.ids
+        invalid_ids = []
+        with collect_results() as vals_list:
+            for validators in stages:
+                if not remaining_ids:
+                    break
+                verdicts = self._run_stage(validators, remaining_ids)
+                passed_ids = []
+                for email_id in remaining_ids:
+                    res = [results.get(email_id) for results in verdicts]
+                    if False in res:
+                        invalid_ids.append(email_id)
+                    elif None not in res:
+                        passed_ids.append(email_id)
+                remaining_ids = passed_ids
+        self.env['kw.email.validator']._create_results(vals_list)
+
+        self._write_states({
+            'valid': self.browse(remaining_ids),
+            'invalid': self.browse(invalid_ids),
+        })
+
+    def _run_stage(self, validators, email_ids):
+        """Run the validators of a step on the same emails, in parallel
+        threads when there are several of them and threads are allowed,
+        see ``threaded_validation``.
+
+        Returns:
+            list: ``{email_id: is_valid}`` of each validator
+        """
+        if len(validators) == 1:
+            return [validators._check_emails(email_ids)]
+        if not use_threads():
+            return [validator._check_emails(email_ids, use_bulk=False)
+                    for validator in validators]
+        with ThreadPoolExecutor(
+                max_workers=len(validators),
+                thread_name_prefix='kw_email_validation_stage',
+        ) as executor:
+            outcomes = list(executor.map(
+                lambda validator: validator._check_emails_isolated(
+                    email_ids),
+                validators))
+        for _results, vals_list in outcomes:
+            self.env['kw.email.validator']._create_results(vals_list)
+        return [results for results, _vals_list in outcomes]
 
-            if not res:
-                state = 'invalid'
-                break
+    def _write_states(self, states):
+        """Write states with one ``write`` call per state.
 
-        if self.state != state:
-            self.write({'state': state})
-            self.invalidate_recordset()
+        Args:
+            states: dict mapping a state to the records to set it on
+        """
+        for state, records in states.items():
+            records = records.filtered(lambda r, s=state: r.state != s)
+            if records:
+                records.write({'state': state})
+        self.invalidate_recordset()
 
     @api.model
     def is_valid(self, email: str, force_check: bool = False) -> bool:
@@ -101,8 +338,10 @@ class EmailValidation(models.Model):
     def create(self, vals_list):
         for vals in vals_list:
             if 'name' in vals and vals.get('name'):
-                vals['name'] = vals['name'].strip().lower()
-        return super().create(vals_list)
+                vals['name'] = vals['name'].strip(EMAIL_WHITESPACE).lower()
+        records = super().create(vals_list)
+        records._modified_unlinked()
+        return records
 
     def write(self, vals):
         """Prevent changing email after creation."""
@@ -112,7 +351,35 @@ class EmailValidation(models.Model):
         if not vals:
             return True
 
-        return super().write(vals)
+        res = super().write(vals)
+        if 'state' in vals:
+            self._modified_unlinked()
+        return res
+
+    def _modified_unlinked(self):
+        """Recompute the stored validation state of the bridged records
+        not linked yet whose email matches these validations, the
+        dependency on ``kw_email_validation_id.state`` does not reach
+        them."""
+        names = [name for name in self.mapped('name') if name]
+        if not names:
+            return
+        backfill = self.env['kw.email.validation.backfill']
+        for model_name, email_field in \
+                backfill._get_bridged_models().items():
+            model = self.env[model_name].sudo()
+            field = model._fields['kw_email_validation_state']
+            if not field.store:
+                continue
+            model.flush_model([email_field, 'kw_email_validation_id'])
+            self.env.cr.execute(SQL("""
+                SELECT id FROM %s
+                WHERE kw_email_validation_id IS NULL AND %s = ANY(%s)""",
+                SQL.identifier(model._table),
+                normalize_email_sql(SQL.identifier(email_field)), names))
+            records = model.browse([row[0] for row in self.env.cr.fetchall()])
+            if records:
+                self.env.add_to_compute(field, records)
 
     def name_get(self) -> List[Tuple[int, str]]:
         """Display email with validation status."""
@@ -121,10 +388,165 @@ class EmailValidation(models.Model):
 
     def action_force_validate_email(self) -> None:
         """Action to manually trigger email validation."""
-        for record in self:
-            record.get_validation_state(record.name, True)
+        self.validate_emails()
+
+    def enqueue(self, priority=PRIORITY_INTERACTIVE, force=False):
+        """Queue the emails to be validated again by the validation worker
+        instead of validating them in the current request. The current
+        user is notified of the progress on the bus.
+
+        Emails waiting for a bulk job are left untouched, as well as the
+        validated emails with a result still fresh unless force is set.
+
+        Returns:
+            the queued emails
+        """
+        emails = self.sudo().filtered(lambda e: not e.job_id)
+        if emails and not force:
+            fresh = set(emails._get_fresh_ids())
+            emails = emails.filtered(lambda e: e.id not in fresh)
+        if not emails:
+            return emails
+        emails.write({
+            'state': 'pending',
+            'priority': priority,
+            'queue_date': fields.Datetime.now(),
+            'requested_by_id': self.env.uid,
+        })
+        cron = self.env.ref(
+            'kw_email_validation.email_validator_interactive_cron'
+            if priority == PRIORITY_INTERACTIVE
+            else 'kw_email_validation.email_validator_cron',
+            raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return emails
+
+    def _get_fresh_ids(self):
+        """Return the ids of the validated emails having a result newer
+        than the freshness window of its validator."""
+        self.env['kw.email.validation.result'].flush_model()
+        self.flush_recordset(['state'])
+        self.env.cr.execute("""
+            SELECT DISTINCT e.id
+            FROM kw_email_validation AS e
+            JOIN kw_email_validation_result AS r ON r.email_id = e.id
+            JOIN kw_email_validator AS v ON v.id = r.validator_id
+            WHERE e.id = ANY(%s) AND e.state != 'pending'
+                AND v.result_ttl_days > 0
+                AND r.create_date >= NOW() AT TIME ZONE 'UTC'
+                    - MAKE_INTERVAL(days => v.result_ttl_days)
+        """, [self.ids])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _notify_progress(self):
+        """Notify the users who requested the validation of these emails
+        of the progress of their requests."""
+        done = self.filtered(lambda e: e.state != 'pending')
+        for user in done.requested_by_id:
+            emails = done.filtered(lambda e, u=user: e.requested_by_id == u)
+            remaining = self.search_count([
+                ('requested_by_id', '=', user.id),
+                ('state', '=', 'pending'),
+            ])
+            self.env['bus.bus']._sendone(
+                user.partner_id, 'simple_notification', {
+                    'title': _('Email Validation'),
+                    'message': _(
+                        '%(valid)s valid, %(invalid)s invalid, '
+                        '%(remaining)s remaining',
+                        valid=len(emails.filtered(
+                            lambda e: e.state == 'valid')),
+                        invalid=len(emails.filtered(
+                            lambda e: e.state == 'invalid')),
+                        remaining=remaining),
+                    'type': 'info' if remaining else 'success',
+                    'sticky': False,
+                })
+        done.write({'requested_by_id': False})
 
     @api.model
-    def cron_validate_email(self, limit: int = 10) -> None:
-        for record in self.search([('state', '=', 'pending')], limit=limit):
-            record.get_validation_state(record.name, True)
+    def cron_validate_email(self, limit: int = 10,
+                            min_priority: str = PRIORITY_BULK) -> None:
+        emails = self._claim(limit, min_priority=min_priority)
+        # Claimed emails are committed, worker threads can read them
+        with threaded_validation():
+            emails.validate_emails()
+        emails._notify_progress()
+        metrics = self.get_queue_metrics()
+        _logger.info(
+            'Validated %s emails, %s pending (oldest queued %s s ago)',
+            len(emails), sum(m['depth'] for m in metrics),
+            max((m['age'] for m in metrics), default=0))
+
+    @api.model
+    def _claim(self, limit, min_priority=PRIORITY_BULK):
+        """Lock the next pending emails to validate.
+
+        Emails are taken by decreasing priority and, within a priority,
+        round-robin between source models so that a large import does not
+        starve the others. Rows locked by another worker are skipped, so
+        several workers can drain the queue in parallel. The locks are
+        held until the end of the transaction.
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            WITH candidate AS (
+                SELECT c.id, g.priority, c.rank
+                FROM (
+                    SELECT DISTINCT priority, source_model
+                    FROM kw_email_validation
+                    WHERE state = 'pending' AND job_id IS NULL
+                        AND priority >= %(min_priority)s
+                ) AS g
+                CROSS JOIN LATERAL (
+                    SELECT e.id, ROW_NUMBER() OVER (
+                        ORDER BY e.queue_date, e.id) AS rank
+                    FROM kw_email_validation AS e
+                    WHERE e.state = 'pending' AND e.job_id IS NULL
+                        AND e.priority = g.priority
+                        AND e.source_model IS NOT DISTINCT FROM
+                            g.source_model
+                    ORDER BY e.queue_date, e.id
+                    LIMIT %(pool)s
+                ) AS c
+            )
+            SELECT e.id
+            FROM kw_email_validation AS e
+            JOIN candidate ON candidate.id = e.id
+            WHERE e.state = 'pending' AND e.job_id IS NULL
+            ORDER BY candidate.priority DESC, candidate.rank, e.id
+            LIMIT %(limit)s
+            FOR UPDATE OF e SKIP LOCKED
+        """, {
+            'min_priority': min_priority,
+            'pool': limit * CLAIM_POOL_FACTOR,
+            'limit': limit,
+        })
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def get_queue_metrics(self):
+        """Return the depth and age of the queue.
+
+        Returns:
+            list: dicts with ``priority``, ``source_model``, ``depth`` (number
+                  of pending emails) and ``age`` (seconds since the oldest
+                  one was queued)
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT priority, source_model, COUNT(*),
+                   EXTRACT(EPOCH FROM NOW() AT TIME ZONE 'UTC'
+                           - MIN(queue_date))
+            FROM kw_email_validation
+            WHERE state = 'pending' AND job_id IS NULL
+            GROUP BY priority, source_model
+            ORDER BY priority DESC, source_model
+        """)
+        return [{
+            'priority': priority,
+            'source_model': source_model,
+            'depth': depth,
+            'age': int(age or 0),
+        } for priority, source_model, depth, age in self.env.cr.fetchall()]
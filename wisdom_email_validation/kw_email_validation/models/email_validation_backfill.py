@@ -0,0 +1,169 @@
+import logging
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+from .email_validation import PRIORITY_BULK, normalize_email_sql
+from .email_validator import is_testing
+
+_logger = logging.getLogger(__name__)
+
+
+class EmailValidationBackfill(models.Model):
+    """Checkpoint of the linking of the records of a model using the
+    validation mixin to their validations."""
+    _name = 'kw.email.validation.backfill'
+    _description = 'Email Validation Backfill'
+    _order = 'name'
+
+    name = fields.Char(
+        string='Model',
+        required=True,
+        readonly=True, )
+    email_field = fields.Char(
+        required=True,
+        readonly=True, )
+    state = fields.Selection(
+        selection=[
+            ('running', 'Running'),
+            ('done', 'Done'),
+        ],
+        default='running',
+        required=True,
+        readonly=True, )
+    last_id = fields.Integer(
+        string='Last Record ID',
+        readonly=True,
+        help='Records up to this id are linked, the backfill resumes '
+             'after it', )
+    linked_count = fields.Integer(
+        readonly=True, )
+    date_done = fields.Datetime(
+        readonly=True, )
+
+    _sql_constraints = [
+        ('name_uniq', 'UNIQUE(name)', 'Model must be unique!')
+    ]
+
+    @api.model
+    def schedule(self, model_name, email_field):
+        """(Re)start the linking of all records of a model from the first
+        record, it is done in chunks by a scheduled action."""
+        if model_name not in self.env:
+            raise ValueError(f'Unknown model {model_name}')
+        vals = {
+            'email_field': email_field,
+            'state': 'running',
+            'last_id': 0,
+            'linked_count': 0,
+            'date_done': False,
+        }
+        backfill = self.sudo().search([('name', '=', model_name)], limit=1)
+        if backfill:
+            backfill.write(vals)
+        else:
+            backfill = self.sudo().create(dict(vals, name=model_name))
+        cron = self.env.ref(
+            'kw_email_validation.email_validation_backfill_cron',
+            raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return backfill
+
+    @api.model
+    def _get_bridged_models(self):
+        """Return ``{model name: email field}`` of the models using the
+        validation mixin."""
+        return {
+            name: model._kw_email_validation_field
+            for name, model in self.env.items()
+            if not model._abstract
+            and getattr(model, '_kw_email_validation_field', None)
+            and 'kw_email_validation_id' in model._fields
+            and not model._fields['kw_email_validation_id'].inherited
+        }
+
+    @api.model
+    def cron_relink(self) -> None:
+        """Relink all records of the bridged models, fixing the links left
+        stale by SQL imports or changes of the email field."""
+        for model_name, email_field in self._get_bridged_models().items():
+            self.schedule(model_name, email_field)
+
+    @api.model
+    def cron_run_backfills(self, chunk_size: int = 5000) -> None:
+        for backfill in self.search([('state', '=', 'running')]):
+            backfill._run(chunk_size)
+
+    def _run(self, chunk_size=5000):
+        """Link the records chunk by chunk, committing the checkpoint
+        after each chunk so that a killed worker resumes from it."""
+        self.ensure_one()
+        if 'kw_email_validation_id' not in self.env.get(self.name, {}):
+            _logger.warning('Backfill of %s skipped, the model is not '
+                            'bridged anymore', self.name)
+            self.write({'state': 'done'})
+            return
+        while self.state == 'running':
+            self._run_chunk(chunk_size)
+            if not is_testing():
+                self.env.cr.commit()
+
+    def _run_chunk(self, chunk_size):
+        self.ensure_one()
+        cr = self.env.cr
+        model = self.env[self.name]
+        table = SQL.identifier(model._table)
+        email = SQL.identifier(self.email_field)
+        model.flush_model([self.email_field, 'kw_email_validation_id'])
+        self.env['kw.email.validation'].flush_model(['name'])
+
+        cr.execute(SQL("""
+            SELECT MAX(id) FROM (
+                SELECT id FROM %s WHERE id > %s ORDER BY id LIMIT %s
+            ) AS chunk""", table, self.last_id, chunk_size))
+        last_id = cr.fetchone()[0]
+        if last_id is None:
+            self.write({
+                'state': 'done',
+                'date_done': fields.Datetime.now(),
+            })
+            return
+
+        cr.execute(SQL("""
+            INSERT INTO kw_email_validation (
+                name, state, priority, source_model, queue_date,
+                create_uid, create_date, write_uid, write_date)
+            SELECT DISTINCT %(name)s, 'pending',
+                   %(priority)s, %(model)s, NOW() AT TIME ZONE 'UTC',
+                   %(uid)s, NOW() AT TIME ZONE 'UTC',
+                   %(uid)s, NOW() AT TIME ZONE 'UTC'
+            FROM %(table)s
+            WHERE id > %(first)s AND id <= %(last)s
+                AND %(email)s LIKE '%%@%%'
+            ON CONFLICT (name) DO NOTHING""",
+            name=normalize_email_sql(email),
+            email=email, table=table, uid=self.env.uid,
+            priority=PRIORITY_BULK, model=self.name,
+            first=self.last_id, last=last_id))
+
+        cr.execute(SQL("""
+            UPDATE %(table)s AS t
+            SET kw_email_validation_id = v.id
+            FROM %(table)s AS s
+            LEFT JOIN kw_email_validation AS v
+                ON v.name = %(name)s
+            WHERE s.id = t.id
+                AND t.id > %(first)s AND t.id <= %(last)s
+                AND t.kw_email_validation_id IS DISTINCT FROM v.id
+            RETURNING t.id""",
+            name=normalize_email_sql(SQL.identifier('s', self.email_field)),
+            table=table, first=self.last_id, last=last_id))
+        records = model.browse([row[0] for row in cr.fetchall()])
+        records.invalidate_recordset(['kw_email_validation_id'])
+        records.modified(['kw_email_validation_id'])
+
+        self.write({
+            'last_id': last_id,
+            'linked_count': self.linked_count + len(records),
+        })
@@ -0,0 +1,141 @@
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, exceptions
+
+from .email_validator import is_testing
+
+_logger = logging.getLogger(__name__)
+
+# Age after which a job the provider cannot be reached for is given up
+JOB_MAX_AGE = timedelta(days=2)
+
+
+class EmailValidationJob(models.Model):
+    """Batch of emails submitted to the bulk API of a validator."""
+    _name = 'kw.email.validation.job'
+    _description = 'Email Validation Job'
+    _order = 'id desc'
+
+    name = fields.Char(
+        string='Job Reference',
+        readonly=True,
+        copy=False,
+        help='Job identifier returned by the provider', )
+    validator_id = fields.Many2one(
+        comodel_name='kw.email.validator',
+        required=True,
+        index=True,
+        readonly=True,
+        ondelete='cascade', )
+    state = fields.Selection(
+        selection=[
+            ('running', 'Running'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        default='running',
+        index=True,
+        required=True,
+        readonly=True, )
+    email_ids = fields.One2many(
+        comodel_name='kw.email.validation',
+        inverse_name='job_id',
+        string='Emails',
+        readonly=True, )
+    email_count = fields.Integer(
+        readonly=True, )
+    poll_count = fields.Integer(
+        readonly=True, )
+    last_poll_date = fields.Datetime(
+        readonly=True, )
+    message = fields.Text(
+        readonly=True, )
+
+    @api.model
+    def cron_process_jobs(self, limit: int = 20) -> None:
+        jobs = self.search([('state', '=', 'running')], limit=limit,
+                           order='last_poll_date asc, id')
+        for job in jobs:
+            job._poll()
+            if not is_testing():
+                self.env.cr.commit()
+
+    def _poll(self) -> None:
+        """Fetch the job results from the provider and apply them.
+
+        The job fails when the provider reports it, errors reaching the
+        provider are retried on the next run until the job is too old.
+        """
+        self.ensure_one()
+        try:
+            results = self.validator_id._bulk_fetch(self)
+        except exceptions.UserError as e:
+            self._fail(str(e))
+            return
+        except Exception as e:
+            if fields.Datetime.now() - self.create_date > JOB_MAX_AGE:
+                self._fail(str(e))
+                return
+            _logger.info('Bulk job %s of %s could not be polled: %s',
+                         self.name, self.validator_id.name, e)
+            self.write({
+                'poll_count': self.poll_count + 1,
+                'last_poll_date': fields.Datetime.now(),
+                'message': str(e),
+            })
+            return
+
+        if results is None:
+            self.write({
+                'poll_count': self.poll_count + 1,
+                'last_poll_date': fields.Datetime.now(),
+            })
+            return
+
+        self._apply_results(results)
+
+    def _fail(self, message) -> None:
+        """Give the job up, its emails may be submitted again."""
+        self.ensure_one()
+        _logger.warning('Bulk job %s of %s failed: %s',
+                        self.name, self.validator_id.name, message)
+        self.email_ids.write({'job_id': False})
+        self.write({
+            'state': 'failed',
+            'message': message,
+            'last_poll_date': fields.Datetime.now(),
+        })
+
+    def _apply_results(self, results) -> None:
+        """Store the job results and resume validation of passed emails.
+
+        Args:
+            results: dict mapping an email address to its validity
+        """
+        self.ensure_one()
+        emails = self.email_ids
+        validator = self.validator_id
+        validator._create_results([{
+            'email_id': email.id,
+            'validator_id': validator.id,
+            'is_valid': results[email.name],
+        } for email in emails if email.name in results])
+
+        passed = emails.filtered(lambda e: results.get(e.name))
+        failed = emails.filtered(
+            lambda e: e.name in results and not results[e.name])
+        emails.write({'job_id': False})
+        self.write({
+            'state': 'done',
+            'poll_count': self.poll_count + 1,
+            'last_poll_date': fields.Datetime.now(),
+        })
+        emails._write_states({'invalid': failed})
+
+        stages = self.env['kw.email.validation.rule'].search(
+            [])._get_stages()
+        index = next((i for i, validators in enumerate(stages)
+                      if validator in validators), None)
+        if index is not None and passed:
+            passed._apply_stages(stages[index + 1:])
@@ -1,6 +1,9 @@
 import logging
+from collections import defaultdict
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
+
+from .email_validation import PRIORITY_CRM, PRIORITY_INTERACTIVE
 
 _logger = logging.getLogger(__name__)
 
@@ -9,6 +12,8 @@ class EmailValidationMixin(models.AbstractModel):
     """Mixin to add email validation capabilities to any model."""
     _name = 'kw.email.validation.mixin'
     _description = 'Email Validation Mixin'
+    # Queue priority of the emails of this model
+    _kw_email_validation_priority = PRIORITY_CRM
 
     kw_email_validation_id = fields.Many2one(
         comodel_name='kw.email.validation',
@@ -23,56 +28,101 @@ class EmailValidationMixin(models.AbstractModel):
         default='pending',
         compute='_compute_kw_email_validation_state', )
 
+    def init(self):
+        super().init()
+        field = getattr(self, '_kw_email_validation_field', None)
+        if self._abstract or not field:
+            return
+        # Same expression as normalize_email_sql, so that the lookups of
+        # the records by kw_email_validation.name use it
+        tools.create_index(
+            self.env.cr,
+            f'{self._table}_kw_email_validation_email_normalized_index',
+            self._table,
+            [f'lower(btrim("{field}", E\' \\t\\n\\r\\f\\x0b\'))'])
+
+    @api.depends(lambda self: [
+        'kw_email_validation_id.state',
+        *filter(None, [getattr(self, '_kw_email_validation_field', None)])])
     def _compute_kw_email_validation_state(self):
-        for record in self:
-            if self.kw_email_validation_id:
+        """Read-only batched compute: linked validations are prefetched at
+        once and the emails of unlinked records are looked up with one
+        search, no validation record is created."""
+        ev = self.env['kw.email.validation'].sudo()
+        field = getattr(self, '_kw_email_validation_field', None)
+        unlinked = {}
+        for record in self.sudo():
+            if not record.kw_email_validation_id and field:
+                unlinked[record.id] = ev._normalize_email(record[field])
+
+        names = set(unlinked.values()) - {False}
+        states = {}
+        if names:
+            states = {
+                validation.name: validation.state
+                for validation in ev.search([('name', 'in', list(names))])}
+
+        for record, sudo_record in zip(self, self.sudo()):
+            if sudo_record.kw_email_validation_id:
                 record.kw_email_validation_state = \
-                    self.kw_email_validation_id.state
-                continue
-            record.kw_email_validation_state = \
-                self.env['kw.email.validation'].sudo().get_validation_state(
-                    getattr(record, self._kw_email_validation_field))
+                    sudo_record.kw_email_validation_id.state
+            elif not unlinked.get(record.id):
+                record.kw_email_validation_state = 'invalid'
+            else:
+                record.kw_email_validation_state = states.get(
+                    unlinked[record.id], 'pending')
+
+    def _get_kw_email_validations(self, emails):
+        return self.env['kw.email.validation'].get_validations(
+            emails, priority=self._kw_email_validation_priority,
+            source_model=self._name)
 
     def write(self, vals):
         if self._kw_email_validation_field in vals:
-            ev = self.env['kw.email.validation'].sudo()
-            validation = ev.get_validation(
-                vals.get(self._kw_email_validation_field))
-            vals['kw_email_validation_id'] = (
-                validation.id if validation else False)
+            email = vals.get(self._kw_email_validation_field)
+            validations = self._get_kw_email_validations([email])
+            vals['kw_email_validation_id'] = validations[email].id
         return super().write(vals)
 
     @api.model_create_multi
     def create(self, vals_list):
+        field = self._kw_email_validation_field
+        validations = self._get_kw_email_validations(
+            [vals.get(field) for vals in vals_list if field in vals])
         for vals in vals_list:
-            if self._kw_email_validation_field in vals:
-                ev = self.env['kw.email.validation'].sudo()
-                validation = ev.get_validation(
-                    vals.get(self._kw_email_validation_field))
-                vals['kw_email_validation_id'] = (
-                    validation.id if validation else False)
+            if field in vals:
+                vals['kw_email_validation_id'] = \
+                    validations[vals.get(field)].id
         return super().create(vals_list)
 
     def action_kw_email_validation_validate_email(self):
+        """Queue the emails of the records for the validation worker and
+        return at once, the progress is notified on the bus."""
+        field = getattr(self, '_kw_email_validation_field', None)
+        emails = [record[field] for record in self if field and record[field]]
+        validations = self.env['kw.email.validation'].get_validations(
+            emails, priority=PRIORITY_INTERACTIVE, source_model=self._name)
+        # One write per email instead of one per record
+        relink = defaultdict(list)
         for record in self:
-            email_field = getattr(
-                record, self._kw_email_validation_field, False)
-            if not email_field:
-                continue
-
-            validation = self.env['kw.email.validation'].sudo().get_validation(
-                email_field)
+            validation = validations.get(record[field]) if field else None
+            if validation and record.kw_email_validation_id != validation:
+                relink[validation.id].append(record.id)
+        for validation_id, record_ids in relink.items():
+            self.browse(record_ids).write(
+                {'kw_email_validation_id': validation_id})
 
-            if validation:
-                validation.validate_email()
-                record.kw_email_validation_id = validation.id
+        queued = self.env['kw.email.validation'].sudo().union(
+            *validations.values()).enqueue(priority=PRIORITY_INTERACTIVE)
 
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': _('Email Validation'),
-                'message': _('Email validation process started.'),
+                'message': _(
+                    '%(count)s emails queued for validation, you will be '
+                    'notified of the progress.', count=len(queued)),
                 'sticky': False,
                 'type': 'success',
             }
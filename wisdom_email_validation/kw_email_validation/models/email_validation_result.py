@@ -1,26 +1,90 @@
 import logging
 
-from odoo import models, fields
+from odoo import models, fields, api
 
 _logger = logging.getLogger(__name__)
 
 
 class EmailValidationResult(models.Model):
-    """Stores email validation results for caching and analysis."""
+    """Stores the latest result of each validator for each email, for
+    caching and analysis. Past results are sampled in the history."""
     _name = 'kw.email.validation.result'
     _description = 'Email Validation Result'
 
     name = fields.Char(
-        string='Email Address', )
+        string='Email Address',
+        related='email_id.name', )
     email_id = fields.Many2one(
         comodel_name='kw.email.validation',
         required=True,
         index=True, )
-    is_valid = fields.Boolean(
-        index=True, )
+    is_valid = fields.Boolean()
     validator_id = fields.Many2one(
         comodel_name='kw.email.validator',
         ondelete='cascade',
         required=True, )
     message = fields.Text(
         help='Human-readable validation result', )
+    duration = fields.Float(
+        string='Duration (ms)',
+        help='Time spent by the validator per email, empty for bulk jobs', )
+
+    _sql_constraints = [
+        ('email_validator_uniq', 'UNIQUE(email_id, validator_id)',
+         'A validator has a single result per email!'),
+    ]
+
+    @api.model
+    def _upsert(self, vals_list):
+        """Store results with one query, replacing the previous result of
+        the same validator for the same email. ``create_date`` is the date
+        of the latest check.
+
+        A sample of the results is copied to the history, see
+        ``history_sample_rate`` of the validators.
+
+        Returns:
+            kw.email.validation.result: stored results
+        """
+        latest = {}
+        for vals in vals_list:
+            latest[vals['email_id'], vals['validator_id']] = vals
+        if not latest:
+            return self.browse()
+        rows = list(latest.values())
+
+        self.flush_model()
+        self.env.cr.execute("""
+            INSERT INTO kw_email_validation_result (
+                email_id, validator_id, is_valid, message, duration,
+                create_uid, create_date, write_uid, write_date)
+            SELECT r.email_id, r.validator_id, r.is_valid, r.message,
+                   r.duration, %(uid)s, NOW() AT TIME ZONE 'UTC',
+                   %(uid)s, NOW() AT TIME ZONE 'UTC'
+            FROM unnest(%(email_ids)s::int[], %(validator_ids)s::int[],
+                        %(is_valid)s::bool[], %(messages)s::text[],
+                        %(durations)s::float8[])
+                AS r(email_id, validator_id, is_valid, message, duration)
+            ON CONFLICT (email_id, validator_id) DO UPDATE SET
+                is_valid = EXCLUDED.is_valid,
+                message = EXCLUDED.message,
+                duration = EXCLUDED.duration,
+                create_date = EXCLUDED.create_date,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+            RETURNING id""", {
+            'uid': self.env.uid,
+            'email_ids': [vals['email_id'] for vals in rows],
+            'validator_ids': [vals['validator_id'] for vals in rows],
+            'is_valid': [vals.get('is_valid') for vals in rows],
+            'messages': [vals.get('message') or None for vals in rows],
+            'durations': [vals.get('duration') for vals in rows],
+        })
+        results = self.browse([row[0] for row in self.env.cr.fetchall()])
+        results.invalidate_recordset()
+        self.env['kw.email.validation'].browse(
+            {vals['email_id'] for vals in rows}).invalidate_recordset(
+            ['result_ids'])
+
+        self.env['kw.email.validation.result.history']._sample(rows)
+        return results
@@ -0,0 +1,90 @@
+import logging
+import random
+
+from odoo import models, fields, api
+
+from .email_validator import is_testing
+
+_logger = logging.getLogger(__name__)
+
+
+class EmailValidationResultHistory(models.Model):
+    """Sample of past validation results kept for analysis, purged after
+    the retention period of their validator."""
+    _name = 'kw.email.validation.result.history'
+    _description = 'Email Validation Result History'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    date = fields.Datetime(
+        required=True,
+        index=True,
+        readonly=True,
+        default=fields.Datetime.now, )
+    email_id = fields.Many2one(
+        comodel_name='kw.email.validation',
+        required=True,
+        index=True,
+        readonly=True,
+        ondelete='cascade', )
+    validator_id = fields.Many2one(
+        comodel_name='kw.email.validator',
+        required=True,
+        readonly=True,
+        ondelete='cascade', )
+    is_valid = fields.Boolean(
+        readonly=True, )
+    duration = fields.Float(
+        string='Duration (ms)',
+        readonly=True, )
+
+    @api.model
+    def _sample(self, vals_list):
+        """Copy a share of the results to the history, with one query."""
+        rates = {}
+        for validator in self.env['kw.email.validator'].sudo().browse(
+                {vals['validator_id'] for vals in vals_list}):
+            rates[validator.id] = validator.history_sample_rate
+        rows = [vals for vals in vals_list
+                if random.random() < rates[vals['validator_id']]]
+        if not rows:
+            return
+        self.env.cr.execute("""
+            INSERT INTO kw_email_validation_result_history (
+                date, email_id, validator_id, is_valid, duration)
+            SELECT NOW() AT TIME ZONE 'UTC', r.email_id, r.validator_id,
+                   r.is_valid, r.duration
+            FROM unnest(%s::int[], %s::int[], %s::bool[], %s::float8[])
+                AS r(email_id, validator_id, is_valid, duration)
+        """, [
+            [vals['email_id'] for vals in rows],
+            [vals['validator_id'] for vals in rows],
+            [vals.get('is_valid') for vals in rows],
+            [vals.get('duration') for vals in rows],
+        ])
+
+    @api.model
+    def cron_purge(self, batch_size: int = 10000) -> None:
+        """Delete the history older than the retention period of each
+        validator, in batches committed separately."""
+        self.env['kw.email.validator'].flush_model(['history_retention_days'])
+        self.flush_model()
+        while True:
+            self.env.cr.execute("""
+                DELETE FROM kw_email_validation_result_history
+                WHERE id IN (
+                    SELECT h.id
+                    FROM kw_email_validation_result_history AS h
+                    JOIN kw_email_validator AS v ON v.id = h.validator_id
+                    WHERE v.history_retention_days > 0
+                        AND h.date < NOW() AT TIME ZONE 'UTC'
+                        - MAKE_INTERVAL(days => v.history_retention_days)
+                    LIMIT %s
+                )""", [batch_size])
+            deleted = self.env.cr.rowcount
+            _logger.info('Purged %s validation history rows', deleted)
+            if deleted < batch_size:
+                break
+            if not is_testing():
+                self.env.cr.commit()
+        self.invalidate_model()
@@ -4,6 +4,9 @@ from odoo import models, fields
 
 _logger = logging.getLogger(__name__)
 
+# 'sequence' or 'adaptive', see ``_get_stages``
+RULE_ORDER_PARAM = 'kw_email_validation.rule_order'
+
 
 class EmailValidationRule(models.Model):
     _name = 'kw.email.validation.rule'
@@ -19,3 +22,39 @@ class EmailValidationRule(models.Model):
         default=10, )
     validator_id = fields.Many2one(
         comodel_name='kw.email.validator', )
+    is_parallel = fields.Boolean(
+        string='Run in Parallel',
+        help='Parallel rules are raced on the same emails as a single step, '
+             'it saves time at the cost of calling each of their '
+             'validators', )
+
+    def _get_stages(self):
+        """Return the steps in which the validators of the rules run.
+
+        Rules run in sequence order, or by increasing cost per rejection of
+        their validator when the ``kw_email_validation.rule_order`` system
+        parameter is ``adaptive``. Parallel rules are grouped in the step
+        of the first of them.
+
+        Returns:
+            list: recordsets of validators
+        """
+        rules = self.filtered(
+            lambda r: r.validator_id and not r.validator_id.is_prefilter)
+        order = self.env['ir.config_parameter'].sudo().get_param(
+            RULE_ORDER_PARAM, 'sequence')
+        if order == 'adaptive':
+            ranks = {rule.id: rule.validator_id._get_rank() for rule in rules}
+            rules = rules.sorted(
+                lambda r: (ranks[r.id] is None, ranks[r.id] or 0))
+        stages = []
+        parallel_index = None
+        for rule in rules:
+            if not rule.is_parallel:
+                stages.append(rule.validator_id)
+            elif parallel_index is None:
+                parallel_index = len(stages)
+                stages.append(rule.validator_id)
+            else:
+                stages[parallel_index] |= rule.validator_id
+        return stages
@@ -1,27 +1,143 @@
+import asyncio
+import csv
+import io
 import logging
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import partial
+from typing import NamedTuple, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from odoo import models, fields, exceptions, _
+from odoo import api, models, fields, exceptions, tools, _
+from odoo.tools import config, split_every
 
 _logger = logging.getLogger(__name__)
 
+BULK_API_URLS = {
+    'neverbounce': 'https://api.neverbounce.com/v4/jobs',
+    'zerobounce': 'https://bulkapi.zerobounce.net/v2',
+    'millionverifier': 'https://bulkapi.millionverifier.com/bulkapi/v2',
+    'clearout': 'https://api.clearout.io/v2',
+}
 
-def use_fname(*deco_args):
-    def decorator(func, *aa):
-        def wrapper(*args, **kwargs):
-            self = args[0]
-            self.ensure_one()
-            f = deco_args[0] if deco_args else 'code'
-            fname = f'{func.__name__}_{getattr(self, f)}'
-            if hasattr(self, fname):
-                return getattr(self, fname)(*args[1:], **kwargs)
-            return func(*args, **kwargs)
+# Answers meaning that the provider, not the email, is at fault
+PROVIDER_FAILURE_STATUSES = (401, 403, 429)
 
-        return wrapper
+# Default cost per check of paid providers, in seconds of latency
+PAID_CHECK_COST = 1.0
 
-    return decorator
+# Results of the last days used for the latency and rejection rate
+STATS_WINDOW_DAYS = 7
+# Validators with fewer results keep their sequence in adaptive order
+MIN_STATS_SAMPLES = 20
+MIN_REJECTION_RATE = 0.001
+
+_result_buffer = threading.local()
+_threading = threading.local()
+
+# Worker threads of the process holding a cursor, lazily sized from the
+# connection pool: each of them may also open an independent cursor
+_thread_slots = None
+_thread_slots_lock = threading.Lock()
+
+# Keep-alive HTTP sessions of this worker, by (database, validator id)
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+
+def is_testing():
+    return getattr(threading.current_thread(), 'testing', False)
+
+
+@contextmanager
+def independent_cursor(env):
+    """Yield a cursor committed independently of the current transaction,
+    so that shared state is visible to other workers right away. Tests use
+    the current cursor."""
+    if is_testing():
+        yield env.cr
+        return
+    with env.registry.cursor() as cr:
+        yield cr
+
+
+@contextmanager
+def threaded_validation():
+    """Let the validations of the current thread fan out to worker threads
+    with their own cursors.
+
+    The workers only see committed emails: use it for emails read from the
+    database, e.g. the ones claimed by the validation cron.
+    """
+    previous = getattr(_threading, 'enabled', False)
+    _threading.enabled = True
+    try:
+        yield
+    finally:
+        _threading.enabled = previous
+
+
+def use_threads():
+    return getattr(_threading, 'enabled', False) and not is_testing()
+
+
+@contextmanager
+def thread_slot():
+    """Wait for one of the worker thread slots of the process, so that
+    validations do not exhaust the connection pool."""
+    global _thread_slots
+    with _thread_slots_lock:
+        if _thread_slots is None:
+            _thread_slots = threading.BoundedSemaphore(
+                max(1, config['db_maxconn'] // 4))
+    with _thread_slots:
+        yield
+
+
+@contextmanager
+def collect_results():
+    """Buffer the values passed to ``store_result`` in the current thread
+    instead of creating one result record per call."""
+    previous = getattr(_result_buffer, 'vals_list', None)
+    _result_buffer.vals_list = vals_list = []
+    try:
+        yield vals_list
+    finally:
+        _result_buffer.vals_list = previous
+
+
+class ValidatorBackend(NamedTuple):
+    """Declaration of a validation backend, see
+    ``kw.email.validator._get_backends``.
+
+    Methods are given by name and looked up on ``kw.email.validator``:
+
+    - ``validate_many(emails, **kwargs)`` returns ``{email_id: is_valid}``,
+      ``is_valid`` is None for the emails that could not be checked
+    - ``validate_many_async`` is a coroutine method with the same contract,
+      preferred when set
+    - ``validate_one(email, **kwargs)`` returns ``is_valid``, batches are
+      fanned out to ``max_concurrency`` threads if there is no
+      ``validate_many``
+    - ``bulk_submit(emails)`` and ``bulk_fetch(job)`` implement the bulk
+      jobs of the provider
+
+    ``rate_limit`` and ``cost`` are the defaults of new validators.
+    """
+    validate_many: Optional[str] = None
+    validate_many_async: Optional[str] = None
+    validate_one: Optional[str] = None
+    bulk_submit: Optional[str] = None
+    bulk_fetch: Optional[str] = None
+    rate_limit: float = 0.0
+    cost: float = 0.0
 
 
 class EmailValidator(models.Model):
@@ -41,34 +157,773 @@ class EmailValidator(models.Model):
         related='api_key', )
     is_api_key_visible = fields.Boolean(
         store=False, )
+    max_concurrency = fields.Integer(
+        default=4,
+        help='Maximum number of parallel workers used to validate a batch '
+             'of emails. Use 1 to validate them one by one.', )
+    result_ttl_days = fields.Integer(
+        string='Result Freshness (days)',
+        default=30,
+        help='Emails with a result of this validator newer than this '
+             'number of days are not validated again. Use 0 to always '
+             'validate.', )
+    history_sample_rate = fields.Float(
+        string='History Sampling',
+        default=0.0,
+        help='Share of the results also kept in the history, from 0 (only '
+             'the latest result per email) to 1 (every result)', )
+    history_retention_days = fields.Integer(
+        string='History Retention (days)',
+        default=90,
+        help='History older than this number of days is purged. Use 0 to '
+             'keep it forever.', )
+
+    is_prefilter = fields.Boolean(
+        string='Pre-filter',
+        help='Check whole batches in process before the validation rules '
+             'and reject invalid emails at once. Validation rules using '
+             'this validator are skipped.', )
+    reject_disposable = fields.Boolean(
+        string='Reject Disposable Domains', )
+    disposable_domains = fields.Text(
+        help='Disposable email domains, one per line', )
+    reject_role_accounts = fields.Boolean(
+        string='Reject Role Accounts', )
+    role_accounts = fields.Text(
+        help='Local parts of role accounts (admin, info...), one per line', )
+
+    access_token = fields.Char(
+        copy=False,
+        groups='base.group_system',
+        help='OAuth access token shared by all workers', )
+    access_token_expiry = fields.Datetime(
+        copy=False,
+        groups='base.group_system', )
+
+    http_pool_size = fields.Integer(
+        string='Connection Pool Size',
+        default=10,
+        help='Maximum number of keep-alive connections per host kept by '
+             'each worker', )
+    http_timeout = fields.Integer(
+        string='Timeout (s)',
+        default=30, )
+    http_max_retries = fields.Integer(
+        string='Retries',
+        default=2,
+        help='Number of retries of idempotent requests on connection '
+             'errors and 5xx responses, sent requests are not retried on '
+             'read timeouts', )
+    http_backoff_factor = fields.Float(
+        string='Retry Backoff Factor',
+        default=0.5,
+        help='Retries wait backoff factor * 2 ^ (retry number - 1) '
+             'seconds', )
+    http_request_count = fields.Integer(
+        string='Requests',
+        compute='_compute_http_stats',
+        help='HTTP requests sent by the current worker', )
+    http_connection_count = fields.Integer(
+        string='Connections',
+        compute='_compute_http_stats',
+        help='HTTP connections opened by the current worker', )
+
+    use_bulk_api = fields.Boolean(
+        string='Use Bulk API',
+        help='Submit batches of emails as a single job to the provider, '
+             'results are fetched by a scheduled action.', )
+    is_bulk_api_available = fields.Boolean(
+        compute='_compute_is_bulk_api_available', )
+    bulk_url = fields.Char(
+        string='Bulk API URL',
+        help='Leave empty to use the provider default URL', )
+    bulk_threshold = fields.Integer(
+        default=100,
+        help='Minimal number of emails to submit a bulk job, smaller '
+             'batches are validated one by one.', )
+    bulk_batch_size = fields.Integer(
+        default=10000,
+        help='Maximal number of emails per bulk job', )
+    job_ids = fields.One2many(
+        comodel_name='kw.email.validation.job',
+        inverse_name='validator_id',
+        string='Bulk Jobs',
+        readonly=True, )
+
+    rate_limit = fields.Float(
+        string='Rate Limit (req/s)',
+        help='Maximum number of API calls per second shared by all '
+             'workers. Use 0 for no limit.', )
+    rate_burst = fields.Integer(
+        string='Burst',
+        default=10,
+        help='Number of API calls that may be made at once after an idle '
+             'period', )
+    breaker_threshold = fields.Integer(
+        string='Failures to Open Circuit',
+        default=5,
+        help='Consecutive provider failures (timeouts, connection errors, '
+             '5xx, 429...) after which calls are not made anymore during '
+             'the cool-down. Use 0 to disable the circuit breaker.', )
+    breaker_cooldown = fields.Integer(
+        string='Cool-down (s)',
+        default=60,
+        help='Seconds during which an open circuit fails fast before a '
+             'single call probes the provider again', )
+    breaker_state = fields.Selection(
+        selection=[
+            ('closed', 'Closed'),
+            ('open', 'Open'),
+        ],
+        string='Circuit',
+        compute='_compute_breaker_state', )
+    breaker_failures = fields.Integer(
+        string='Consecutive Failures',
+        compute='_compute_breaker_state', )
+
+    check_cost = fields.Float(
+        string='Cost per Check',
+        help='Price of one check expressed in the seconds of latency it is '
+             'worth, used by the adaptive rule order', )
+    stat_latency = fields.Float(
+        string='Avg. Latency (ms)',
+        readonly=True, )
+    stat_rejection_rate = fields.Float(
+        string='Rejection Rate',
+        readonly=True, )
+    stat_sample_count = fields.Integer(
+        string='Results Sampled',
+        readonly=True, )
 
     _sql_constraints = [
         ('name_uniq', 'UNIQUE(name)', 'Validator name must be unique!'), ]
 
+    def init(self):
+        # Rate limiter and circuit breaker state shared by all workers,
+        # unlogged as it is rebuilt from scratch after a crash
+        self.env.cr.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS kw_email_validator_throttle (
+                validator_id INTEGER PRIMARY KEY
+                    REFERENCES kw_email_validator (id) ON DELETE CASCADE,
+                tokens DOUBLE PRECISION NOT NULL DEFAULT 0,
+                refill_date TIMESTAMP,
+                failures INTEGER NOT NULL DEFAULT 0,
+                open_until TIMESTAMP
+            )""")
+
+    def _compute_breaker_state(self):
+        states = {}
+        if self.ids:
+            self.env.cr.execute("""
+                SELECT validator_id, failures,
+                       open_until > CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'
+                FROM kw_email_validator_throttle
+                WHERE validator_id = ANY(%s)""", [self.ids])
+            states = {row[0]: row[1:] for row in self.env.cr.fetchall()}
+        for obj in self:
+            failures, is_open = states.get(obj.id, (0, False))
+            obj.breaker_failures = failures
+            obj.breaker_state = 'open' if is_open else 'closed'
+
+    def action_reset_breaker(self):
+        with independent_cursor(self.env) as cr:
+            cr.execute("""
+                UPDATE kw_email_validator_throttle
+                SET failures = 0, open_until = NULL
+                WHERE validator_id = ANY(%s)""", [self.ids])
+
+    @api.model
+    def cron_update_stats(self) -> None:
+        """Compute the latency and rejection rate of the validators from
+        their recent results."""
+        self.env['kw.email.validation.result'].flush_model()
+        self.env.cr.execute("""
+            SELECT validator_id, COUNT(*), COALESCE(AVG(duration), 0),
+                   AVG(CASE WHEN is_valid THEN 0 ELSE 1 END)
+            FROM kw_email_validation_result
+            WHERE create_date >= %s
+            GROUP BY validator_id""",
+            [fields.Datetime.now() - timedelta(days=STATS_WINDOW_DAYS)])
+        stats = {row[0]: row[1:] for row in self.env.cr.fetchall()}
+        for validator in self.with_context(active_test=False).search([]):
+            count, latency, rate = stats.get(validator.id, (0, 0, 0))
+            validator.write({
+                'stat_sample_count': count,
+                'stat_latency': latency,
+                'stat_rejection_rate': rate,
+            })
+
+    def _get_rank(self):
+        """Return the expected cost, in seconds, to reject one email with
+        this validator, or None without enough statistics.
+
+        Running filters by increasing cost per rejection minimises the mean
+        cost per email, as every rule has to pass anyway.
+        """
+        self.ensure_one()
+        if self.stat_sample_count < MIN_STATS_SAMPLES:
+            return None
+        return ((self.stat_latency / 1000.0 + self.check_cost)
+                / max(self.stat_rejection_rate, MIN_REJECTION_RATE))
+
+    @api.model
+    def _get_backends(self):
+        """Return the registry of validation backends, modules add their
+        backends by extending this method.
+
+        Returns:
+            dict: ``{validator name: ValidatorBackend}``
+        """
+        def http(name, bulk=False, **kwargs):
+            return ValidatorBackend(
+                validate_one=f'validate_email_{name}',
+                bulk_submit=f'_bulk_submit_{name}' if bulk else None,
+                bulk_fetch=f'_bulk_fetch_{name}' if bulk else None,
+                cost=PAID_CHECK_COST, **kwargs)
+
+        return {
+            'regexp': ValidatorBackend(
+                validate_many='_validate_many_regexp',
+                validate_one='validate_email_regexp'),
+            'neverbounce': http('neverbounce', bulk=True),
+            'quickemailverification': http('quickemailverification'),
+            'millionverifier': http('millionverifier', bulk=True),
+            'sendpulse': http('sendpulse'),
+            'zerobounce': http('zerobounce', bulk=True),
+            'clearout': http('clearout', bulk=True),
+            'mailercheck': http('mailercheck'),
+            'mailgun': http('mailgun'),
+        }
+
+    def _get_backend(self):
+        self.ensure_one()
+        return self._get_backends().get(self.name, ValidatorBackend())
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        backends = self._get_backends()
+        for vals in vals_list:
+            backend = backends.get(vals.get('name'))
+            if backend:
+                vals.setdefault('rate_limit', backend.rate_limit)
+                vals.setdefault('check_cost', backend.cost)
+        return super().create(vals_list)
+
+    def _compute_is_bulk_api_available(self):
+        for obj in self:
+            obj.is_bulk_api_available = bool(obj._get_backend().bulk_submit)
+
+    def _compute_http_stats(self):
+        for obj in self:
+            stats = obj.get_http_stats()
+            obj.http_request_count = stats['requests']
+            obj.http_connection_count = stats['connections']
+
     def show_api_key(self):
         self.update({'is_api_key_visible': True})
 
     def hide_api_key(self):
         self.update({'is_api_key_visible': False})
 
-    @use_fname('name')
     def validate_email(self, email, **kwargs):
+        """Validate one email with the backend of the validator, emails
+        are valid for validators without backend.
+
+        Returns:
+            bool: validity, None if the email could not be checked
+        """
+        backend = self._get_backend()
+        if backend.validate_one:
+            return getattr(self, backend.validate_one)(email, **kwargs)
+        if backend.validate_many or backend.validate_many_async:
+            return self.validate_emails(email, **kwargs)[email.id]
         return True
 
+    @tools.ormcache('validator_id', 'write_date')
+    def _get_prefilter_config(self, validator_id, write_date):
+        """Return the compiled pattern, disposable domains and role
+        accounts of a validator, cached until the validator is written."""
+        validator = self.browse(validator_id)
+
+        def lines(text):
+            return frozenset(
+                line.strip().lower() for line in (text or '').splitlines()
+                if line.strip())
+
+        return (
+            re.compile(validator.regexp) if validator.regexp else None,
+            lines(validator.disposable_domains)
+            if validator.reject_disposable else frozenset(),
+            lines(validator.role_accounts)
+            if validator.reject_role_accounts else frozenset(),
+        )
+
+    def _get_regexp_pattern(self):
+        self.ensure_one()
+        return self._get_prefilter_config(self.id, self.write_date)[0]
+
+    def prefilter_emails(self, emails):
+        """Check the syntax, domain and local part of emails in process.
+
+        Returns:
+            dict: ``{email_id: message}`` of the rejected emails
+        """
+        self.ensure_one()
+        pattern, disposable, roles = self._get_prefilter_config(
+            self.id, self.write_date)
+        rejected = {}
+        for email_id, address in zip(emails.ids, emails.mapped('name')):
+            local, _sep, domain = address.rpartition('@')
+            if len(address) > 254 or len(local) > 64 or '..' in address \
+                    or (pattern and not pattern.match(address)):
+                rejected[email_id] = _('Invalid syntax')
+            elif domain in disposable:
+                rejected[email_id] = _('Disposable domain')
+            elif local.split('+')[0] in roles:
+                rejected[email_id] = _('Role account')
+        return rejected
+
+    def _get_http_session(self):
+        """Return the keep-alive session of this validator in the current
+        worker, it is rebuilt when the connection settings change."""
+        self.ensure_one()
+        key = (self.env.cr.dbname, self.id)
+        settings = (self.http_pool_size, self.max_concurrency,
+                    self.http_max_retries, self.http_backoff_factor)
+        with _http_sessions_lock:
+            session, session_settings = _http_sessions.get(key, (None, None))
+            if session is not None and session_settings == settings:
+                return session
+            if session is not None:
+                session.close()
+
+            # Only idempotent methods are retried (urllib3 defaults) and
+            # never after a read timeout: a POST may have been charged by
+            # the provider. 429 is left to the rate limiter and the
+            # circuit breaker rather than sleeping on Retry-After.
+            retry = Retry(
+                total=max(self.http_max_retries, 0),
+                read=0,
+                backoff_factor=self.http_backoff_factor,
+                status_forcelist=(500, 502, 503, 504),
+                raise_on_status=False, )
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=max(self.http_pool_size, self.max_concurrency,
+                                 1),
+                max_retries=retry, )
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_sessions[key] = (session, settings)
+            return session
+
+    def get_http_stats(self):
+        """Connection reuse counters of this validator in the current
+        worker.
+
+        Returns:
+            dict: numbers of ``requests`` sent and ``connections`` opened
+        """
+        self.ensure_one()
+        stats = {'requests': 0, 'connections': 0}
+        session, __ = _http_sessions.get(
+            (self.env.cr.dbname, self.id), (None, None))
+        if session is None:
+            return stats
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    stats['requests'] += pool.num_requests
+                    stats['connections'] += pool.num_connections
+        return stats
+
+    def _acquire_call(self):
+        """Take a token from the bucket of the validator shared by all
+        workers.
+
+        Without rate limit only the circuit is read, without locking: its
+        row only exists once a call has failed.
+
+        Returns:
+            float: 0 if the call may be made, else the number of seconds
+                   to wait for a token, or None while the circuit is open
+        """
+        self.ensure_one()
+        with independent_cursor(self.env) as cr:
+            if self.rate_limit <= 0:
+                cr.execute("""
+                    SELECT EXTRACT(EPOCH FROM open_until
+                                   - CLOCK_TIMESTAMP() AT TIME ZONE 'UTC')
+                    FROM kw_email_validator_throttle
+                    WHERE validator_id = %s""", [self.id])
+                row = cr.fetchone()
+                if not row or row[0] is None:
+                    return 0
+                if row[0] > 0 or not self._claim_probe(cr):
+                    return None
+                return 0
+
+            cr.execute("""
+                INSERT INTO kw_email_validator_throttle (
+                    validator_id, tokens, refill_date)
+                VALUES (%s, %s, CLOCK_TIMESTAMP() AT TIME ZONE 'UTC')
+                ON CONFLICT (validator_id) DO NOTHING""",
+                [self.id, max(self.rate_burst, 1)])
+            cr.execute("""
+                SELECT tokens,
+                       EXTRACT(EPOCH FROM CLOCK_TIMESTAMP()
+                               AT TIME ZONE 'UTC' - refill_date),
+                       EXTRACT(EPOCH FROM open_until
+                               - CLOCK_TIMESTAMP() AT TIME ZONE 'UTC')
+                FROM kw_email_validator_throttle
+                WHERE validator_id = %s
+                FOR UPDATE""", [self.id])
+            tokens, elapsed, open_for = cr.fetchone()
+            if open_for is not None and open_for > 0:
+                return None
+
+            if elapsed is None:
+                # Row created by a failure, the bucket was never used
+                tokens = max(self.rate_burst, 1)
+            tokens = min(max(self.rate_burst, 1),
+                         float(tokens or 0)
+                         + float(elapsed or 0) * self.rate_limit)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate_limit
+            if not wait:
+                tokens -= 1
+                # Half-open: the probe is charged like any other call
+                if open_for is not None:
+                    self._claim_probe(cr)
+            cr.execute("""
+                UPDATE kw_email_validator_throttle
+                SET tokens = %s,
+                    refill_date = CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'
+                WHERE validator_id = %s""", [tokens, self.id])
+            return wait
+
+    def _claim_probe(self, cr):
+        """Let this call probe the provider once the circuit cooldown is
+        over, the other calls keep failing fast until it succeeds.
+
+        Returns:
+            bool: False if another call already probes the provider
+        """
+        cr.execute("""
+            UPDATE kw_email_validator_throttle
+            SET open_until = CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'
+                + MAKE_INTERVAL(secs => %s)
+            WHERE validator_id = %s
+                AND open_until <= CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'""",
+            [self.breaker_cooldown, self.id])
+        return bool(cr.rowcount)
+
+    def _record_call(self, success):
+        """Update the circuit breaker with the outcome of a call."""
+        self.ensure_one()
+        if self.breaker_threshold <= 0:
+            return
+        with independent_cursor(self.env) as cr:
+            if success:
+                cr.execute("""
+                    UPDATE kw_email_validator_throttle
+                    SET failures = 0, open_until = NULL
+                    WHERE validator_id = %s
+                        AND (failures > 0 OR open_until IS NOT NULL)""",
+                    [self.id])
+                return
+            cr.execute("""
+                INSERT INTO kw_email_validator_throttle AS t (
+                    validator_id, failures, open_until)
+                VALUES (%(id)s, 1, CASE
+                    WHEN %(threshold)s <= 1
+                    THEN CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'
+                        + MAKE_INTERVAL(secs => %(cooldown)s) END)
+                ON CONFLICT (validator_id) DO UPDATE SET
+                    failures = t.failures + 1,
+                    open_until = CASE
+                        WHEN t.failures + 1 >= %(threshold)s
+                        THEN CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'
+                            + MAKE_INTERVAL(secs => %(cooldown)s)
+                        ELSE t.open_until END""", {
+                'id': self.id,
+                'threshold': self.breaker_threshold,
+                'cooldown': self.breaker_cooldown,
+            })
+
+    def _call_provider(self, send):
+        """Call the provider API through the rate limiter and the circuit
+        breaker of the validator.
+
+        Args:
+            send: callable making the HTTP request
+
+        Returns:
+            requests.Response: or None if the provider is unavailable,
+                               the email must then stay pending
+        """
+        self.ensure_one()
+        if self.rate_limit > 0 or self.breaker_threshold > 0:
+            deadline = time.monotonic() + self.http_timeout
+            wait = self._acquire_call()
+            while wait:
+                if time.monotonic() + wait > deadline:
+                    _logger.info('Rate limit of %s reached', self.name)
+                    return None
+                time.sleep(wait)
+                wait = self._acquire_call()
+            if wait is None:
+                _logger.debug('Circuit of %s is open', self.name)
+                return None
+
+        try:
+            res = send()
+        except requests.RequestException as e:
+            _logger.warning('%s is unavailable: %s', self.name, e)
+            self._record_call(False)
+            return None
+        if res.status_code >= 500 \
+                or res.status_code in PROVIDER_FAILURE_STATUSES:
+            _logger.warning('%s answered %s', self.name, res.status_code)
+            self._record_call(False)
+            return None
+        self._record_call(True)
+        return res
+
+    def _http_request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.http_timeout)
+        return self._get_http_session().request(method, url, **kwargs)
+
+    def _get_access_token(self, fetch_token):
+        """Return the cached OAuth token of the validator.
+
+        The token is stored on the validator so that it is shared by all
+        workers. Refresh is single-flight: the worker refreshing the token
+        holds an advisory lock of the validator, the others wait for the
+        lock and reuse the new token. No row is locked while the provider
+        is called, the calls record their outcome in
+        ``kw_email_validator_throttle`` whose foreign key reads the row.
+
+        Args:
+            fetch_token: callable returning ``(token, expires_in)``
+
+        Returns:
+            str: token or None if it could not be obtained
+        """
+        self.ensure_one()
+        validator = self.sudo()
+        if (validator.access_token and validator.access_token_expiry
+                and validator.access_token_expiry > fields.Datetime.now()):
+            return validator.access_token
+
+        with independent_cursor(self.env) as lock_cr:
+            lock_cr.execute(
+                "SELECT pg_advisory_xact_lock(hashtext(%s), %s)",
+                ['kw_email_validator_token', self.id])
+            # Own cursor, its snapshot sees the token stored by the worker
+            # that held the lock before
+            with independent_cursor(self.env) as cr:
+                cr.execute("""
+                    SELECT access_token, access_token_expiry
+                    FROM kw_email_validator
+                    WHERE id = %s""", [self.id])
+                token, expiry = cr.fetchone()
+            if not token or not expiry or expiry <= fields.Datetime.now():
+                token, expires_in = fetch_token()
+                if not token:
+                    return None
+                # Refresh a bit before the provider expires the token
+                expiry = fields.Datetime.now() + timedelta(
+                    seconds=max(int(expires_in or 3600) - 60, 0))
+                with independent_cursor(self.env) as cr:
+                    cr.execute("""
+                        UPDATE kw_email_validator
+                        SET access_token = %s, access_token_expiry = %s
+                        WHERE id = %s""", [token, expiry, self.id])
+        self.invalidate_recordset(['access_token', 'access_token_expiry'])
+        return token
+
+    def _reset_access_token(self):
+        with independent_cursor(self.env) as cr:
+            cr.execute("""
+                UPDATE kw_email_validator
+                SET access_token = NULL, access_token_expiry = NULL
+                WHERE id = %s""", [self.id])
+        self.invalidate_recordset(['access_token', 'access_token_expiry'])
+
+    def validate_emails(self, emails, **kwargs):
+        """Validate a recordset of emails.
+
+        Backends declaring ``validate_many`` or ``validate_many_async`` check
+        the whole batch at once, otherwise the per-email method is fanned
+        out to up to ``max_concurrency`` worker threads when threads are
+        allowed, see ``threaded_validation``.
+
+        Returns:
+            dict: ``{email_id: is_valid}`` where ``is_valid`` is None if
+                  the email could not be checked
+        """
+        backend = self._get_backend()
+        if backend.validate_many_async:
+            return self._run_async(getattr(
+                self, backend.validate_many_async)(emails, **kwargs))
+        if backend.validate_many:
+            return getattr(self, backend.validate_many)(emails, **kwargs)
+        if self.max_concurrency <= 1 or len(emails) <= 1 \
+                or not use_threads():
+            return {email.id: self.validate_email(email, **kwargs)
+                    for email in emails}
+        return self._validate_emails_concurrent(emails, **kwargs)
+
+    @staticmethod
+    def _run_async(awaitable):
+        """Run the coroutine of an async backend from the synchronous ORM
+        code, in the calling thread."""
+        return asyncio.run(awaitable)
+
+    def _validate_emails_concurrent(self, emails, **kwargs):
+        self.ensure_one()
+        workers = min(self.max_concurrency, len(emails))
+        chunks = [emails.ids[i::workers] for i in range(workers)]
+        results = {}
+        vals_list = []
+        with ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix=f'kw_email_validator_{self.id}',
+        ) as executor:
+            for chunk_results, chunk_vals_list in executor.map(
+                    lambda ids: self._validate_emails_chunk(ids, **kwargs),
+                    chunks):
+                results.update(chunk_results)
+                vals_list += chunk_vals_list
+        self._create_results(vals_list)
+        return results
+
+    def _validate_emails_chunk(self, email_ids, **kwargs):
+        """Validate emails in a worker thread with a dedicated cursor.
+
+        The emails must be committed to be visible from the worker, results
+        are returned to the caller instead of being written.
+        """
+        results = {}
+        with thread_slot(), self.env.registry.cursor() as cr, \
+                collect_results() as vals_list:
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            validator = self.with_env(env)
+            for email in env['kw.email.validation'].browse(email_ids):
+                try:
+                    results[email.id] = validator.validate_email(
+                        email, **kwargs)
+                except Exception as e:
+                    _logger.warning('Error validating %s with %s: %s',
+                                    email.name, self.name, e)
+                    results[email.id] = None
+            cr.rollback()
+        return results, vals_list
+
+    def _check_emails(self, email_ids, use_bulk=True):
+        """Return the verdicts of this validator, reusing its fresh
+        results, submitting bulk jobs or validating the other emails.
+
+        The time spent is stored on the buffered results as the duration
+        per email.
+
+        Returns:
+            dict: ``{email_id: is_valid}`` where ``is_valid`` is None if
+                  the email could not be checked yet
+        """
+        self.ensure_one()
+        results = self._get_fresh_results(email_ids)
+        to_check = self.env['kw.email.validation'].browse(
+            [i for i in email_ids if i not in results])
+        if not to_check:
+            return results
+        if use_bulk and self._use_bulk_api(len(to_check)):
+            # The job resumes the next rules once its results are fetched
+            self._submit_bulk_jobs(to_check)
+            return results
+
+        buffer = getattr(_result_buffer, 'vals_list', None)
+        start = len(buffer) if buffer is not None else 0
+        started = time.monotonic()
+        results.update(self.validate_emails(to_check))
+        duration = (time.monotonic() - started) * 1000 / len(to_check)
+        for vals in (buffer or [])[start:]:
+            if vals['validator_id'] == self.id:
+                vals.setdefault('duration', duration)
+        return results
+
+    def _check_emails_isolated(self, email_ids):
+        """Run ``_check_emails`` in a worker thread with a dedicated
+        cursor, results are returned to the caller instead of being
+        written."""
+        with thread_slot(), self.env.registry.cursor() as cr, \
+                collect_results() as vals_list:
+            validator = self.with_env(
+                api.Environment(cr, self.env.uid, self.env.context))
+            try:
+                results = validator._check_emails(email_ids, use_bulk=False)
+            except Exception as e:
+                _logger.warning('Error validating with %s: %s', self.name, e)
+                results = {}
+            cr.rollback()
+        return results, vals_list
+
+    def _get_fresh_results(self, email_ids):
+        """Return the latest results newer than the freshness window.
+
+        Returns:
+            dict: ``{email_id: is_valid}``
+        """
+        self.ensure_one()
+        if self.result_ttl_days <= 0 or not email_ids:
+            return {}
+        self.env['kw.email.validation.result'].flush_model()
+        self.env.cr.execute("""
+            SELECT email_id, is_valid
+            FROM kw_email_validation_result
+            WHERE validator_id = %s
+                AND email_id = ANY(%s)
+                AND create_date >= %s
+        """, [self.id, list(email_ids),
+              fields.Datetime.now() - timedelta(days=self.result_ttl_days)])
+        return dict(self.env.cr.fetchall())
+
     def store_result(self, email, is_valid, **kwargs):
         self.ensure_one()
-        return self.env['kw.email.validation.result'].sudo().create({
-            'name': email.name,
+        vals = {
             'email_id': email.id,
             'validator_id': self.id,
             'is_valid': is_valid,
-            'message': kwargs.get('message')
-        })
+            'message': kwargs.get('message'),
+        }
+        vals_list = getattr(_result_buffer, 'vals_list', None)
+        if vals_list is not None:
+            vals_list.append(vals)
+            return self.env['kw.email.validation.result']
+        return self.env['kw.email.validation.result']._upsert([vals])
+
+    @api.model
+    def _create_results(self, vals_list):
+        buffer = getattr(_result_buffer, 'vals_list', None)
+        if buffer is not None:
+            buffer += vals_list
+            return self.env['kw.email.validation.result']
+        return self.env['kw.email.validation.result']._upsert(vals_list)
 
     def validate_email_regexp(self, email, **kwargs):
-        is_valid = bool(re.match(fr'{self.regexp}', email.name))
-        self.store_result(email, is_valid)
-        return is_valid
+        return self._validate_many_regexp(email, **kwargs)[email.id]
+
+    def _validate_many_regexp(self, emails, **kwargs):
+        pattern = self._get_regexp_pattern()
+        results = {}
+        for email in emails:
+            is_valid = not pattern or bool(pattern.match(email.name))
+            self.store_result(email, is_valid)
+            results[email.id] = is_valid
+        return results
 
     # pylint: disable=too-many-branches
     def _validate_email_url_api_generic(
@@ -87,7 +942,8 @@ class EmailValidator(models.Model):
                 - params: URL parameters for GET request
 
         Returns:
-            bool: True if email is valid, False otherwise
+            bool: True if email is valid, False otherwise, None if the
+                  provider is unavailable
         """
         if not self.api_key:
             raise exceptions.ValidationError(_(
@@ -125,14 +981,18 @@ class EmailValidator(models.Model):
                 data = {'email': email.name}
 
             # Execute request based on method
+            session = self._get_http_session()
             if method == 'GET':
-                res = requests.get(
-                    url, params=params, headers=headers,
-                    auth=auth, timeout=30)
+                send = partial(
+                    session.get, url, params=params, headers=headers,
+                    auth=auth, timeout=self.http_timeout)
             else:  # POST
-                res = requests.post(
-                    url, json=data, headers=headers,
-                    auth=auth, timeout=30)
+                send = partial(
+                    session.post, url, json=data, headers=headers,
+                    auth=auth, timeout=self.http_timeout)
+            res = self._call_provider(send)
+            if res is None:
+                return None
 
             is_valid = False
             if res.status_code == 200:
@@ -174,6 +1034,228 @@ class EmailValidator(models.Model):
             **kwargs
         )
 
+    def _use_bulk_api(self, count):
+        self.ensure_one()
+        return (self.use_bulk_api and self.is_bulk_api_available
+                and count >= self.bulk_threshold)
+
+    def _submit_bulk_jobs(self, emails):
+        """Submit emails to the provider bulk API.
+
+        Emails already waiting for a job are skipped, emails of a batch
+        that could not be submitted stay pending.
+
+        Returns:
+            kw.email.validation.job: submitted jobs
+        """
+        self.ensure_one()
+        jobs = self.env['kw.email.validation.job'].sudo()
+        emails = emails.filtered(lambda e: not e.job_id)
+        for batch in split_every(self.bulk_batch_size, emails.ids,
+                                 emails.browse):
+            try:
+                reference = self._bulk_submit(batch)
+            except Exception as e:
+                _logger.warning('Error submitting bulk job to %s: %s',
+                                self.name, e)
+                continue
+            job = jobs.create({
+                'name': reference,
+                'validator_id': self.id,
+                'email_count': len(batch),
+            })
+            batch.write({'job_id': job.id})
+            jobs |= job
+        return jobs
+
+    def _bulk_submit(self, emails):
+        """Submit emails as a job, returns the provider job reference."""
+        backend = self._get_backend()
+        if not backend.bulk_submit:
+            raise exceptions.UserError(_(
+                'Validator {name} does not support bulk jobs'
+                '').format(name=self.name))
+        return getattr(self, backend.bulk_submit)(emails)
+
+    def _bulk_fetch(self, job):
+        """Fetch job results.
+
+        Returns:
+            dict: ``{email: is_valid}`` or None if the job is not
+                  finished yet
+        """
+        backend = self._get_backend()
+        if not backend.bulk_fetch:
+            raise exceptions.UserError(_(
+                'Validator {name} does not support bulk jobs'
+                '').format(name=self.name))
+        return getattr(self, backend.bulk_fetch)(job)
+
+    def _get_bulk_url(self, path):
+        base_url = self.bulk_url or BULK_API_URLS.get(self.name)
+        if not base_url:
+            raise exceptions.UserError(_(
+                'Bulk API URL is required to use validator {name}'
+                '').format(name=self.name))
+        return f'{base_url.rstrip("/")}/{path}'
+
+    def _bulk_request(self, method, url, **kwargs):
+        if not self.api_key:
+            raise exceptions.ValidationError(_(
+                'API key is required to use validator {name}'
+                '').format(name=self.name))
+        res = self._http_request(method, url, **kwargs)
+        res.raise_for_status()
+        return res
+
+    @staticmethod
+    def _bulk_csv(emails):
+        return '\n'.join(emails.mapped('name')).encode()
+
+    @staticmethod
+    def _bulk_parse_csv(content, status_columns, valid_statuses):
+        """Parse a result file with a header row.
+
+        Args:
+            content: CSV text
+            status_columns: lowercase names of the status column
+            valid_statuses: lowercase statuses of deliverable emails
+
+        Returns:
+            dict: ``{email: is_valid}``
+        """
+        rows = [row for row in csv.reader(io.StringIO(content)) if row]
+        if not rows:
+            return {}
+        header = [column.strip().lower() for column in rows[0]]
+        status_index = next(
+            (i for i, column in enumerate(header)
+             if column in status_columns), None)
+        if status_index is None:
+            raise exceptions.UserError(_('Unexpected result file format'))
+        email_index = next(
+            (i for i, column in enumerate(header)
+             if column in ('email', 'email address')), 0)
+        return {
+            row[email_index].strip().lower():
+                row[status_index].strip().lower() in valid_statuses
+            for row in rows[1:]
+            if len(row) > max(email_index, status_index)}
+
+    def _bulk_submit_neverbounce(self, emails):
+        res = self._bulk_request('POST', self._get_bulk_url('create'), json={
+            'key': self.api_key,
+            'input_location': 'supplied',
+            'input': [{'email': email.name} for email in emails],
+            'auto_parse': True,
+            'auto_start': True,
+        }).json()
+        if res.get('status') != 'success':
+            raise exceptions.UserError(res.get('message') or str(res))
+        return str(res['job_id'])
+
+    def _bulk_fetch_neverbounce(self, job):
+        params = {'key': self.api_key, 'job_id': job.name}
+        res = self._bulk_request(
+            'GET', self._get_bulk_url('status'), params=params).json()
+        if res.get('job_status') == 'failed':
+            raise exceptions.UserError(res.get('failure_reason') or str(res))
+        if res.get('job_status') != 'complete':
+            return None
+
+        results = {}
+        page = 1
+        while True:
+            res = self._bulk_request(
+                'GET', self._get_bulk_url('results'),
+                params=dict(params, page=page, items_per_page=1000)).json()
+            for item in res.get('results', []):
+                email = item.get('data', {}).get('email', '').lower()
+                results[email] = item.get(
+                    'verification', {}).get('result') == 'valid'
+            if page >= res.get('total_pages', 1):
+                return results
+            page += 1
+
+    def _bulk_submit_zerobounce(self, emails):
+        res = self._bulk_request(
+            'POST', self._get_bulk_url('sendfile'),
+            data={
+                'api_key': self.api_key,
+                'email_address_column': 1,
+                'has_header_row': 'false',
+            },
+            files={'file': ('emails.csv', self._bulk_csv(emails),
+                            'text/csv')}).json()
+        if not res.get('success'):
+            raise exceptions.UserError(res.get('message') or str(res))
+        return res['file_id']
+
+    def _bulk_fetch_zerobounce(self, job):
+        params = {'api_key': self.api_key, 'file_id': job.name}
+        res = self._bulk_request(
+            'GET', self._get_bulk_url('filestatus'), params=params).json()
+        file_status = (res.get('file_status') or '').lower()
+        if 'error' in file_status or 'deleted' in file_status:
+            raise exceptions.UserError(res.get('error_reason') or str(res))
+        if file_status != 'complete':
+            return None
+        res = self._bulk_request(
+            'GET', self._get_bulk_url('getfile'), params=params)
+        return self._bulk_parse_csv(res.text, ('zb status', ), ('valid', ))
+
+    def _bulk_submit_millionverifier(self, emails):
+        res = self._bulk_request(
+            'POST', self._get_bulk_url('upload'),
+            params={'key': self.api_key},
+            files={'file_contents': ('emails.csv', self._bulk_csv(emails),
+                                     'text/csv')}).json()
+        if not res.get('file_id'):
+            raise exceptions.UserError(res.get('error') or str(res))
+        return str(res['file_id'])
+
+    def _bulk_fetch_millionverifier(self, job):
+        params = {'key': self.api_key, 'file_id': job.name}
+        res = self._bulk_request(
+            'GET', self._get_bulk_url('fileinfo'), params=params).json()
+        status = res.get('status')
+        if status in ('error', 'canceled'):
+            raise exceptions.UserError(res.get('error') or str(res))
+        if status != 'finished':
+            return None
+        res = self._bulk_request(
+            'GET', self._get_bulk_url('download'),
+            params=dict(params, filter='all'))
+        return self._bulk_parse_csv(res.text, ('result', ), ('ok', ))
+
+    def _bulk_submit_clearout(self, emails):
+        res = self._bulk_request(
+            'POST', self._get_bulk_url('email_verify/bulk'),
+            headers={'Authorization': f'Bearer {self.api_key}'},
+            files={'file': ('emails.csv', self._bulk_csv(emails),
+                            'text/csv')}).json()
+        if res.get('status') != 'success':
+            raise exceptions.UserError(str(res.get('error') or res))
+        return res['data']['list_id']
+
+    def _bulk_fetch_clearout(self, job):
+        headers = {'Authorization': f'Bearer {self.api_key}'}
+        res = self._bulk_request(
+            'GET', self._get_bulk_url('email_verify/bulk/progress_status'),
+            headers=headers, params={'list_id': job.name}).json()
+        progress = res.get('data', {}).get('progress_status')
+        if progress == 'failed':
+            raise exceptions.UserError(str(res))
+        if progress != 'completed':
+            return None
+        res = self._bulk_request(
+            'POST', self._get_bulk_url('download/result'),
+            headers=headers, json={'list_id': job.name}).json()
+        res = self._bulk_request('GET', res['data']['url'])
+        return self._bulk_parse_csv(
+            res.text, ('clearout email status', 'status'),
+            ('valid', 'deliverable'))
+
     def test_connection(self):
         """Test connection with the validator API.
 
@@ -192,13 +1274,14 @@ class EmailValidator(models.Model):
             temp_email = self.env['kw.email.validation'].sudo().create({
                 'name': 'test@example.com'})
 
-            method_name = f'validate_email_{self.name}'
-            if not hasattr(self, method_name):
+            backend = self._get_backend()
+            if not (backend.validate_one or backend.validate_many
+                    or backend.validate_many_async):
                 return {'message': _('Validation method not found for %s'
                                      '') % self.name,
                         'success': False, }
 
-            getattr(self, method_name)(temp_email)
+            self.validate_email(temp_email)
 
             result = self.env['kw.email.validation.result'].sudo().search([
                 ('email_id', '=', temp_email.id),
@@ -295,30 +1378,48 @@ class EmailValidator(models.Model):
                 'SendPulse API key must be in format "user_id:secret"'))
 
         try:
-            # Step 1: Get token
-            token_url = 'https://api.sendpulse.com/oauth/access_token'
-            token_data = {
-                'grant_type': 'client_credentials',
-                'client_id': user_id,
-                'client_secret': secret
-            }
+            session = self._get_http_session()
 
-            token_res = requests.post(token_url, json=token_data, timeout=30)
-            if token_res.status_code != 200:
-                self.store_result(email, False)
-                return False
+            def fetch_token():
+                token_res = self._call_provider(partial(
+                    session.post,
+                    'https://api.sendpulse.com/oauth/access_token',
+                    json={
+                        'grant_type': 'client_credentials',
+                        'client_id': user_id,
+                        'client_secret': secret
+                    },
+                    timeout=self.http_timeout))
+                if token_res is None or token_res.status_code != 200:
+                    return None, 0
+                token_data = token_res.json()
+                return (token_data.get('access_token'),
+                        token_data.get('expires_in'))
 
-            token = token_res.json().get('access_token')
+            # Step 1: Get token, cached until it expires
+            token = self._get_access_token(fetch_token)
             if not token:
-                self.store_result(email, False)
-                return False
+                return None
 
             # Step 2: Validate email
             headers = {'Authorization': f'Bearer {token}'}
             params = {'email': email.name}
 
-            res = requests.get(self.url, params=params, headers=headers,
-                               timeout=30)
+            statuses = []
+
+            def check():
+                check_res = session.get(
+                    self.url, params=params, headers=headers,
+                    timeout=self.http_timeout)
+                statuses.append(check_res.status_code)
+                return check_res
+
+            res = self._call_provider(check)
+            if statuses and statuses[-1] == 401:
+                # Token revoked before its expiry, refresh on next call
+                self._reset_access_token()
+            if res is None:
+                return None
 
             is_valid = False
             if res.status_code == 200:
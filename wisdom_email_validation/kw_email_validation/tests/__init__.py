@@ -1,4 +1,6 @@
 from . import test_email_validation
+from . import test_email_validation_job
+from . import test_email_validation_result
 from . import test_email_validation_mixin
 from . import test_email_validator
 from . import test_post_init_hook
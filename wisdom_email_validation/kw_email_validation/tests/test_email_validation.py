@@ -70,6 +70,47 @@ class TestEmailValidation(TransactionCase):
         self.assertEqual(state3, 'valid',
                          "Should validate email and return state")
 
+    def test_get_validations(self):
+        """Test fetching and creating validations of many emails."""
+        existing = self.EmailValidation.create({'name': 'many1@example.com'})
+        emails = ['MANY1@example.com', ' many2@example.com',
+                  'many2@example.com', 'invalid-email', '', None]
+
+        validations = self.EmailValidation.get_validations(emails)
+
+        self.assertEqual(list(validations), emails)
+        self.assertEqual(validations['MANY1@example.com'], existing)
+        created = validations[' many2@example.com']
+        self.assertEqual(created.name, 'many2@example.com')
+        self.assertEqual(created.state, 'pending')
+        self.assertEqual(validations['many2@example.com'], created)
+        self.assertFalse(validations['invalid-email'])
+        self.assertFalse(validations[''])
+        self.assertFalse(validations[None])
+
+        # Known emails are not inserted again
+        self.assertEqual(
+            self.EmailValidation.get_validations(['many2@example.com']),
+            {'many2@example.com': created})
+
+    def test_get_validation_states(self):
+        """Test the states of many emails at once."""
+        self.EmailValidation.create({
+            'name': 'states1@example.com',
+            'state': 'valid',
+        })
+        states = self.EmailValidation.get_validation_states(
+            ['states1@example.com', 'states2@example.com', 'invalid-email'])
+        self.assertEqual(states, {
+            'states1@example.com': 'valid',
+            'states2@example.com': 'pending',
+            'invalid-email': 'invalid',
+        })
+
+        states = self.EmailValidation.get_validation_states(
+            ['states2@example.com'], force_check=True)
+        self.assertEqual(states, {'states2@example.com': 'valid'})
+
     def test_is_valid(self):
         """Test the is_valid method."""
         # Create a valid email record
@@ -158,6 +199,298 @@ class TestEmailValidation(TransactionCase):
             # Verify that the validator was called
             mock_validate.assert_called()
 
+    def test_validate_emails(self):
+        """Test batch validation of a recordset."""
+        emails = self.EmailValidation.create([
+            {'name': 'batch_valid@example.com'},
+            {'name': 'batch_invalid@example.com'},
+            {'name': 'batch_unchecked@example.com'},
+        ])
+        results = {
+            'batch_valid@example.com': True,
+            'batch_invalid@example.com': False,
+            'batch_unchecked@example.com': None,
+        }
+
+        with patch.object(type(self.validator), 'validate_email',
+                          side_effect=lambda email: results[email.name]
+                          ) as mock_validate:
+            emails.validate_emails()
+            self.assertEqual(mock_validate.call_count, 3)
+
+        self.assertEqual(emails.mapped('state'),
+                         ['valid', 'invalid', 'pending'],
+                         "Unchecked emails should stay pending")
+
+    def test_validate_emails_stops_at_first_failure(self):
+        """Test that next rules only receive emails that passed."""
+        regexp_validator = self.EmailValidator.search(
+            [('name', '=', 'regexp')], limit=1)
+        self.EmailValidationRule.search([]).write({'sequence': 20})
+        self.EmailValidationRule.create({
+            'name': 'Regexp Rule',
+            'sequence': 1,
+            'validator_id': regexp_validator.id,
+        })
+        emails = self.EmailValidation.create([
+            {'name': 'batch_rule@example.com'},
+            {'name': 'batch_rule@example'},
+        ])
+
+        emails.validate_emails()
+
+        self.assertEqual(emails.mapped('state'), ['valid', 'invalid'])
+        results = self.env['kw.email.validation.result'].search([
+            ('email_id', 'in', emails.ids),
+            ('validator_id', '=', regexp_validator.id),
+        ])
+        self.assertEqual(len(results), 1,
+                         "The pre-filter only stores rejections")
+        self.assertEqual(results.email_id, emails[1])
+
+    def test_fresh_results(self):
+        """Test that recent results are reused instead of validating."""
+        email = self.EmailValidation.create({'name': 'fresh@example.com'})
+        result = self.env['kw.email.validation.result'].create({
+            'email_id': email.id,
+            'validator_id': self.validator.id,
+            'is_valid': False,
+        })
+
+        with patch.object(type(self.validator), 'validate_email',
+                          return_value=True) as mock_validate:
+            email.action_force_validate_email()
+            mock_validate.assert_not_called()
+        self.assertEqual(email.state, 'invalid')
+
+        # Expired results are ignored
+        self.env.cr.execute("""
+            UPDATE kw_email_validation_result
+            SET create_date = create_date - INTERVAL '31 days'
+            WHERE id = %s""", [result.id])
+        with patch.object(type(self.validator), 'validate_email',
+                          return_value=True) as mock_validate:
+            email.action_force_validate_email()
+            mock_validate.assert_called_once()
+        self.assertEqual(email.state, 'valid')
+
+        # A window of 0 days always validates
+        self.validator.result_ttl_days = 0
+        with patch.object(type(self.validator), 'validate_email',
+                          return_value=True) as mock_validate:
+            email.action_force_validate_email()
+            mock_validate.assert_called_once()
+
+    def test_adaptive_rule_order(self):
+        """Test that adaptive order runs the cheapest rejecting validator
+        first and that parallel rules share one step."""
+        slow = self.EmailValidator.create({
+            'name': 'test_slow',
+            'stat_sample_count': 100,
+            'stat_latency': 800,
+            'stat_rejection_rate': 0.05,
+        })
+        fast = self.EmailValidator.create({
+            'name': 'test_fast',
+            'stat_sample_count': 100,
+            'stat_latency': 50,
+            'stat_rejection_rate': 0.2,
+        })
+        self.EmailValidationRule.search([]).write({'sequence': 30})
+        rules = self.EmailValidationRule.create([
+            {'name': 'Slow', 'sequence': 1, 'validator_id': slow.id},
+            {'name': 'Fast', 'sequence': 2, 'validator_id': fast.id},
+        ])
+        rules |= self.rule
+
+        self.assertEqual(rules.sorted()._get_stages(),
+                         [slow, fast, self.validator])
+        self.env['ir.config_parameter'].sudo().set_param(
+            'kw_email_validation.rule_order', 'adaptive')
+        self.assertEqual(rules.sorted()._get_stages(),
+                         [fast, slow, self.validator],
+                         "Validators without statistics should run last")
+
+        rules[:2].write({'is_parallel': True})
+        self.assertEqual(rules.sorted()._get_stages(),
+                         [fast | slow, self.validator])
+
+    def test_parallel_rules(self):
+        """Test that parallel validators all check the same emails."""
+        other = self.EmailValidator.create({'name': 'test_other'})
+        self.rule.is_parallel = True
+        self.EmailValidationRule.create({
+            'name': 'Other Rule',
+            'validator_id': other.id,
+            'is_parallel': True,
+        })
+        emails = self.EmailValidation.create([
+            {'name': 'parallel1@example.com'},
+            {'name': 'parallel2@example.com'},
+        ])
+
+        with patch.object(type(self.validator), 'validate_email',
+                          return_value=False) as mock_validate:
+            emails.validate_emails()
+            self.assertEqual(mock_validate.call_count, 4,
+                             "Each validator of the step should be called")
+        self.assertEqual(set(emails.mapped('state')), {'invalid'})
+
+    def test_validator_stats(self):
+        """Test that results are timed and aggregated per validator."""
+        emails = self.EmailValidation.create([
+            {'name': f'stats{i}@example.com'} for i in range(4)])
+
+        def validate_email(email):
+            is_valid = not email.name.startswith('stats0')
+            self.validator.store_result(email, is_valid)
+            return is_valid
+
+        with patch.object(type(self.validator), 'validate_email',
+                          side_effect=validate_email):
+            emails.validate_emails()
+
+        results = self.env['kw.email.validation.result'].search([
+            ('validator_id', '=', self.validator.id)])
+        self.assertEqual(len(results), 4)
+        self.env.cr.execute("""
+            SELECT COUNT(*) FROM kw_email_validation_result
+            WHERE id = ANY(%s) AND duration IS NOT NULL""", [results.ids])
+        self.assertEqual(self.env.cr.fetchone()[0], 4,
+                         "Results should record the validation time")
+
+        self.EmailValidator.cron_update_stats()
+        self.assertEqual(self.validator.stat_sample_count, 4)
+        self.assertAlmostEqual(self.validator.stat_rejection_rate, 0.25)
+        self.assertIsNone(self.validator._get_rank(),
+                          "Too few results to rank the validator")
+
+    def test_prefilter(self):
+        """Test that the pre-filter rejects emails before the rules."""
+        regexp_validator = self.env.ref(
+            'kw_email_validation.kw_email_validator_regexp')
+        regexp_validator.write({
+            'reject_disposable': True,
+            'disposable_domains': 'mailinator.com\nyopmail.com',
+            'reject_role_accounts': True,
+            'role_accounts': 'admin\npostmaster',
+        })
+        self.EmailValidationRule.create({
+            'name': 'Syntax',
+            'sequence': 1,
+            'validator_id': regexp_validator.id,
+        })
+        emails = self.EmailValidation.create([
+            {'name': 'prefilter@example.com'},
+            {'name': 'prefilter..dots@example.com'},
+            {'name': 'prefilter@mailinator.com'},
+            {'name': 'admin+news@example.com'},
+        ])
+
+        with patch.object(type(self.validator), 'validate_email',
+                          return_value=True) as mock_validate:
+            emails.validate_emails()
+            self.assertEqual(mock_validate.call_count, 1,
+                             "Rejected emails must not reach the rules")
+
+        self.assertEqual(emails.mapped('state'),
+                         ['valid', 'invalid', 'invalid', 'invalid'])
+        results = self.env['kw.email.validation.result'].search([
+            ('email_id', 'in', emails.ids),
+            ('validator_id', '=', regexp_validator.id),
+        ], order='email_id')
+        self.assertEqual(results.email_id, emails[1:])
+        self.assertEqual(
+            results.mapped('message'),
+            ['Invalid syntax', 'Disposable domain', 'Role account'])
+        self.assertFalse(any(results.mapped('is_valid')))
+
+    def test_prefilter_without_rule(self):
+        """Test that pre-filters only run for the rules using them."""
+        regexp_validator = self.env.ref(
+            'kw_email_validation.kw_email_validator_regexp')
+        email = self.EmailValidation.create(
+            {'name': 'no..rule@example.com'})
+        with patch.object(type(self.validator), 'validate_email',
+                          return_value=True):
+            email.validate_emails()
+        self.assertEqual(email.state, 'valid',
+                         "No rule uses the pre-filter")
+        self.assertFalse(self.env['kw.email.validation.result'].search([
+            ('email_id', '=', email.id),
+            ('validator_id', '=', regexp_validator.id),
+        ]))
+
+        self.rule.active = False
+        email.state = 'pending'
+        email.validate_emails()
+        self.assertEqual(email.state, 'pending',
+                         "States are left untouched without rules")
+
+    def test_prefilter_pattern_cache(self):
+        """Test that the compiled pattern follows the validator changes."""
+        regexp_validator = self.env.ref(
+            'kw_email_validation.kw_email_validator_regexp')
+        pattern = regexp_validator._get_regexp_pattern()
+        self.assertIs(regexp_validator._get_regexp_pattern(), pattern)
+
+        # Writes in the same transaction share the same write date
+        regexp_validator.write({
+            'regexp': r'^[a-z]+@example\.com$',
+            'write_date': '2000-01-01 00:00:00',
+        })
+        self.assertEqual(regexp_validator._get_regexp_pattern().pattern,
+                         r'^[a-z]+@example\.com$')
+
+    def test_claim_priority(self):
+        """Test that the queue is drained by decreasing priority."""
+        self.EmailValidation.search([('state', '=', 'pending')]).write(
+            {'state': 'valid'})
+        bulk = self.EmailValidation.get_validations(
+            ['queue_bulk@example.com'], priority='0')
+        interactive = self.EmailValidation.get_validations(
+            ['queue_interactive@example.com'], priority='2')
+
+        claimed = self.EmailValidation._claim(1)
+        self.assertEqual(claimed, interactive['queue_interactive@example.com'])
+        self.assertFalse(self.EmailValidation._claim(1, min_priority='2')
+                         - claimed)
+
+        # Requesting a known pending email raises its priority
+        self.EmailValidation.get_validations(
+            ['queue_bulk@example.com'], priority='2')
+        self.assertEqual(bulk['queue_bulk@example.com'].priority, '2')
+
+    def test_claim_fair_between_models(self):
+        """Test that each source model gets its share of the queue."""
+        self.EmailValidation.search([('state', '=', 'pending')]).write(
+            {'state': 'valid'})
+        imported = self.EmailValidation.get_validations(
+            [f'queue_import{i}@example.com' for i in range(5)],
+            source_model='mailing.contact')
+        lead = self.EmailValidation.get_validations(
+            ['queue_lead@example.com'], source_model='crm.lead')
+
+        claimed = self.EmailValidation._claim(2)
+        self.assertEqual(len(claimed), 2)
+        self.assertIn(lead['queue_lead@example.com'], claimed)
+        self.assertIn(claimed - lead['queue_lead@example.com'],
+                      self.EmailValidation.union(*imported.values()))
+
+    def test_queue_metrics(self):
+        """Test the queue depth and age."""
+        self.EmailValidation.search([('state', '=', 'pending')]).write(
+            {'state': 'valid'})
+        self.EmailValidation.get_validations(
+            ['metrics1@example.com', 'metrics2@example.com'],
+            priority='0', source_model='res.partner')
+        metrics = self.EmailValidation.get_queue_metrics()
+        self.assertEqual(len(metrics), 1)
+        self.assertEqual(metrics[0]['priority'], '0')
+        self.assertEqual(metrics[0]['source_model'], 'res.partner')
+        self.assertEqual(metrics[0]['depth'], 2)
+        self.assertGreaterEqual(metrics[0]['age'], 0)
+
     def test_name_get(self):
         """Test the name_get method."""
         # Create a test email
@@ -185,6 +518,55 @@ class TestEmailValidation(TransactionCase):
         self.assertIn(email.state, ['valid', 'invalid'],
                       "State should be updated after force validation")
 
+    def test_enqueue_notifies_progress(self):
+        """Test that queued emails are validated by the worker and that the
+        requesting user is notified."""
+        emails = self.EmailValidation.create([
+            {'name': 'queued1@example.com', 'state': 'valid'},
+            {'name': 'queued2@example.com', 'state': 'invalid'},
+        ])
+
+        emails.enqueue()
+
+        self.assertEqual(set(emails.mapped('state')), {'pending'})
+        self.assertEqual(set(emails.mapped('priority')), {'2'})
+        self.assertEqual(emails.requested_by_id, self.env.user)
+
+        with patch.object(type(self.env['bus.bus']), '_sendone'
+                          ) as mock_send, \
+                patch.object(type(self.validator), 'validate_email',
+                             return_value=True):
+            self.EmailValidation.cron_validate_email(
+                limit=100, min_priority='2')
+        self.assertEqual(set(emails.mapped('state')), {'valid'})
+        mock_send.assert_called_once()
+        partner, notification_type, message = mock_send.call_args[0]
+        self.assertEqual(partner, self.env.user.partner_id)
+        self.assertEqual(notification_type, 'simple_notification')
+        self.assertIn('0 remaining', message['message'])
+        self.assertFalse(emails.requested_by_id)
+
+    def test_enqueue_skips_fresh(self):
+        """Test that validated emails with a fresh result are not queued
+        again unless forced."""
+        fresh, stale = self.EmailValidation.create([
+            {'name': 'fresh@example.com', 'state': 'valid'},
+            {'name': 'stale@example.com', 'state': 'invalid'},
+        ])
+        self.env['kw.email.validation.result'].create({
+            'email_id': fresh.id,
+            'validator_id': self.validator.id,
+            'is_valid': True,
+        })
+
+        queued = (fresh | stale).enqueue()
+        self.assertEqual(queued, stale)
+        self.assertEqual(fresh.state, 'valid')
+        self.assertEqual(stale.state, 'pending')
+
+        self.assertEqual(fresh.enqueue(force=True), fresh)
+        self.assertEqual(fresh.state, 'pending')
+
     def test_cron_validate_email(self):
         """Test the cron_validate_email method."""
         # Create multiple pending emails
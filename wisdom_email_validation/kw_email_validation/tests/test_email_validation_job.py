@@ -0,0 +1,191 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+
+class NeverBounceStubHandler(BaseHTTPRequestHandler):
+    """Minimal NeverBounce jobs API, emails starting with 'bad' are
+    invalid."""
+    jobs = {}
+    complete = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        data = json.loads(
+            self.rfile.read(int(self.headers['Content-Length'])))
+        job_id = len(self.jobs) + 1
+        self.jobs[job_id] = [item['email'] for item in data['input']]
+        self._send_json({'status': 'success', 'job_id': job_id})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        emails = self.jobs[int(params['job_id'][0])]
+        if url.path.endswith('/status'):
+            self._send_json({
+                'status': 'success',
+                'job_status': 'complete' if self.complete else 'running',
+            })
+            return
+        page = int(params['page'][0])
+        self._send_json({
+            'status': 'success',
+            'total_pages': len(emails),
+            'results': [{
+                'data': {'email': emails[page - 1]},
+                'verification': {
+                    'result': 'invalid' if emails[page - 1].startswith(
+                        'bad') else 'valid'},
+            }],
+        })
+
+
+class TestEmailValidationJob(TransactionCase):
+    """Test bulk validation jobs against a local stub server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), NeverBounceStubHandler)
+        thread = threading.Thread(target=cls.server.serve_forever,
+                                  daemon=True)
+        thread.start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+        cls.EmailValidation = cls.env['kw.email.validation']
+        cls.EmailValidationJob = cls.env['kw.email.validation.job']
+        cls.validator = cls.env['kw.email.validator'].search(
+            [('name', '=', 'neverbounce')], limit=1)
+        cls.validator.write({
+            'api_key': 'test_neverbounce_key',
+            'use_bulk_api': True,
+            'bulk_threshold': 2,
+            'bulk_url': 'http://127.0.0.1:%s/v4/jobs'
+                        '' % cls.server.server_address[1],
+        })
+        cls.env['kw.email.validation.rule'].create({
+            'name': 'NeverBounce',
+            'validator_id': cls.validator.id,
+        })
+
+    def setUp(self):
+        super().setUp()
+        NeverBounceStubHandler.jobs = {}
+        NeverBounceStubHandler.complete = True
+
+    def test_bulk_job(self):
+        """Test that a batch is submitted as one job and results applied."""
+        emails = self.EmailValidation.create([
+            {'name': 'good1@example.com'},
+            {'name': 'good2@example.com'},
+            {'name': 'bad@example.com'},
+        ])
+
+        emails.validate_emails()
+
+        job = emails.job_id
+        self.assertEqual(len(job), 1, "Emails should share one job")
+        self.assertEqual(job.email_count, 3)
+        self.assertEqual(set(emails.mapped('state')), {'pending'})
+        self.assertEqual(len(NeverBounceStubHandler.jobs), 1)
+
+        self.EmailValidationJob.cron_process_jobs()
+
+        self.assertEqual(job.state, 'done')
+        self.assertFalse(emails.job_id)
+        self.assertEqual(emails.mapped('state'),
+                         ['valid', 'valid', 'invalid'])
+        results = self.env['kw.email.validation.result'].search([
+            ('email_id', 'in', emails.ids),
+            ('validator_id', '=', self.validator.id),
+        ])
+        self.assertEqual(len(results), 3)
+
+    def test_bulk_job_not_finished(self):
+        """Test that emails stay pending until the job is complete."""
+        NeverBounceStubHandler.complete = False
+        emails = self.EmailValidation.create([
+            {'name': 'wait1@example.com'},
+            {'name': 'wait2@example.com'},
+        ])
+        emails.validate_emails()
+        job = emails.job_id
+
+        self.EmailValidationJob.cron_process_jobs()
+        self.assertEqual(job.state, 'running')
+        self.assertEqual(job.poll_count, 1)
+        self.assertEqual(emails.job_id, job)
+
+        # Emails waiting for a job are not submitted twice
+        emails.validate_emails()
+        self.assertEqual(len(NeverBounceStubHandler.jobs), 1)
+
+    def test_bulk_threshold(self):
+        """Test that small batches do not create jobs."""
+        self.validator.bulk_threshold = 10
+        self.assertFalse(self.validator._use_bulk_api(2))
+        self.assertTrue(self.validator._use_bulk_api(10))
+
+    def test_bulk_job_unreachable(self):
+        """Test that a job is kept while the provider cannot be reached
+        and failed when the provider reports it."""
+        emails = self.EmailValidation.create([
+            {'name': 'retry1@example.com'},
+            {'name': 'retry2@example.com'},
+        ])
+        emails.validate_emails()
+        job = emails.job_id
+
+        with patch.object(type(self.validator), '_bulk_fetch',
+                          side_effect=requests.ConnectionError('down')):
+            job._poll()
+        self.assertEqual(job.state, 'running')
+        self.assertEqual(job.poll_count, 1)
+        self.assertEqual(emails.job_id, job,
+                         "Emails should not be submitted again")
+
+        with patch.object(type(self.validator), '_bulk_fetch',
+                          side_effect=UserError('Job failed')):
+            job._poll()
+        self.assertEqual(job.state, 'failed')
+        self.assertFalse(emails.job_id)
+
+    def test_bulk_job_unreachable_too_old(self):
+        """Test that a job is given up once too old to be polled."""
+        emails = self.EmailValidation.create([
+            {'name': 'old1@example.com'},
+            {'name': 'old2@example.com'},
+        ])
+        emails.validate_emails()
+        job = emails.job_id
+        job.flush_recordset()
+        self.env.cr.execute("""
+            UPDATE kw_email_validation_job
+            SET create_date = create_date - INTERVAL '3 days'
+            WHERE id = %s""", [job.id])
+        job.invalidate_recordset(['create_date'])
+
+        with patch.object(type(self.validator), '_bulk_fetch',
+                          side_effect=requests.Timeout('timeout')):
+            job._poll()
+        self.assertEqual(job.state, 'failed')
+        self.assertFalse(emails.job_id)
@@ -0,0 +1,80 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestEmailValidationResult(TransactionCase):
+    """Test the compact storage of validation results."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.EmailValidationResult = cls.env['kw.email.validation.result']
+        cls.History = cls.env['kw.email.validation.result.history']
+        cls.validator = cls.env['kw.email.validator'].create({
+            'name': 'test_result_storage',
+        })
+        cls.email = cls.env['kw.email.validation'].create({
+            'name': 'storage@example.com',
+        })
+
+    def _store(self, is_valid, message=None):
+        return self.validator.store_result(
+            self.email, is_valid, message=message)
+
+    def test_latest_result_upserted(self):
+        """Test that a validator keeps a single result per email."""
+        first = self._store(False, message='Mailbox full')
+        second = self._store(True)
+
+        self.assertEqual(first, second, "The result should be replaced")
+        results = self.EmailValidationResult.search([
+            ('email_id', '=', self.email.id),
+            ('validator_id', '=', self.validator.id),
+        ])
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results.is_valid)
+        self.assertFalse(results.message)
+        self.assertEqual(results.name, self.email.name)
+        self.assertEqual(self.email.result_ids, results)
+
+    def test_history_sampling(self):
+        """Test that results are copied to the history when sampled."""
+        self._store(True)
+        self.assertFalse(self.History.search(
+            [('email_id', '=', self.email.id)]),
+            "No history is kept by default")
+
+        self.validator.history_sample_rate = 1
+        self._store(False)
+        self._store(True)
+        history = self.History.search([('email_id', '=', self.email.id)])
+        self.assertEqual(len(history), 2)
+        self.assertEqual(sorted(history.mapped('is_valid')), [False, True])
+
+    def test_history_purge(self):
+        """Test that the history is purged after the retention period."""
+        self.validator.write({
+            'history_sample_rate': 1,
+            'history_retention_days': 30,
+        })
+        self._store(True)
+        self._store(False)
+        history = self.History.search([('email_id', '=', self.email.id)])
+        self.env.cr.execute("""
+            UPDATE kw_email_validation_result_history
+            SET date = date - INTERVAL '31 days'
+            WHERE id = %s""", [history[-1].id])
+
+        self.History.cron_purge(batch_size=1)
+
+        self.assertEqual(
+            self.History.search([('email_id', '=', self.email.id)]),
+            history[:-1])
+
+        # A retention of 0 days keeps the history forever
+        self.validator.history_retention_days = 0
+        self.env.cr.execute("""
+            UPDATE kw_email_validation_result_history
+            SET date = date - INTERVAL '400 days'""")
+        self.History.cron_purge()
+        self.assertTrue(self.History.search(
+            [('email_id', '=', self.email.id)]))
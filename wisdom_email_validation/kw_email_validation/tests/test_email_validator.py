@@ -1,8 +1,31 @@
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
 
-from odoo import exceptions
+import requests
+
+from odoo import SUPERUSER_ID, api, exceptions, sql_db
 from odoo.tests.common import TransactionCase
 
+from odoo.addons.kw_email_validation.models.email_validator import \
+    ValidatorBackend, threaded_validation
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = b'{"result": "valid"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
 
 class TestEmailValidator(TransactionCase):
     """Test cases for the kw.email.validator model."""
@@ -82,7 +105,8 @@ class TestEmailValidator(TransactionCase):
                          "Should store four validation results")
 
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.get')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.get')
     def test_validate_email_neverbounce_api(self, mock_get):
         """Test NeverBounce API validation using real validator."""
         if not self.neverbounce_validator:
@@ -126,7 +150,8 @@ class TestEmailValidator(TransactionCase):
             "NeverBounce validation should fail with invalid response")
 
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.get')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.get')
     def test_validate_email_zerobounce_api_error(self, mock_get):
         """Test ZeroBounce API validation with errors."""
         if not self.zerobounce_validator:
@@ -206,7 +231,7 @@ class TestEmailValidator(TransactionCase):
         # Test direct call to generic method
         with patch(
                 'odoo.addons.kw_email_validation.models.email_validator.'
-                'requests.get') as mock_get:
+                'requests.Session.get') as mock_get:
             mock_get.return_value.status_code = 200
             mock_get.return_value.json.return_value = {'result': 'valid'}
 
@@ -217,7 +242,8 @@ class TestEmailValidator(TransactionCase):
                 "Direct generic API call should succeed with valid response")
 
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.get')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.get')
     def test_test_connection(self, mock_get):
         """Test the test_connection method using real validator."""
         if not self.neverbounce_validator:
@@ -247,8 +273,8 @@ class TestEmailValidator(TransactionCase):
         self.assertFalse(result.get('success', True),
                          "Connection test should fail without API key")
 
-    def test_use_fname_decorator(self):
-        """Test the use_fname decorator using real validators."""
+    def test_backend_dispatch(self):
+        """Test the dispatch to the backends of real validators."""
         # Test case 1: Validator with existing custom method (regexp)
         if not self.regexp_validator:
             self.skipTest("Regexp validator not found in data files")
@@ -272,7 +298,7 @@ class TestEmailValidator(TransactionCase):
             # Mock API response for this test
             with patch(
                     'odoo.addons.kw_email_validation.models.'
-                    'email_validator.requests.get') as mock_get:
+                    'email_validator.requests.Session.get') as mock_get:
                 mock_get.return_value.status_code = 200
                 mock_get.return_value.json.return_value = {
                     'status': 'success',
@@ -302,10 +328,39 @@ class TestEmailValidator(TransactionCase):
             "Base validation method should be used when custom method "
             "not found")
 
+    def test_backend_registry(self):
+        """Test async batch backends and the defaults they declare."""
+        async def validate_many_test(validator, emails, **kwargs):
+            return {email.id: email.name.startswith('ok')
+                    for email in emails}
+
+        backends = dict(self.EmailValidator._get_backends(), test_async=(
+            ValidatorBackend(validate_many_async='_validate_many_test',
+                             rate_limit=5.0, cost=2.0)))
+        with patch.object(type(self.EmailValidator), '_get_backends',
+                          return_value=backends), \
+                patch.object(type(self.EmailValidator),
+                             '_validate_many_test', validate_many_test,
+                             create=True):
+            validator = self.EmailValidator.create({'name': 'test_async'})
+            self.assertEqual(validator.rate_limit, 5.0)
+            self.assertEqual(validator.check_cost, 2.0)
+            self.assertFalse(validator.is_bulk_api_available)
+
+            emails = self.EmailValidation.create([
+                {'name': 'ok@example.com'}, {'name': 'ko@example.com'}])
+            self.assertEqual(validator.validate_emails(emails), {
+                emails[0].id: True, emails[1].id: False})
+            self.assertFalse(validator.validate_email(emails[1]))
+            with self.assertRaises(exceptions.UserError):
+                validator._bulk_submit(emails)
+
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.post')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.post')
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.get')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.get')
     def test_validate_email_sendpulse_success(self, mock_get, mock_post):
         """Test SendPulse API validation with successful response."""
         if not self.sendpulse_validator:
@@ -357,7 +412,8 @@ class TestEmailValidator(TransactionCase):
         )
 
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.post')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.post')
     def test_validate_email_sendpulse_token_error(self, mock_post):
         """Test SendPulse API validation with token request error."""
         if not self.sendpulse_validator:
@@ -376,23 +432,24 @@ class TestEmailValidator(TransactionCase):
 
         # Test validation
         result = self.sendpulse_validator.validate_email_sendpulse(email)
-        self.assertFalse(
+        self.assertIsNone(
             result,
-            "SendPulse validation should fail when token request fails")
+            "SendPulse validation should not conclude when the token "
+            "request is rejected")
 
-        # Check that error result was stored
+        # The email stays pending
         results = self.env['kw.email.validation.result'].search([
             ('validator_id', '=', self.sendpulse_validator.id),
             ('email_id', '=', email.id),
-            ('is_valid', '=', False),
         ])
-        self.assertEqual(len(results), 1,
-                         "Should store error validation result")
+        self.assertFalse(results, "No result should be stored")
 
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.post')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.post')
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.get')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.get')
     def test_validate_email_sendpulse_invalid_email(self, mock_get, mock_post):
         """Test SendPulse API validation with invalid email response."""
         if not self.sendpulse_validator:
@@ -423,6 +480,133 @@ class TestEmailValidator(TransactionCase):
         self.assertFalse(result,
                          "SendPulse validation should fail for invalid email")
 
+    @patch(
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.post')
+    @patch(
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.get')
+    def test_validate_email_sendpulse_token_cache(self, mock_get, mock_post):
+        """Test that the SendPulse token is requested once until expiry."""
+        if not self.sendpulse_validator:
+            self.skipTest("SendPulse validator not found in data files")
+
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {
+            'access_token': 'cached_token',
+            'expires_in': 3600,
+        }
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            'success': True,
+            'data': {'status': 'valid'},
+        }
+
+        for i in range(3):
+            email = self.EmailValidation.create({
+                'name': f'sendpulse_cache{i}@example.com',
+            })
+            self.assertTrue(
+                self.sendpulse_validator.validate_email_sendpulse(email))
+
+        mock_post.assert_called_once()
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(self.sendpulse_validator.access_token,
+                         'cached_token')
+
+        # Expired token is refreshed
+        self.sendpulse_validator.access_token_expiry = '2000-01-01'
+        email = self.EmailValidation.create({
+            'name': 'sendpulse_expired@example.com',
+        })
+        self.sendpulse_validator.validate_email_sendpulse(email)
+        self.assertEqual(mock_post.call_count, 2)
+
+    @patch(
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.post')
+    @patch(
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.get')
+    def test_validate_email_sendpulse_token_reset(self, mock_get, mock_post):
+        """Test that the SendPulse token is only dropped on a 401."""
+        if not self.sendpulse_validator:
+            self.skipTest("SendPulse validator not found in data files")
+
+        self.sendpulse_validator.breaker_threshold = 0
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {
+            'access_token': 'kept_token',
+            'expires_in': 3600,
+        }
+        mock_get.return_value.status_code = 503
+        email = self.EmailValidation.create({
+            'name': 'sendpulse_down@example.com',
+        })
+        self.assertIsNone(
+            self.sendpulse_validator.validate_email_sendpulse(email))
+        self.sendpulse_validator.invalidate_recordset(['access_token'])
+        self.assertEqual(self.sendpulse_validator.access_token,
+                         'kept_token',
+                         "Provider errors must not drop the token")
+
+        mock_get.return_value.status_code = 401
+        self.assertIsNone(
+            self.sendpulse_validator.validate_email_sendpulse(email))
+        self.sendpulse_validator.invalidate_recordset(['access_token'])
+        self.assertFalse(self.sendpulse_validator.access_token,
+                         "A revoked token must be refreshed")
+        mock_post.assert_called_once()
+
+    def test_access_token_separate_cursors(self):
+        """Test that the token refresh does not block the provider call it
+        makes, with the cursors of their own used outside of tests."""
+        db = sql_db.db_connect(self.env.cr.dbname)
+        with db.cursor() as cr:
+            validator_id = api.Environment(cr, SUPERUSER_ID, {})[
+                'kw.email.validator'].create({
+                    'name': 'test_token_cursors',
+                    'url': 'https://api.example.com/check',
+                    'rate_limit': 10,
+                    'breaker_threshold': 5,
+                }).id
+
+        def cleanup():
+            with db.cursor() as cr:
+                cr.execute('DELETE FROM kw_email_validator WHERE id = %s',
+                           [validator_id])
+        self.addCleanup(cleanup)
+
+        @contextmanager
+        def real_cursor(env):
+            with db.cursor() as cr:
+                # Fail instead of waiting forever for this same thread
+                cr.execute("SET LOCAL lock_timeout = '5s'")
+                yield cr
+
+        with db.cursor() as cr:
+            validator = api.Environment(cr, SUPERUSER_ID, {})[
+                'kw.email.validator'].browse(validator_id)
+
+            def fetch_token():
+                self.assertEqual(validator._acquire_call(), 0)
+                validator._record_call(False)
+                return 'fresh_token', 3600
+
+            with patch('odoo.addons.kw_email_validation.models.'
+                       'email_validator.independent_cursor', real_cursor):
+                self.assertEqual(validator._get_access_token(fetch_token),
+                                 'fresh_token')
+
+        with db.cursor() as cr:
+            cr.execute("""
+                SELECT v.access_token, t.failures
+                FROM kw_email_validator AS v
+                JOIN kw_email_validator_throttle AS t
+                    ON t.validator_id = v.id
+                WHERE v.id = %s""", [validator_id])
+            self.assertEqual(cr.fetchone(), ('fresh_token', 1))
+
     def test_validate_email_sendpulse_invalid_api_key_format(self):
         """Test SendPulse API validation with invalid API key format."""
         if not self.sendpulse_validator:
@@ -472,7 +656,8 @@ class TestEmailValidator(TransactionCase):
             self.sendpulse_validator.api_key = original_key
 
     @patch(
-        'odoo.addons.kw_email_validation.models.email_validator.requests.post')
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.post')
     def test_validate_email_sendpulse_exception(self, mock_post):
         """Test SendPulse API validation with network exception."""
         if not self.sendpulse_validator:
@@ -500,3 +685,171 @@ class TestEmailValidator(TransactionCase):
         ])
         self.assertEqual(len(results), 1,
                          "Should store error validation result")
+
+    @patch(
+        'odoo.addons.kw_email_validation.models.email_validator.'
+        'requests.Session.get')
+    def test_circuit_breaker(self, mock_get):
+        """Test that a failing provider opens the circuit and that emails
+        stay pending while it is open."""
+        validator = self.EmailValidator.create({
+            'name': 'test_breaker',
+            'url': 'https://api.example.com/check',
+            'api_key': 'test_key',
+            'breaker_threshold': 2,
+            'breaker_cooldown': 60,
+        })
+        mock_get.side_effect = requests.ConnectionError('Timeout')
+        emails = self.EmailValidation.create([
+            {'name': f'breaker{i}@example.com'} for i in range(3)])
+
+        for email in emails:
+            self.assertIsNone(
+                validator._validate_email_url_api_generic(email))
+        self.assertEqual(mock_get.call_count, 2,
+                         "Calls should fail fast once the circuit is open")
+        validator.invalidate_recordset(['breaker_state', 'breaker_failures'])
+        self.assertEqual(validator.breaker_state, 'open')
+        self.assertEqual(validator.breaker_failures, 2)
+        self.assertFalse(self.env['kw.email.validation.result'].search([
+            ('validator_id', '=', validator.id)]))
+        self.assertEqual(set(emails.mapped('state')), {'pending'})
+
+        validator.action_reset_breaker()
+        mock_get.side_effect = None
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {'result': 'valid'}
+        self.assertTrue(
+            validator._validate_email_url_api_generic(emails[0]))
+        validator.invalidate_recordset(['breaker_state', 'breaker_failures'])
+        self.assertEqual(validator.breaker_state, 'closed')
+        self.assertEqual(validator.breaker_failures, 0)
+
+    def test_circuit_breaker_no_lock(self):
+        """Test that successful calls without rate limit keep no throttle
+        state, and that the half-open probe takes a rate token."""
+        validator = self.EmailValidator.create({
+            'name': 'test_breaker_light',
+            'url': 'https://api.example.com/check',
+        })
+        self.assertEqual(validator._acquire_call(), 0)
+        validator._record_call(True)
+        self.env.cr.execute("""
+            SELECT 1 FROM kw_email_validator_throttle
+            WHERE validator_id = %s""", [validator.id])
+        self.assertFalse(self.env.cr.fetchone(),
+                         "No throttle row should be written on success")
+
+        validator.write({
+            'rate_limit': 0.001,
+            'rate_burst': 1,
+            'breaker_threshold': 1,
+            'breaker_cooldown': 0,
+        })
+        validator._record_call(False)
+        self.assertEqual(validator._acquire_call(), 0,
+                         "The half-open probe should be let through")
+        self.assertGreater(validator._acquire_call(), 0,
+                           "The probe should have taken the rate token")
+
+    def test_rate_limit(self):
+        """Test that the token bucket allows bursts and then asks to
+        wait."""
+        validator = self.EmailValidator.create({
+            'name': 'test_rate_limit',
+            'url': 'https://api.example.com/check',
+            'rate_limit': 0.001,
+            'rate_burst': 2,
+        })
+        self.assertEqual(validator._acquire_call(), 0)
+        self.assertEqual(validator._acquire_call(), 0)
+        self.assertGreater(validator._acquire_call(), 0,
+                           "Burst is exhausted, the call must wait")
+
+        with patch.object(type(validator), '_acquire_call',
+                          return_value=3600) as acquire:
+            self.assertIsNone(validator._call_provider(lambda: None),
+                              "Call should give up past the HTTP timeout")
+            acquire.assert_called_once()
+
+    def test_http_session_reuse(self):
+        """Test that API calls of a validator reuse pooled connections."""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        validator = self.EmailValidator.create({
+            'name': 'test_http_pool',
+            'url': 'http://127.0.0.1:%s/check' % server.server_address[1],
+            'api_key': 'test_key',
+        })
+        session = validator._get_http_session()
+        self.assertIs(session, validator._get_http_session(),
+                      "Session should be reused by the worker")
+
+        for i in range(3):
+            email = self.EmailValidation.create({
+                'name': f'pool{i}@example.com',
+            })
+            self.assertTrue(
+                validator._validate_email_url_api_generic(email))
+
+        self.assertEqual(validator.get_http_stats(),
+                         {'requests': 3, 'connections': 1},
+                         "One keep-alive connection should serve all "
+                         "requests")
+
+        validator.http_pool_size = 5
+        self.assertIsNot(session, validator._get_http_session(),
+                         "Session should be rebuilt on settings change")
+
+    def test_http_session_retry(self):
+        """Test that only idempotent requests are retried, not on read
+        timeouts nor on 429."""
+        validator = self.EmailValidator.create({
+            'name': 'test_http_retry',
+            'url': 'https://api.example.com/check',
+        })
+        retry = validator._get_http_session().get_adapter(
+            'https://api.example.com').max_retries
+        self.assertEqual(retry.read, 0)
+        self.assertNotIn(429, retry.status_forcelist)
+        self.assertTrue(retry.is_retry('GET', 503))
+        self.assertFalse(retry.is_retry('POST', 503))
+
+    def test_validate_emails_threads(self):
+        """Test that batches fan out to worker threads with their own
+        cursors only when threads are allowed."""
+        # Worker cursors share the test transaction
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        validator = self.EmailValidator.create({
+            'name': 'test_threads',
+            'max_concurrency': 2,
+        })
+        emails = self.EmailValidation.create([
+            {'name': f'thread{i}@example.com'} for i in range(4)])
+        threads = set()
+
+        def validate_email(obj, email, **kwargs):
+            threads.add(threading.current_thread().name)
+            return email.name.startswith('thread')
+
+        with patch.object(type(validator), 'validate_email',
+                          autospec=True, side_effect=validate_email), \
+                patch('odoo.addons.kw_email_validation.models.'
+                      'email_validator.is_testing', return_value=False):
+            self.assertEqual(validator.validate_emails(emails),
+                             dict.fromkeys(emails.ids, True))
+            self.assertEqual(threads, {threading.current_thread().name},
+                             "Threads should be used only when allowed")
+
+            threads.clear()
+            with threaded_validation():
+                self.assertEqual(validator.validate_emails(emails),
+                                 dict.fromkeys(emails.ids, True),
+                                 "Workers should read the emails")
+            self.assertTrue(threads)
+            self.assertTrue(all(name.startswith('kw_email_validator_')
+                                for name in threads))
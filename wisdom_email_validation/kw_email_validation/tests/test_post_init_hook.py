@@ -58,33 +58,43 @@ class TestPostInitHook(TransactionCase):
             # Should fail gracefully, not crash
             self.assertIn('nonexistent.model', str(e))
 
-    def test_post_init_hook_imports_required_modules(self):
-        """Test that post_init_hook properly imports required Odoo modules."""
-        # Read the function source to verify it imports required modules
-        source = inspect.getsource(post_init_hook)
-
-        # Should work with env parameter directly
-        # (no more api.Environment creation)
-
-        # Should search for records
-        self.assertIn('search', source)
-
-        # Should use get_validation method
-        self.assertIn('get_validation', source)
-
-    def test_post_init_hook_validates_parameters(self):
-        """Test post_init_hook parameter validation logic."""
-        source = inspect.getsource(post_init_hook)
-
-        # Should check for empty email values
-        self.assertIn("'not in'", source)
-        self.assertIn('[False', source)
-
-        # Should use getattr to safely access email field
-        self.assertIn('getattr', source)
-
-        # Should check if email exists before processing
-        self.assertIn('if not email', source)
-
-        # Should assign validation ID when validation exists
-        self.assertIn('kw_email_validation_id', source)
+    def test_post_init_hook_schedules_backfill(self):
+        """Test that post_init_hook schedules a resumable backfill."""
+        Backfill = self.env['kw.email.validation.backfill']
+        post_init_hook(self.env, 'res.partner', 'email')
+
+        backfill = Backfill.search([('name', '=', 'res.partner')])
+        self.assertEqual(len(backfill), 1)
+        self.assertEqual(backfill.email_field, 'email')
+        self.assertEqual(backfill.state, 'running')
+        self.assertEqual(backfill.last_id, 0)
+
+        # Scheduling again restarts the same checkpoint
+        backfill.write({'last_id': 42, 'state': 'done'})
+        post_init_hook(self.env, 'res.partner', 'email')
+        self.assertEqual(
+            Backfill.search([('name', '=', 'res.partner')]), backfill)
+        self.assertEqual(backfill.last_id, 0)
+        self.assertEqual(backfill.state, 'running')
+
+    def test_cron_relink(self):
+        """Test that every bridged model gets its links rebuilt."""
+        Backfill = self.env['kw.email.validation.backfill']
+        bridged = Backfill._get_bridged_models()
+        self.assertNotIn('kw.email.validation.mixin', bridged)
+        for model_name, email_field in bridged.items():
+            self.assertEqual(
+                self.env[model_name]._kw_email_validation_field, email_field)
+
+        Backfill.search([]).write({'state': 'done'})
+        Backfill.cron_relink()
+        running = Backfill.search([('state', '=', 'running')])
+        self.assertEqual(set(running.mapped('name')), set(bridged))
+
+    def test_backfill_of_model_without_link(self):
+        """Test that models not using the mixin are not processed."""
+        backfill = self.env['kw.email.validation.backfill'].schedule(
+            'res.country', 'code')
+        backfill._run()
+        self.assertEqual(backfill.state, 'done')
+        self.assertEqual(backfill.last_id, 0)
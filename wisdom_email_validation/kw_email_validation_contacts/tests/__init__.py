@@ -0,0 +1 @@
+from . import test_res_partner
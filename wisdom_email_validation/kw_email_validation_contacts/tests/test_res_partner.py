@@ -0,0 +1,141 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+from odoo.tools import SQL
+
+from odoo.addons.kw_email_validation.models.email_validation import \
+    normalize_email_sql
+
+
+class TestResPartner(TransactionCase):
+    """Test the email validation of partners."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Partner = cls.env['res.partner']
+        cls.EmailValidation = cls.env['kw.email.validation']
+
+    def test_action_validate_email(self):
+        """Test that the action links and queues the emails of the
+        partners, writing the link once per email."""
+        partners = self.Partner.create([
+            {'name': 'Shared 1', 'email': 'shared@example.com'},
+            {'name': 'Shared 2', 'email': 'shared@example.com'},
+            {'name': 'Other', 'email': 'other@example.com'},
+            {'name': 'No email'},
+        ])
+        # Unlinked, e.g. before the post_init_hook ran
+        partners.write({'kw_email_validation_id': False})
+
+        write = type(self.Partner).write
+        with patch.object(type(self.Partner), 'write', autospec=True,
+                          side_effect=write) as mock_write:
+            action = partners.action_kw_email_validation_validate_email()
+        self.assertEqual(mock_write.call_count, 2,
+                         "Links should be written once per email")
+
+        shared = self.EmailValidation.search(
+            [('name', '=', 'shared@example.com')])
+        self.assertEqual(partners[:2].kw_email_validation_id, shared)
+        self.assertEqual(partners[2].kw_email_validation_id.name,
+                         'other@example.com')
+        self.assertFalse(partners[3].kw_email_validation_id)
+        self.assertEqual(set(partners[:3].kw_email_validation_id.mapped(
+            'priority')), {'2'})
+        self.assertEqual(partners[:3].kw_email_validation_id.requested_by_id,
+                         self.env.user)
+        self.assertIn('2 emails', action['params']['message'])
+
+    def test_compute_validation_state(self):
+        """Test the state of each partner of a mixed recordset."""
+        valid, invalid = self.EmailValidation.create([
+            {'name': 'linked_valid@example.com', 'state': 'valid'},
+            {'name': 'unlinked_invalid@example.com', 'state': 'invalid'},
+        ])
+        partners = self.Partner.create([
+            {'name': 'Linked', 'email': 'linked_valid@example.com'},
+            {'name': 'Unlinked', 'email': 'unlinked_invalid@example.com'},
+            {'name': 'Unknown', 'email': 'unknown@example.com'},
+            {'name': 'Malformed', 'email': 'malformed'},
+            {'name': 'No email'},
+        ])
+        partners[1:].write({'kw_email_validation_id': False})
+        self.assertEqual(partners[0].kw_email_validation_id, valid)
+        self.EmailValidation.search(
+            [('name', '=', 'unknown@example.com')]).unlink()
+        partners.invalidate_recordset(['kw_email_validation_state'])
+
+        count = self.EmailValidation.search_count([])
+        self.assertEqual(partners.mapped('kw_email_validation_state'),
+                         ['valid', 'invalid', 'pending', 'invalid',
+                          'invalid'])
+        self.assertEqual(self.EmailValidation.search_count([]), count,
+                         "Reading the state must not create validations")
+        self.assertFalse(self.EmailValidation.search(
+            [('name', '=', 'unknown@example.com')]))
+        self.assertNotEqual(partners[1].kw_email_validation_id, invalid)
+
+    def test_compute_validation_state_queries(self):
+        """Test that the state of many partners is read in a constant
+        number of queries."""
+        partners = self.Partner.create([
+            {'name': f'Batch {i}', 'email': f'batch{i}@example.com'}
+            for i in range(20)])
+        partners[::2].write({'kw_email_validation_id': False})
+        self.env.invalidate_all()
+
+        partners = self.Partner.browse(partners.ids)
+        with self.assertQueryCount(__system__=3):
+            partners.mapped('kw_email_validation_state')
+
+    def test_backfill_chunk(self):
+        """Test that the backfill links partners to the validations the
+        ORM links them to, whatever the whitespace around the email."""
+        partners = self.Partner.create([
+            {'name': 'Tab', 'email': '\tBackfill@Example.com\n'},
+            {'name': 'Same', 'email': 'backfill@example.com'},
+            {'name': 'New', 'email': ' New.Backfill@example.com\r\n'},
+            {'name': 'Malformed', 'email': 'malformed'},
+        ])
+        linked = partners[0].kw_email_validation_id
+        self.assertEqual(linked.name, 'backfill@example.com')
+        self.assertEqual(partners[1].kw_email_validation_id, linked)
+        partners.write({'kw_email_validation_id': False})
+        self.EmailValidation.search(
+            [('name', '=', 'new.backfill@example.com')]).unlink()
+
+        backfill = self.env['kw.email.validation.backfill'].schedule(
+            'res.partner', 'email')
+        backfill._run(chunk_size=1000)
+
+        self.assertEqual(backfill.state, 'done')
+        self.assertGreaterEqual(backfill.linked_count, 3)
+        self.assertEqual(partners[:2].kw_email_validation_id, linked)
+        created = partners[2].kw_email_validation_id
+        self.assertEqual(created.name, 'new.backfill@example.com')
+        self.assertEqual(created.state, 'pending')
+        self.assertEqual(
+            self.EmailValidation._normalize_email(partners[2].email),
+            created.name, "SQL and ORM normalization should agree")
+        self.assertFalse(partners[3].kw_email_validation_id)
+
+    def test_email_index(self):
+        """Test that the lookups by normalized email use the index."""
+        self.env.cr.execute("""
+            SELECT indexname FROM pg_indexes
+            WHERE tablename = 'res_partner'
+                AND indexname LIKE 'res_partner_kw_email_validation_%'""")
+        self.assertEqual(
+            [row[0] for row in self.env.cr.fetchall()],
+            ['res_partner_kw_email_validation_email_normalized_index'])
+
+        self.env.cr.execute('SET LOCAL enable_seqscan = off')
+        self.addCleanup(self.env.cr.execute, 'RESET enable_seqscan')
+        self.env.cr.execute(SQL(
+            'EXPLAIN SELECT id FROM res_partner WHERE %s = ANY(%s)',
+            normalize_email_sql(SQL.identifier('email')),
+            ['index@example.com']))
+        plan = '\n'.join(row[0] for row in self.env.cr.fetchall())
+        self.assertIn(
+            'res_partner_kw_email_validation_email_normalized_index', plan)
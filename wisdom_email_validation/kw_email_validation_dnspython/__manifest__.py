@@ -22,7 +22,11 @@
     },
 
     'data': [
+        'security/ir.model.access.csv',
+
         'data/email_validator.xml',
+
+        'views/email_domain_views.xml',
     ],
     'demo': [
     ],
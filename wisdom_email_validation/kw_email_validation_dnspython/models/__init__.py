@@ -1 +1,2 @@
+from . import email_domain
 from . import email_validator
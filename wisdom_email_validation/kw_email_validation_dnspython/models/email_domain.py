@@ -0,0 +1,138 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+# pylint: disable=missing-manifest-dependency
+import dns.resolver
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Used when the answer does not carry a TTL
+DEFAULT_TTL = 3600
+# How long a domain without MX records is remembered
+NEGATIVE_TTL = 3600
+
+
+class EmailDomain(models.Model):
+    """Cache of MX lookups shared by the DNS and SMTP validators."""
+    _name = 'kw.email.domain'
+    _description = 'Email Domain'
+    _order = 'name'
+
+    name = fields.Char(
+        string='Domain',
+        required=True,
+        index=True,
+        readonly=True, )
+    state = fields.Selection(
+        selection=[
+            ('mx', 'Has MX'),
+            ('no_mx', 'No MX'),
+            ('null_mx', 'Accepts no mail'),
+            ('nxdomain', 'Does not exist'),
+        ],
+        required=True,
+        readonly=True, )
+    mx_hosts = fields.Char(
+        string='MX Hosts',
+        readonly=True,
+        help='Mail servers ordered by preference', )
+    expiry_date = fields.Datetime(
+        readonly=True,
+        help='The domain is resolved again after this date', )
+
+    _sql_constraints = [
+        ('name_uniq', 'UNIQUE(name)', 'Domain must be unique!')
+    ]
+
+    def get_mx_hosts(self):
+        self.ensure_one()
+        return self.mx_hosts.split(',') if self.mx_hosts else []
+
+    @api.model
+    def resolve_domains(self, domains):
+        """Return the MX lookups of domains.
+
+        Cached lookups are used until their DNS TTL expires, the others are
+        resolved in parallel and stored. Domains that could not be resolved
+        because of a temporary error are not cached.
+
+        Returns:
+            dict: ``{domain: kw.email.domain}``, without the domains that
+                  could not be resolved
+        """
+        domains = {d.strip().lower() for d in domains if d}
+        if not domains:
+            return {}
+
+        now = fields.Datetime.now()
+        records = self.sudo().search([('name', 'in', list(domains))])
+        result = {r.name: r for r in records
+                  if r.expiry_date and r.expiry_date > now}
+        missing = sorted(domains - set(result))
+        if not missing:
+            return result
+
+        if len(missing) == 1:
+            lookups = {missing[0]: self._resolve_mx(missing[0])}
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(missing), 8)) as ex:
+                lookups = dict(zip(missing, ex.map(self._resolve_mx,
+                                                   missing)))
+
+        ids = []
+        for domain, lookup in lookups.items():
+            if lookup is None:
+                continue
+            state, hosts, ttl = lookup
+            self.env.cr.execute("""
+                INSERT INTO kw_email_domain (
+                    name, state, mx_hosts, expiry_date,
+                    create_uid, create_date, write_uid, write_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (name) DO UPDATE SET
+                    state = EXCLUDED.state,
+                    mx_hosts = EXCLUDED.mx_hosts,
+                    expiry_date = EXCLUDED.expiry_date,
+                    write_uid = EXCLUDED.write_uid,
+                    write_date = EXCLUDED.write_date
+                RETURNING id""", [
+                domain, state, ','.join(hosts) or None,
+                now + timedelta(seconds=ttl),
+                self.env.uid, now, self.env.uid, now])
+            ids.append(self.env.cr.fetchone()[0])
+
+        records = self.sudo().browse(ids)
+        records.invalidate_recordset()
+        result.update({r.name: r for r in records})
+        return result
+
+    @api.model
+    def _resolve_mx(self, domain):
+        """Resolve MX records of a domain, runs outside of the ORM.
+
+        Returns:
+            tuple: ``(state, hosts, ttl)`` or None on temporary errors
+        """
+        try:
+            answers = dns.resolver.resolve(domain, 'MX')
+        except dns.resolver.NXDOMAIN:
+            return 'nxdomain', [], NEGATIVE_TTL
+        except dns.resolver.NoAnswer:
+            return 'no_mx', [], NEGATIVE_TTL
+        except Exception as e:
+            _logger.debug('Error resolving MX of %s: %s', domain, e)
+            return None
+
+        hosts = [str(record.exchange).rstrip('.')
+                 for record in sorted(answers, key=lambda r: r.preference)]
+        rrset = getattr(answers, 'rrset', None)
+        ttl = getattr(rrset, 'ttl', None) or DEFAULT_TTL
+        if not hosts:
+            return 'no_mx', [], NEGATIVE_TTL
+        # Null MX "0 ." (RFC 7505): the domain declares it accepts no mail
+        if not any(hosts):
+            return 'null_mx', [], ttl
+        return 'mx', [host for host in hosts if host], ttl
@@ -1,8 +1,9 @@
 import logging
-# pylint: disable=missing-manifest-dependency
-import dns.resolver
 
-from odoo import models
+from odoo import models, api
+
+from odoo.addons.kw_email_validation.models.email_validator import \
+    ValidatorBackend
 
 _logger = logging.getLogger(__name__)
 
@@ -10,14 +11,31 @@ _logger = logging.getLogger(__name__)
 class EmailValidator(models.Model):
     _inherit = 'kw.email.validator'
 
+    @api.model
+    def _get_backends(self):
+        return dict(super()._get_backends(), dnspython=ValidatorBackend(
+            validate_many='validate_emails_dnspython',
+            validate_one='validate_email_dnspython'))
+
     def validate_email_dnspython(self, email, **kwargs):
-        domain = email.name.split('@')[-1]
-        is_valid = False
+        return self.validate_emails_dnspython(email, **kwargs)[email.id]
+
+    def validate_emails_dnspython(self, emails, **kwargs):
+        """Check that the domains of emails accept mail.
 
-        try:
-            is_valid = bool(dns.resolver.resolve(domain, 'MX'))
-        except Exception as e:
-            _logger.debug(e)
+        Emails whose domain could not be resolved because of a temporary
+        DNS error are left unchecked, no result is stored for them.
+        """
+        domains = self.env['kw.email.domain'].resolve_domains(
+            {email.name.split('@')[-1] for email in emails})
 
-        self.store_result(email, is_valid)
-        return is_valid
+        results = {}
+        for email in emails:
+            domain = domains.get(email.name.split('@')[-1])
+            if not domain:
+                results[email.id] = None
+                continue
+            is_valid = domain.state == 'mx'
+            self.store_result(email, is_valid)
+            results[email.id] = is_valid
+        return results
@@ -1,5 +1,8 @@
 from unittest.mock import patch, MagicMock
 
+# pylint: disable=missing-manifest-dependency
+import dns.resolver
+
 from odoo.tests.common import TransactionCase
 
 
@@ -23,7 +26,7 @@ class TestEmailValidatorDNSPython(TransactionCase):
             })
 
     @patch('odoo.addons.kw_email_validation_dnspython.models.'
-           'email_validator.dns.resolver.resolve')
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_dnspython_success(self, mock_resolve):
         """Test DNS Python validation with successful MX record lookup."""
         # Create test email
@@ -51,7 +54,7 @@ class TestEmailValidatorDNSPython(TransactionCase):
         self.assertTrue(results[0].is_valid)
 
     @patch('odoo.addons.kw_email_validation_dnspython.models.'
-           'email_validator.dns.resolver.resolve')
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_dnspython_no_mx_record(self, mock_resolve):
         """Test DNS Python validation when no MX records found."""
         # Create test email
@@ -78,7 +81,7 @@ class TestEmailValidatorDNSPython(TransactionCase):
         self.assertFalse(results[0].is_valid)
 
     @patch('odoo.addons.kw_email_validation_dnspython.models.'
-           'email_validator.dns.resolver.resolve')
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_dnspython_dns_exception(self, mock_resolve):
         """Test DNS Python validation with DNS resolution exception."""
         # Create test email
@@ -91,18 +94,17 @@ class TestEmailValidatorDNSPython(TransactionCase):
 
         # Test validation
         result = self.dnspython_validator.validate_email_dnspython(email)
-        self.assertFalse(result, "Should return False on DNS exception")
+        self.assertIsNone(result, "Should not be checked on DNS exception")
 
         # Check that DNS resolver was called
         mock_resolve.assert_called_once_with('error.com', 'MX')
 
-        # Check that result was stored
+        # Check that no result was stored, the email is checked again later
         results = self.env['kw.email.validation.result'].search([
             ('validator_id', '=', self.dnspython_validator.id),
             ('email_id', '=', email.id),
         ])
-        self.assertEqual(len(results), 1)
-        self.assertFalse(results[0].is_valid)
+        self.assertFalse(results)
 
     def test_validate_email_dnspython_domain_extraction(self):
         """Test that domain is correctly extracted from email."""
@@ -112,7 +114,7 @@ class TestEmailValidatorDNSPython(TransactionCase):
         })
 
         with patch('odoo.addons.kw_email_validation_dnspython.models.'
-                   'email_validator.dns.resolver.resolve') as mock_resolve:
+                   'email_domain.dns.resolver.resolve') as mock_resolve:
             mock_resolve.return_value = [MagicMock()]
 
             # Test validation
@@ -129,7 +131,7 @@ class TestEmailValidatorDNSPython(TransactionCase):
         })
 
         with patch('odoo.addons.kw_email_validation_dnspython.models.'
-                   'email_validator.dns.resolver.resolve') as mock_resolve:
+                   'email_domain.dns.resolver.resolve') as mock_resolve:
             mock_resolve.return_value = [MagicMock()]
 
             # Test validation
@@ -150,19 +152,19 @@ class TestEmailValidatorDNSPython(TransactionCase):
             callable(getattr(self.dnspython_validator,
                              'validate_email_dnspython')))
 
-    def test_dnspython_use_fname_decorator(self):
-        """Test that dnspython validator works with use_fname decorator."""
+    def test_dnspython_backend_dispatch(self):
+        """Test that dnspython validator is dispatched to its backend."""
         # Create test email
         email = self.EmailValidation.create({
             'name': 'decorator@example.com',
         })
 
         with patch('odoo.addons.kw_email_validation_dnspython.models.'
-                   'email_validator.dns.resolver.resolve') as mock_resolve:
+                   'email_domain.dns.resolver.resolve') as mock_resolve:
             mock_resolve.return_value = [MagicMock()]
 
             # Test validation using general validate_email method
-            # (should call validate_email_dnspython via decorator)
+            # (should call validate_email_dnspython via the backend)
             result = self.dnspython_validator.validate_email(email)
             self.assertTrue(result)
 
@@ -170,7 +172,7 @@ class TestEmailValidatorDNSPython(TransactionCase):
             mock_resolve.assert_called_once_with('example.com', 'MX')
 
     @patch('odoo.addons.kw_email_validation_dnspython.models.'
-           'email_validator.dns.resolver.resolve')
+           'email_domain.dns.resolver.resolve')
     def test_dnspython_store_result_called(self, mock_resolve):
         """Test that store_result is called with correct parameters."""
         # Create test email
@@ -195,3 +197,58 @@ class TestEmailValidatorDNSPython(TransactionCase):
         self.assertEqual(result.validator_id, self.dnspython_validator)
         self.assertEqual(result.email_id, email)
         self.assertTrue(result.is_valid)
+
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
+    def test_dnspython_domain_cache(self, mock_resolve):
+        """Test that a domain is resolved once for a batch of emails."""
+        emails = self.EmailValidation.create([
+            {'name': f'cache{i}@cached.example.com'} for i in range(5)
+        ])
+        mock_resolve.return_value = [MagicMock()]
+
+        results = self.dnspython_validator.validate_emails(emails)
+        self.assertEqual(set(results.values()), {True})
+        mock_resolve.assert_called_once_with('cached.example.com', 'MX')
+
+        domain = self.env['kw.email.domain'].search(
+            [('name', '=', 'cached.example.com')])
+        self.assertEqual(domain.state, 'mx')
+
+        # Expired entries are resolved again
+        domain.expiry_date = '2000-01-01'
+        self.dnspython_validator.validate_email_dnspython(emails[0])
+        self.assertEqual(mock_resolve.call_count, 2)
+
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
+    def test_dnspython_negative_cache(self, mock_resolve):
+        """Test that a dead domain is not resolved again."""
+        mock_resolve.side_effect = dns.resolver.NXDOMAIN()
+        for i in range(2):
+            email = self.EmailValidation.create({
+                'name': f'dead{i}@dead.example.com',
+            })
+            self.assertFalse(
+                self.dnspython_validator.validate_email_dnspython(email))
+
+        mock_resolve.assert_called_once_with('dead.example.com', 'MX')
+        domain = self.env['kw.email.domain'].search(
+            [('name', '=', 'dead.example.com')])
+        self.assertEqual(domain.state, 'nxdomain')
+
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
+    def test_dnspython_null_mx(self, mock_resolve):
+        """Test that a domain publishing a null MX accepts no mail."""
+        email = self.EmailValidation.create({
+            'name': 'user@nomail.example.com',
+        })
+        mock_resolve.return_value = [MagicMock(preference=0, exchange='.')]
+
+        self.assertFalse(
+            self.dnspython_validator.validate_email_dnspython(email))
+        domain = self.env['kw.email.domain'].search(
+            [('name', '=', 'nomail.example.com')])
+        self.assertEqual(domain.state, 'null_mx')
+        self.assertFalse(domain.get_mx_hosts())
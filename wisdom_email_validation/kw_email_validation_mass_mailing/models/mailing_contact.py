@@ -1,6 +1,10 @@
 import logging
 
-from odoo import models
+from odoo import models, fields, tools
+from odoo.tools import SQL
+
+from odoo.addons.kw_email_validation.models.email_validation import \
+    PRIORITY_BULK, normalize_email_sql
 
 _logger = logging.getLogger(__name__)
 
@@ -10,3 +14,50 @@ class MailingContact(models.Model):
     _name = 'mailing.contact'
     _inherit = ['kw.email.validation.mixin', 'mailing.contact', ]
     _kw_email_validation_field = 'email'
+    _kw_email_validation_priority = PRIORITY_BULK
+
+    # Stored so that mailings filter the recipients in SQL, kept in sync by
+    # the dependency on kw_email_validation_id.state and, for the contacts
+    # not linked yet, by kw.email.validation itself
+    kw_email_validation_id = fields.Many2one(
+        index=True, )
+    kw_email_validation_state = fields.Selection(
+        store=True,
+        index=True, )
+
+    def _auto_init(self):
+        """Fill the state of existing contacts with one query instead of
+        computing it record by record on install."""
+        cr = self.env.cr
+        if not tools.column_exists(
+                cr, self._table, 'kw_email_validation_state'):
+            if not tools.column_exists(
+                    cr, self._table, 'kw_email_validation_id'):
+                # Linked by the post_init_hook, the foreign key is added
+                # by the ORM
+                tools.create_column(
+                    cr, self._table, 'kw_email_validation_id', 'int4')
+            tools.create_column(
+                cr, self._table, 'kw_email_validation_state', 'varchar')
+            cr.execute(SQL("""
+                UPDATE mailing_contact AS c
+                SET kw_email_validation_state = CASE
+                    WHEN v.id IS NOT NULL THEN v.state
+                    WHEN c.email IS NULL OR c.email NOT LIKE '%%@%%'
+                        THEN 'invalid'
+                    ELSE COALESCE((
+                        SELECT n.state FROM kw_email_validation AS n
+                        WHERE n.name = %s), 'pending')
+                    END
+                FROM mailing_contact AS s
+                LEFT JOIN kw_email_validation AS v
+                    ON v.id = s.kw_email_validation_id
+                WHERE s.id = c.id""",
+                normalize_email_sql(SQL.identifier('c', 'email'))))
+            _logger.info('Stored the validation state of %s mailing '
+                         'contacts', cr.rowcount)
+        return super()._auto_init()
+
+    def _kw_email_validation_get_send_domain(self):
+        """Domain of the contacts that may receive mailings."""
+        return [('kw_email_validation_state', '!=', 'invalid')]
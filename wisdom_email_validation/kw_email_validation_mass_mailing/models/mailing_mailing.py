@@ -0,0 +1,20 @@
+import logging
+
+from odoo import models
+from odoo.osv import expression
+
+_logger = logging.getLogger(__name__)
+
+
+class MailingMailing(models.Model):
+    _inherit = 'mailing.mailing'
+
+    def _get_recipients_domain(self):
+        """Exclude the recipients with an invalid email in the recipients
+        query, models with a stored validation state provide the domain."""
+        domain = super()._get_recipients_domain()
+        model = self.env[self.mailing_model_real]
+        if hasattr(model, '_kw_email_validation_get_send_domain'):
+            domain = expression.AND([
+                domain, model._kw_email_validation_get_send_domain()])
+        return domain
@@ -0,0 +1,131 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestMailingContact(TransactionCase):
+    """Test the stored validation state of mailing contacts."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Contact = cls.env['mailing.contact']
+        cls.EmailValidation = cls.env['kw.email.validation']
+        cls.mailing_list = cls.env['mailing.list'].create({
+            'name': 'Validation List',
+        })
+
+    def _create_contacts(self, emails):
+        return self.Contact.create([{
+            'name': email,
+            'email': email,
+            'list_ids': [(4, self.mailing_list.id)],
+        } for email in emails])
+
+    def _unlink_contacts(self, contacts):
+        """Unlink the contacts in SQL, as an import bypassing the ORM."""
+        contacts.flush_recordset()
+        self.env.cr.execute("""
+            UPDATE mailing_contact
+            SET kw_email_validation_id = NULL,
+                kw_email_validation_state = 'pending'
+            WHERE id = ANY(%s)""", [contacts.ids])
+        contacts.invalidate_recordset()
+
+    def _read_states(self, contacts):
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT id, kw_email_validation_state FROM mailing_contact
+            WHERE id = ANY(%s)""", [contacts.ids])
+        states = dict(self.env.cr.fetchall())
+        return [states[contact.id] for contact in contacts]
+
+    def test_state_stored(self):
+        """Test that the state is stored and follows the validation."""
+        contact = self._create_contacts(['stored@example.com'])
+        self.assertEqual(self._read_states(contact), ['pending'])
+
+        contact.kw_email_validation_id.write({'state': 'invalid'})
+        self.assertEqual(self._read_states(contact), ['invalid'])
+        self.assertEqual(self.Contact.search([
+            ('kw_email_validation_state', '=', 'invalid'),
+            ('id', '=', contact.id),
+        ]), contact)
+
+    def test_state_unlinked(self):
+        """Test that the state of contacts not linked yet follows the
+        validation of their email once it is created or validated."""
+        contacts = self._create_contacts([
+            'late@example.com', 'rejected@example.com'])
+        validations = contacts.kw_email_validation_id
+        self._unlink_contacts(contacts)
+        validations.unlink()
+
+        late = self.EmailValidation.create({
+            'name': ' Late@Example.com',
+            'state': 'valid',
+        })
+        self.assertEqual(self._read_states(contacts), ['valid', 'pending'])
+        late.write({'state': 'invalid'})
+        self.assertEqual(self._read_states(contacts), ['invalid', 'pending'])
+
+        rejected = self.EmailValidation.create({
+            'name': 'rejected@example.com',
+        })
+        validator = self.env['kw.email.validator'].create({
+            'name': 'test_validator',
+        })
+        rejected._reject(validator, {rejected.id: 'Rejected'})
+        self.assertEqual(self._read_states(contacts), ['invalid', 'invalid'])
+        self.assertFalse(contacts.kw_email_validation_id)
+
+    def test_auto_init(self):
+        """Test that the column is filled in SQL on install, from the
+        linked validation, the one of the email, or the email itself."""
+        contacts = self._create_contacts([
+            'linked@example.com', '\tUnlinked@Example.com\n',
+            'unknown@example.com', 'malformed'])
+        contacts[0].kw_email_validation_id.write({'state': 'valid'})
+        contacts[1].kw_email_validation_id.write({'state': 'invalid'})
+        self._unlink_contacts(contacts[1:])
+        self.EmailValidation.search(
+            [('name', '=', 'unknown@example.com')]).unlink()
+        self.env.flush_all()
+
+        self.env.cr.execute("""
+            ALTER TABLE mailing_contact
+            DROP COLUMN kw_email_validation_state""")
+        self.Contact._auto_init()
+
+        self.assertEqual(self._read_states(contacts), [
+            'valid', 'invalid', 'pending', 'invalid'])
+
+    def test_recipients_domain(self):
+        """Test that mailings skip the contacts with an invalid email."""
+        contacts = self._create_contacts([
+            'valid@example.com', 'invalid@example.com',
+            'pending@example.com'])
+        contacts[0].kw_email_validation_id.write({'state': 'valid'})
+        contacts[1].kw_email_validation_id.write({'state': 'invalid'})
+
+        mailing = self.env['mailing.mailing'].create({
+            'subject': 'Validation',
+            'body_html': '<p>Validation</p>',
+            'mailing_model_id': self.env['ir.model']._get_id(
+                'mailing.contact'),
+            'contact_list_ids': [(6, 0, self.mailing_list.ids)],
+        })
+        self.assertIn(('kw_email_validation_state', '!=', 'invalid'),
+                      mailing._get_recipients_domain())
+        self.assertEqual(
+            sorted(mailing._get_recipients()),
+            sorted((contacts[0] | contacts[2]).ids))
+
+    def test_recipients_domain_not_bridged(self):
+        """Test that the domain of models without a stored state is kept."""
+        mailing = self.env['mailing.mailing'].create({
+            'subject': 'Validation',
+            'body_html': '<p>Validation</p>',
+            'mailing_model_id': self.env['ir.model']._get_id(
+                'res.partner'),
+        })
+        self.assertNotIn('kw_email_validation_state',
+                         str(mailing._get_recipients_domain()))
@@ -15,6 +15,7 @@
     'depends': [
         'crm',
         'kw_email_validation',
+        'kw_email_validation_dnspython',
     ],
 
     'external_dependencies': {
@@ -23,6 +24,7 @@
 
     'data': [
         'data/email_validator.xml',
+        'views/email_validator_views.xml',
     ],
     'demo': [
     ],
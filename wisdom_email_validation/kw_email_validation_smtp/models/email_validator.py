@@ -1,53 +1,279 @@
 import logging
 import smtplib
-# pylint: disable=missing-manifest-dependency
-import dns.resolver
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-from odoo import models
+from odoo import models, fields, api
+from odoo.tools import split_every
+
+from odoo.addons.kw_email_validation.models.email_validator import \
+    ValidatorBackend, independent_cursor, is_testing
 
 _logger = logging.getLogger(__name__)
 
 
-class EmailValidator(models.Model):
-    _inherit = 'kw.email.validator'
+def _smtp_connect(hosts, timeout):
+    """Open a session with the first reachable MX host.
 
-    def validate_email_smtp(self, email, **kwargs):
-        is_valid = False
-        domain = email.name.split('@')[-1]
-        smtp = smtplib.SMTP(timeout=30)
-        smtp.set_debuglevel(0)
+    Returns:
+        tuple: ``(smtp, host)``, smtp is None if no host could be reached
+    """
+    smtp = smtplib.SMTP(timeout=timeout)
+    smtp.set_debuglevel(0)
+    for host in hosts:
         try:
-            hosts = [x.preference for x in dns.resolver.resolve(domain, 'MX')]
+            smtp.connect(host)
+            smtp.helo(smtp.local_hostname)
         except Exception as e:
-            _logger.debug(e)
-            self.store_result(email, is_valid)
-            return is_valid
-
-        for host in hosts:
-            try:
-                host = host[0][:-1]
-                host = b'.'.join(host).decode('utf-8')
-                smtp.connect(host)
-                smtp.helo(smtp.local_hostname)
-            except Exception as e:
-                _logger.debug(e)
-                host = False
-                continue
-            else:
-                break
+            _logger.debug('SMTP connection to %s failed: %s', host, e)
+            continue
+        return smtp, host
+    return None, None
+
+
+def _smtp_verdict(code):
+    """Validity of an address from the answer to RCPT TO, None if the
+    answer does not tell."""
+    if 200 <= code < 300:
+        # 251 and 252 accept the message without verifying the mailbox
+        return True
+    if 500 <= code < 600:
+        return False
+    return None
 
-        if not host:
-            self.store_result(email, is_valid)
-            return is_valid
 
+def _smtp_probe(hosts, recipients, settings, start=0.0):
+    """Check recipients sharing the same MX hosts in a single session,
+    runs outside of the ORM.
+
+    Args:
+        hosts: available MX hosts ordered by preference
+        recipients: list of ``(email_id, address)``
+        settings: dict of SMTP settings of the validator
+        start: monotonic time of the first RCPT slot reserved on the host
+
+    Returns:
+        tuple: ``(results, backoff)``, results is ``{email_id: is_valid}``
+               where is_valid is None if the address could not be checked
+               and must be retried later, backoff is ``{host: seconds}``
+    """
+    results = dict.fromkeys(email_id for email_id, _address in recipients)
+    greylist_delay = settings['greylist_delay'] * 60
+    smtp, host = _smtp_connect(hosts, settings['timeout'])
+    if smtp is None:
+        # Timeout, refused connection or blocked port: retry later
+        return results, dict.fromkeys(hosts, greylist_delay)
+
+    interval = settings['rcpt_interval']
+    slot = start
+    try:
+        for batch in split_every(settings['rcpt_batch'], recipients):
+            code, _message = smtp.mail(settings['mail_from'])
+            if code != 250:
+                # Greylisted or refusing the sender, try again later
+                _logger.info('SMTP host %s refused MAIL FROM: %s',
+                             host, code)
+                return results, {host: greylist_delay}
+            for email_id, address in batch:
+                wait = slot - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                slot = max(slot, time.monotonic()) + interval
+                try:
+                    code, _message = smtp.rcpt(address)
+                except Exception as e:
+                    # e.g. disconnected after too many recipients
+                    _logger.debug('RCPT %s on %s failed: %s',
+                                  address, host, e)
+                    return results, {}
+                if 400 <= code < 500:
+                    # Greylisted or rate limited, retry later
+                    return results, {host: greylist_delay}
+                results[email_id] = _smtp_verdict(code)
+            smtp.rset()
+    except Exception as e:
+        _logger.debug('SMTP session with %s failed: %s', host, e)
+    finally:
         try:
-            smtp.mail('test@test.test')
-            res = smtp.rcpt(email.name)
             smtp.quit()
         except Exception as e:
             _logger.debug(e)
+    return results, {}
+
+
+class EmailValidator(models.Model):
+    _inherit = 'kw.email.validator'
+
+    smtp_mail_from = fields.Char(
+        string='SMTP Sender',
+        default='test@test.test',
+        help='Address used in MAIL FROM when probing mailboxes', )
+    smtp_timeout = fields.Integer(
+        string='SMTP Timeout',
+        default=30,
+        help='Timeout in seconds of SMTP connections and commands', )
+    smtp_rcpt_batch = fields.Integer(
+        string='Recipients per Transaction',
+        default=50,
+        help='Number of RCPT TO commands sent per MAIL FROM', )
+    smtp_host_rate = fields.Integer(
+        string='Host Rate Limit',
+        default=60,
+        help='Maximum number of RCPT TO commands per minute sent to one '
+             'MX host. Use 0 for no limit.', )
+    smtp_greylist_delay = fields.Integer(
+        string='Greylisting Back-off',
+        default=15,
+        help='Minutes during which an MX host that cannot be reached, '
+             'answers with a temporary error or refuses the sender is not '
+             'probed', )
+
+    def init(self):
+        super().init()
+        # Pacing and back-off of the MX hosts shared by all workers,
+        # unlogged as losing them on a crash is harmless
+        self.env.cr.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS kw_email_smtp_host (
+                host VARCHAR PRIMARY KEY,
+                next_rcpt TIMESTAMP,
+                backoff_until TIMESTAMP
+            )""")
+
+    @api.model
+    def _get_backends(self):
+        return dict(super()._get_backends(), smtp=ValidatorBackend(
+            validate_many='validate_emails_smtp',
+            validate_one='validate_email_smtp'))
+
+    def validate_email_smtp(self, email, **kwargs):
+        return self.validate_emails_smtp(email, **kwargs)[email.id]
+
+    def validate_emails_smtp(self, emails, **kwargs):
+        """Probe mailboxes grouped by MX hosts, one session per group.
+
+        Addresses on greylisting or rate limiting hosts are returned as
+        None so that they stay pending.
+        """
+        domains = self.env['kw.email.domain'].resolve_domains(
+            {email.name.split('@')[-1] for email in emails})
+
+        results = {}
+        groups = defaultdict(list)
+        for email in emails:
+            domain = domains.get(email.name.split('@')[-1])
+            if not domain:
+                # Temporary DNS error, checked again later
+                results[email.id] = None
+            elif domain.get_mx_hosts():
+                groups[tuple(domain.get_mx_hosts())].append(
+                    (email.id, email.name))
+            else:
+                results[email.id] = False
+
+        settings = {
+            'mail_from': self.smtp_mail_from or 'test@test.test',
+            'timeout': self.smtp_timeout or 30,
+            'rcpt_batch': max(self.smtp_rcpt_batch, 1),
+            'rcpt_interval': (60.0 / self.smtp_host_rate
+                              if self.smtp_host_rate > 0 else 0),
+            'greylist_delay': self.smtp_greylist_delay,
+        }
+        backing_off = self._smtp_get_backoff(
+            {host for hosts in groups for host in hosts})
+        probes = []
+        for hosts, recipients in groups.items():
+            available = [h for h in hosts if h not in backing_off]
+            if not available:
+                results.update(dict.fromkeys(
+                    email_id for email_id, _address in recipients))
+                continue
+            delay = self._smtp_reserve_rcpt(
+                available[0], len(recipients), settings['rcpt_interval'])
+            probes.append((available, recipients, settings,
+                           time.monotonic() + delay))
+
+        workers = min(self.max_concurrency, len(probes))
+        if workers <= 1 or is_testing():
+            outcomes = [_smtp_probe(*probe) for probe in probes]
         else:
-            is_valid = res[0] == 250
+            with ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix=f'kw_email_validator_{self.id}',
+            ) as executor:
+                outcomes = list(executor.map(
+                    lambda probe: _smtp_probe(*probe), probes))
+        backoff = {}
+        for probe_results, probe_backoff in outcomes:
+            results.update(probe_results)
+            backoff.update(probe_backoff)
+        self._smtp_set_backoff(backoff)
+
+        for email in emails:
+            if results[email.id] is not None:
+                self.store_result(email, results[email.id])
+        return results
+
+    @api.model
+    def _smtp_get_backoff(self, hosts):
+        """Return the hosts that must not be probed now."""
+        if not hosts:
+            return set()
+        with independent_cursor(self.env) as cr:
+            cr.execute("""
+                SELECT host FROM kw_email_smtp_host
+                WHERE host = ANY(%s)
+                    AND backoff_until > CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'
+                """, [list(hosts)])
+            return {row[0] for row in cr.fetchall()}
+
+    @api.model
+    def _smtp_set_backoff(self, backoff):
+        """Stop probing hosts for a while.
+
+        Args:
+            backoff: dict mapping a host to the back-off in seconds
+        """
+        if not backoff:
+            return
+        with independent_cursor(self.env) as cr:
+            cr.execute("""
+                INSERT INTO kw_email_smtp_host AS h (host, backoff_until)
+                SELECT b.host, CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'
+                    + MAKE_INTERVAL(secs => b.secs)
+                FROM UNNEST(%s::varchar[], %s::float8[]) AS b(host, secs)
+                ON CONFLICT (host) DO UPDATE SET
+                    backoff_until = EXCLUDED.backoff_until""",
+                [list(backoff), list(backoff.values())])
+
+    @api.model
+    def _smtp_reserve_rcpt(self, host, count, interval):
+        """Reserve count RCPT commands spaced by interval seconds on host,
+        the schedule of the host is shared by all workers.
+
+        Returns:
+            float: seconds to wait before the first command
+        """
+        if interval <= 0:
+            return 0
+        with independent_cursor(self.env) as cr:
+            cr.execute("""
+                INSERT INTO kw_email_smtp_host AS h (host, next_rcpt)
+                VALUES (%(host)s, CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'
+                        + MAKE_INTERVAL(secs => %(span)s))
+                ON CONFLICT (host) DO UPDATE SET
+                    next_rcpt = GREATEST(
+                        h.next_rcpt, CLOCK_TIMESTAMP() AT TIME ZONE 'UTC')
+                        + MAKE_INTERVAL(secs => %(span)s)
+                RETURNING EXTRACT(EPOCH FROM next_rcpt
+                                  - CLOCK_TIMESTAMP() AT TIME ZONE 'UTC')
+                """, {'host': host, 'span': count * interval})
+            return max(float(cr.fetchone()[0]) - count * interval, 0)
 
-        self.store_result(email, is_valid)
-        return is_valid
+    @api.autovacuum
+    def _gc_smtp_hosts(self):
+        """Drop the hosts that are neither paced nor backing off."""
+        self.env.cr.execute("""
+            DELETE FROM kw_email_smtp_host
+            WHERE COALESCE(GREATEST(next_rcpt, backoff_until), '-infinity')
+                < CLOCK_TIMESTAMP() AT TIME ZONE 'UTC'""")
@@ -0,0 +1,335 @@
+"""Throughput of the email validation pipeline against local stub HTTP,
+DNS and SMTP servers.
+
+Unlike the tests, the data is committed and validation runs the code paths
+of the workers: the validation cron fans out to threads with their own
+cursors and shared state goes through independent cursors. Run it in an
+Odoo shell on a throwaway database, it commits its data and replaces the
+validation rules::
+
+    KW_EMAIL_VALIDATION_BENCH_SIZES=1000,10000,100000 \\
+    KW_EMAIL_VALIDATION_BENCH_OUTPUT=/tmp/bench.json \\
+    odoo-bin shell -d bench --no-http \\
+        < kw_email_validation_smtp/scripts/benchmark.py
+"""
+import json
+import logging
+import math
+import os
+import smtplib
+import socketserver
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+# pylint: disable=missing-manifest-dependency
+import dns.message
+import dns.rcode
+import dns.resolver
+import dns.rrset
+
+from odoo.addons.kw_email_validation import post_init_hook
+
+_logger = logging.getLogger(__name__)
+
+# Number of addresses of each run, e.g. KW_EMAIL_VALIDATION_BENCH_SIZES=1000
+BENCH_SIZES = [
+    int(size) for size in os.environ.get(
+        'KW_EMAIL_VALIDATION_BENCH_SIZES', '1000,10000,100000').split(',')]
+# JSON file the report is written to, if set
+BENCH_OUTPUT = os.environ.get('KW_EMAIL_VALIDATION_BENCH_OUTPUT')
+BENCH_DOMAINS = 200
+CRON_BATCH = 500
+CREATE_BATCH = 1000
+BACKFILL_CHUNK = 5000
+
+
+class StubMailboxHandler(BaseHTTPRequestHandler):
+    """NeverBounce single check API, addresses starting with 'bad' are
+    invalid."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        email = parse_qs(urlparse(self.path).query)['email'][0]
+        body = json.dumps({
+            'status': 'success',
+            'result': 'invalid' if email.startswith('bad') else 'valid',
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubDNSHandler(socketserver.BaseRequestHandler):
+    """MX answers pointing to the local SMTP stub, domains starting with
+    'nx' do not exist and domains starting with 'nomx' have no MX."""
+
+    def handle(self):
+        data, sock = self.request
+        query = dns.message.from_wire(data)
+        response = dns.message.make_response(query)
+        qname = query.question[0].name
+        label = qname.labels[0].decode()
+        if label.startswith('nx'):
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif not label.startswith('nomx'):
+            response.answer.append(dns.rrset.from_text(
+                qname, 3600, 'IN', 'MX', '10 127.0.0.1.'))
+        sock.sendto(response.to_wire(), self.client_address)
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Accept every recipient except those starting with 'bad'."""
+
+    def handle(self):
+        self.wfile.write(b'220 stub ESMTP\r\n')
+        for line in self.rfile:
+            command = line[:4].upper()
+            if command in (b'HELO', b'EHLO', b'MAIL', b'RSET', b'NOOP'):
+                self.wfile.write(b'250 OK\r\n')
+            elif command == b'RCPT':
+                self.wfile.write(b'550 No such user\r\n'
+                                 if b'<bad' in line.lower()
+                                 else b'250 OK\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'502 Not implemented\r\n')
+
+
+class ThreadingUDPServer(socketserver.ThreadingMixIn,
+                         socketserver.UDPServer):
+    daemon_threads = True
+
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn,
+                         socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1,
+                      int(math.ceil(percent / 100.0 * len(values))) - 1)]
+
+
+def _start_server(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+class Benchmark:
+    """Scenarios of the benchmark, each one commits its data.
+
+    Latencies are reported in milliseconds with their unit: one call of
+    ``get_validation_state``, the time to verdict of each email queued for
+    the validation cron (cron time only), or one batch of ``create`` or one
+    backfill chunk. Queries are the ones of the main cursor, worker threads
+    use their own cursors.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.EmailValidation = env['kw.email.validation']
+        self.report = []
+        self.run_id = uuid.uuid4().hex[:8]
+
+    def setup(self):
+        http_port = _start_server(
+            ThreadingHTTPServer(('127.0.0.1', 0), StubMailboxHandler))
+        dns_port = _start_server(
+            ThreadingUDPServer(('127.0.0.1', 0), StubDNSHandler))
+        smtp_port = _start_server(
+            ThreadingTCPServer(('127.0.0.1', 0), StubSMTPHandler))
+
+        resolver = dns.resolver.Resolver(configure=False)
+        resolver.nameservers = ['127.0.0.1']
+        resolver.port = dns_port
+        for patcher in (
+                patch.object(dns.resolver, 'default_resolver', resolver),
+                patch.object(smtplib.SMTP, 'default_port', smtp_port)):
+            patcher.start()
+
+        validators = self.env['kw.email.validator'].search([
+            ('name', 'in', ['dnspython', 'smtp', 'neverbounce'])])
+        validators.write({
+            'rate_limit': 0,
+            'breaker_threshold': 0,
+            'use_bulk_api': False,
+        })
+        by_name = {validator.name: validator for validator in validators}
+        by_name['smtp'].smtp_host_rate = 0
+        by_name['neverbounce'].write({
+            'url': f'http://127.0.0.1:{http_port}/v4/single/check',
+            'api_key': 'bench',
+        })
+        Rule = self.env['kw.email.validation.rule']
+        Rule.search([]).write({'active': False})
+        Rule.create([{
+            'name': f'Benchmark {name}',
+            'sequence': sequence,
+            'validator_id': by_name[name].id,
+        } for sequence, name in enumerate(
+            ['dnspython', 'smtp', 'neverbounce'])])
+        self.env.cr.commit()
+
+    def _record(self, scenario, emails, seconds, queries, latencies, unit):
+        """Add a row to the report, latencies are in seconds."""
+        self.report.append({
+            'scenario': scenario,
+            'emails': emails,
+            'seconds': seconds,
+            'emails_per_second': emails / seconds if seconds else 0.0,
+            'queries': queries,
+            'queries_per_email': queries / emails if emails else 0.0,
+            'latency_unit': unit,
+            'p50_ms': _percentile(latencies, 50) * 1000
+            if latencies else None,
+            'p95_ms': _percentile(latencies, 95) * 1000
+            if latencies else None,
+        })
+
+    def _measure(self, scenario, emails, steps, unit):
+        """Run and commit the callables of steps, timing each of them."""
+        queries = self.env.cr.sql_log_count
+        latencies = []
+        elapsed = 0.0
+        for step in steps:
+            started = time.perf_counter()
+            step()
+            self.env.cr.commit()
+            latencies.append(time.perf_counter() - started)
+            elapsed += latencies[-1]
+        self._record(scenario, emails, elapsed,
+                     self.env.cr.sql_log_count - queries, latencies, unit)
+
+    def _measure_cron(self, size, emails):
+        """Run the validation cron until the emails are validated, the
+        latency of an email is the cron time until its verdict."""
+        self.env.cr.execute("""
+            SELECT id FROM kw_email_validation
+            WHERE name = ANY(%s) AND state = 'pending'""", [emails])
+        pending = [row[0] for row in self.env.cr.fetchall()]
+        queries = self.env.cr.sql_log_count
+        latencies = []
+        elapsed = 0.0
+        for _i in range(math.ceil(len(pending) / CRON_BATCH) + 1):
+            if not pending:
+                break
+            started = time.perf_counter()
+            self.EmailValidation.cron_validate_email(limit=CRON_BATCH)
+            self.env.cr.commit()
+            elapsed += time.perf_counter() - started
+            self.env.cr.execute("""
+                SELECT id FROM kw_email_validation
+                WHERE id = ANY(%s) AND state = 'pending'""", [pending])
+            still_pending = [row[0] for row in self.env.cr.fetchall()]
+            latencies += [elapsed] * (len(pending) - len(still_pending))
+            pending = still_pending
+        _logger.info('%s emails left pending after %s addresses',
+                     len(pending), size)
+        self._record('cron_validate_email', size, elapsed,
+                     self.env.cr.sql_log_count - queries, latencies,
+                     'email, time to verdict')
+
+    def _make_emails(self, size, prefix):
+        """Return addresses spread over the stub domains, with invalid
+        mailboxes, missing domains and bad syntax mixed in."""
+        emails = []
+        for i in range(size):
+            local = f'{prefix}{self.run_id}-{i}'
+            if i % 20 == 0:
+                local = f'bad{local}'
+            domain = f'd{i % BENCH_DOMAINS}.bench.test'
+            if i % 50 == 1:
+                domain = f'nx{domain}'
+            elif i % 50 == 2:
+                domain = f'nomx{domain}'
+            emails.append(f'{local}@{domain}' if i % 100 != 3
+                          else f'{local}@@{domain}')
+        return emails
+
+    def _bridged_model(self):
+        bridged = self.env['kw.email.validation.backfill'] \
+            ._get_bridged_models()
+        for model_name in ('res.partner', 'crm.lead'):
+            if model_name in bridged:
+                return self.env[model_name], bridged[model_name]
+        return None, None
+
+    def run_pipeline(self, size):
+        emails = self._make_emails(size, f'state{size}-')
+        self._measure(
+            'get_validation_state', size,
+            [lambda email=email: self.EmailValidation.get_validation_state(
+                email) for email in emails], 'call')
+        self._measure_cron(size, [
+            self.EmailValidation._normalize_email(email)
+            for email in emails])
+
+        model, field = self._bridged_model()
+        if model is None:
+            _logger.info('No bridged model installed, create and '
+                         'post_init_hook are not measured')
+            return
+        emails = self._make_emails(size, f'create{size}-')
+        self._measure(
+            f'{model._name} create', size,
+            [lambda batch=emails[i:i + CREATE_BATCH]: model.create([
+                {'name': email, field: email} for email in batch])
+             for i in range(0, size, CREATE_BATCH)],
+            f'batch of {CREATE_BATCH}')
+
+        records = model.search(
+            [(field, 'like', f'create{size}-{self.run_id}-%')])
+        records.write({'kw_email_validation_id': False})
+        post_init_hook(self.env, model._name, field)
+        self.env.cr.commit()
+        backfill = self.env['kw.email.validation.backfill'].search(
+            [('name', '=', model._name)])
+        total = model.search_count([])
+        self._measure(
+            'post_init_hook', total,
+            [lambda: backfill._run_chunk(BACKFILL_CHUNK)
+             for _i in range(math.ceil(total / BACKFILL_CHUNK) + 1)],
+            f'chunk of {BACKFILL_CHUNK}')
+
+    def write_report(self):
+        lines = ['%-22s %8s %10s %10s %8s %9s %9s  %s' % (
+            'scenario', 'emails', 'emails/s', 'queries', 'q/email',
+            'p50 (ms)', 'p95 (ms)', 'latency per')]
+        for row in self.report:
+            lines.append('%-22s %8d %10.1f %10d %8.2f %9s %9s  %s' % (
+                row['scenario'], row['emails'], row['emails_per_second'],
+                row['queries'], row['queries_per_email'],
+                '%.2f' % row['p50_ms'] if row['p50_ms'] is not None else '-',
+                '%.2f' % row['p95_ms'] if row['p95_ms'] is not None else '-',
+                row['latency_unit']))
+        _logger.info('Email validation benchmark:\n%s', '\n'.join(lines))
+        if BENCH_OUTPUT:
+            with open(BENCH_OUTPUT, 'w', encoding='utf-8') as f:
+                json.dump(self.report, f, indent=2)
+
+
+def main(env):
+    benchmark = Benchmark(env)
+    benchmark.setup()
+    for size in BENCH_SIZES:
+        benchmark.run_pipeline(size)
+    benchmark.write_report()
+
+
+if __name__ == '__main__':
+    # Run by odoo-bin shell, which provides env
+    main(globals()['env'])
@@ -1,5 +1,8 @@
 from unittest.mock import patch, MagicMock
 
+# pylint: disable=missing-manifest-dependency
+import dns.name
+
 from odoo.tests.common import TransactionCase
 
 
@@ -21,11 +24,12 @@ class TestEmailValidatorSMTP(TransactionCase):
             cls.smtp_validator = cls.EmailValidator.create({
                 'name': 'smtp',
             })
+        cls.smtp_validator.smtp_host_rate = 0
 
     @patch('odoo.addons.kw_email_validation_smtp.models.'
            'email_validator.smtplib.SMTP')
-    @patch('odoo.addons.kw_email_validation_smtp.models.'
-           'email_validator.dns.resolver.resolve')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_smtp_success(self, mock_resolve, mock_smtp_class):
         """Test SMTP validation with successful connection and response."""
         # Create test email
@@ -35,12 +39,14 @@ class TestEmailValidatorSMTP(TransactionCase):
 
         # Mock DNS MX record resolution
         mock_mx_record = MagicMock()
-        mock_mx_record.preference = [[b'mail', b'example', b'com', b'']]
+        mock_mx_record.preference = 10
+        mock_mx_record.exchange = dns.name.from_text('mail.example.com.')
         mock_resolve.return_value = [mock_mx_record]
 
         # Mock SMTP connection
         mock_smtp = MagicMock()
         mock_smtp_class.return_value = mock_smtp
+        mock_smtp.mail.return_value = (250, b'OK')
         mock_smtp.rcpt.return_value = (250, 'OK')
 
         # Test validation
@@ -67,8 +73,8 @@ class TestEmailValidatorSMTP(TransactionCase):
 
     @patch('odoo.addons.kw_email_validation_smtp.models.'
            'email_validator.smtplib.SMTP')
-    @patch('odoo.addons.kw_email_validation_smtp.models.'
-           'email_validator.dns.resolver.resolve')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_smtp_rejected(self, mock_resolve, mock_smtp_class):
         """Test SMTP validation when email is rejected."""
         # Create test email
@@ -78,12 +84,14 @@ class TestEmailValidatorSMTP(TransactionCase):
 
         # Mock DNS MX record resolution
         mock_mx_record = MagicMock()
-        mock_mx_record.preference = [[b'mail', b'example', b'com', b'']]
+        mock_mx_record.preference = 10
+        mock_mx_record.exchange = dns.name.from_text('mail.example.com.')
         mock_resolve.return_value = [mock_mx_record]
 
         # Mock SMTP connection with rejection
         mock_smtp = MagicMock()
         mock_smtp_class.return_value = mock_smtp
+        mock_smtp.mail.return_value = (250, b'OK')
         mock_smtp.rcpt.return_value = (550, 'User unknown')
 
         # Test validation
@@ -100,8 +108,8 @@ class TestEmailValidatorSMTP(TransactionCase):
 
     @patch('odoo.addons.kw_email_validation_smtp.models.'
            'email_validator.smtplib.SMTP')
-    @patch('odoo.addons.kw_email_validation_smtp.models.'
-           'email_validator.dns.resolver.resolve')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_smtp_no_mx_record(self, mock_resolve,
                                               mock_smtp_class):
         """Test SMTP validation when no MX records found."""
@@ -121,7 +129,7 @@ class TestEmailValidatorSMTP(TransactionCase):
         mock_resolve.assert_called_once_with('example.com', 'MX')
 
         # SMTP should not be called
-        mock_smtp_class.assert_called_once_with(timeout=30)
+        mock_smtp_class.assert_not_called()
 
         # Check that result was stored
         results = self.env['kw.email.validation.result'].search([
@@ -133,8 +141,8 @@ class TestEmailValidatorSMTP(TransactionCase):
 
     @patch('odoo.addons.kw_email_validation_smtp.models.'
            'email_validator.smtplib.SMTP')
-    @patch('odoo.addons.kw_email_validation_smtp.models.'
-           'email_validator.dns.resolver.resolve')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_smtp_connection_error(self, mock_resolve,
                                                   mock_smtp_class):
         """Test SMTP validation with connection error."""
@@ -145,7 +153,8 @@ class TestEmailValidatorSMTP(TransactionCase):
 
         # Mock DNS MX record resolution
         mock_mx_record = MagicMock()
-        mock_mx_record.preference = [[b'mail', b'example', b'com', b'']]
+        mock_mx_record.preference = 10
+        mock_mx_record.exchange = dns.name.from_text('mail.example.com.')
         mock_resolve.return_value = [mock_mx_record]
 
         # Mock SMTP connection error
@@ -155,20 +164,23 @@ class TestEmailValidatorSMTP(TransactionCase):
 
         # Test validation
         result = self.smtp_validator.validate_email_smtp(email)
-        self.assertFalse(result, "Should return False on connection error")
+        self.assertIsNone(result, "Should stay unchecked on connection "
+                                  "error")
 
-        # Check that result was stored
+        # Check that no result was stored and that the host backs off
         results = self.env['kw.email.validation.result'].search([
             ('validator_id', '=', self.smtp_validator.id),
             ('email_id', '=', email.id),
         ])
-        self.assertEqual(len(results), 1)
-        self.assertFalse(results[0].is_valid)
+        self.assertFalse(results)
+        self.assertEqual(
+            self.smtp_validator._smtp_get_backoff({'mail.example.com'}),
+            {'mail.example.com'})
 
     @patch('odoo.addons.kw_email_validation_smtp.models.'
            'email_validator.smtplib.SMTP')
-    @patch('odoo.addons.kw_email_validation_smtp.models.'
-           'email_validator.dns.resolver.resolve')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_smtp_multiple_mx_hosts(self, mock_resolve,
                                                    mock_smtp_class):
         """Test SMTP validation with multiple MX hosts."""
@@ -179,9 +191,11 @@ class TestEmailValidatorSMTP(TransactionCase):
 
         # Mock multiple MX records
         mock_mx1 = MagicMock()
-        mock_mx1.preference = [[b'mail1', b'example', b'com', b'']]
+        mock_mx1.preference = 10
+        mock_mx1.exchange = dns.name.from_text('mail1.example.com.')
         mock_mx2 = MagicMock()
-        mock_mx2.preference = [[b'mail2', b'example', b'com', b'']]
+        mock_mx2.preference = 20
+        mock_mx2.exchange = dns.name.from_text('mail2.example.com.')
         mock_resolve.return_value = [mock_mx1, mock_mx2]
 
         # Mock SMTP - first host fails, second succeeds
@@ -195,6 +209,7 @@ class TestEmailValidatorSMTP(TransactionCase):
             return True
 
         mock_smtp.connect.side_effect = connect_side_effect
+        mock_smtp.mail.return_value = (250, b'OK')
         mock_smtp.rcpt.return_value = (250, 'OK')
 
         # Test validation
@@ -206,8 +221,8 @@ class TestEmailValidatorSMTP(TransactionCase):
 
     @patch('odoo.addons.kw_email_validation_smtp.models.'
            'email_validator.smtplib.SMTP')
-    @patch('odoo.addons.kw_email_validation_smtp.models.'
-           'email_validator.dns.resolver.resolve')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
     def test_validate_email_smtp_rcpt_exception(self, mock_resolve,
                                                 mock_smtp_class):
         """Test SMTP validation when RCPT command raises exception."""
@@ -218,25 +233,26 @@ class TestEmailValidatorSMTP(TransactionCase):
 
         # Mock DNS MX record resolution
         mock_mx_record = MagicMock()
-        mock_mx_record.preference = [[b'mail', b'example', b'com', b'']]
+        mock_mx_record.preference = 10
+        mock_mx_record.exchange = dns.name.from_text('mail.example.com.')
         mock_resolve.return_value = [mock_mx_record]
 
         # Mock SMTP connection with RCPT exception
         mock_smtp = MagicMock()
         mock_smtp_class.return_value = mock_smtp
+        mock_smtp.mail.return_value = (250, b'OK')
         mock_smtp.rcpt.side_effect = Exception("RCPT failed")
 
         # Test validation
         result = self.smtp_validator.validate_email_smtp(email)
-        self.assertFalse(result, "Should return False when RCPT fails")
+        self.assertIsNone(result, "Should be retried when RCPT fails")
 
-        # Check that result was stored
+        # Check that no result was stored
         results = self.env['kw.email.validation.result'].search([
             ('validator_id', '=', self.smtp_validator.id),
             ('email_id', '=', email.id),
         ])
-        self.assertEqual(len(results), 1)
-        self.assertFalse(results[0].is_valid)
+        self.assertFalse(results)
 
     def test_smtp_validator_inheritance(self):
         """Test that SMTP validator inherits from base validator."""
@@ -256,8 +272,8 @@ class TestEmailValidatorSMTP(TransactionCase):
             'name': 'user@mail.example.com',
         })
 
-        with patch('odoo.addons.kw_email_validation_smtp.models.'
-                   'email_validator.dns.resolver.resolve') as mock_resolve:
+        with patch('odoo.addons.kw_email_validation_dnspython.models.'
+                   'email_domain.dns.resolver.resolve') as mock_resolve:
             mock_resolve.side_effect = Exception("Test exception")
 
             # Test validation
@@ -265,3 +281,152 @@ class TestEmailValidatorSMTP(TransactionCase):
 
             # Check that correct domain was extracted
             mock_resolve.assert_called_once_with('mail.example.com', 'MX')
+
+    def _mock_mx(self, mock_resolve, hosts):
+        """Resolve each domain to the MX host given in hosts."""
+        def resolve(domain, rdtype):
+            record = MagicMock()
+            record.preference = 10
+            record.exchange = dns.name.from_text(hosts[domain] + '.')
+            return [record]
+        mock_resolve.side_effect = resolve
+
+    @patch('odoo.addons.kw_email_validation_smtp.models.'
+           'email_validator.smtplib.SMTP')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
+    def test_smtp_session_per_mx_host(self, mock_resolve, mock_smtp_class):
+        """Test that domains sharing an MX host share one session."""
+        self._mock_mx(mock_resolve, {
+            'a.example.com': 'mx.shared.com',
+            'b.example.com': 'mx.shared.com',
+            'c.example.com': 'mx.other.com',
+        })
+        mock_smtp = MagicMock()
+        mock_smtp_class.return_value = mock_smtp
+        mock_smtp.mail.return_value = (250, b'OK')
+        mock_smtp.rcpt.side_effect = lambda address: (
+            (550, b'Unknown') if address.startswith('bad') else (250, b'OK'))
+        emails = self.EmailValidation.create([
+            {'name': 'user1@a.example.com'},
+            {'name': 'bad@a.example.com'},
+            {'name': 'user2@b.example.com'},
+            {'name': 'user3@c.example.com'},
+        ])
+
+        results = self.smtp_validator.validate_emails(emails)
+
+        self.assertEqual([results[email.id] for email in emails],
+                         [True, False, True, True])
+        self.assertEqual(mock_smtp_class.call_count, 2,
+                         "One session should be opened per MX host")
+        self.assertEqual(
+            [c.args[0] for c in mock_smtp.connect.call_args_list],
+            ['mx.shared.com', 'mx.other.com'])
+        self.assertEqual(mock_smtp.mail.call_count, 2)
+        self.assertEqual(mock_smtp.rcpt.call_count, 4)
+
+    @patch('odoo.addons.kw_email_validation_smtp.models.'
+           'email_validator.smtplib.SMTP')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
+    def test_smtp_rcpt_batch(self, mock_resolve, mock_smtp_class):
+        """Test that recipients are split into MAIL FROM transactions."""
+        self._mock_mx(mock_resolve, {'example.com': 'mail.example.com'})
+        self.smtp_validator.smtp_rcpt_batch = 2
+        mock_smtp = MagicMock()
+        mock_smtp_class.return_value = mock_smtp
+        mock_smtp.mail.return_value = (250, b'OK')
+        mock_smtp.rcpt.return_value = (250, b'OK')
+        emails = self.EmailValidation.create([
+            {'name': f'batch{i}@example.com'} for i in range(5)])
+
+        self.smtp_validator.validate_emails(emails)
+
+        self.assertEqual(mock_smtp.connect.call_count, 1)
+        self.assertEqual(mock_smtp.mail.call_count, 3)
+        self.assertEqual(mock_smtp.rset.call_count, 3)
+        self.assertEqual(mock_smtp.rcpt.call_count, 5)
+        mock_smtp.quit.assert_called_once()
+
+    @patch('odoo.addons.kw_email_validation_smtp.models.'
+           'email_validator.smtplib.SMTP')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
+    def test_smtp_greylisting(self, mock_resolve, mock_smtp_class):
+        """Test that greylisted addresses stay unchecked and the host
+        backs off."""
+        self._mock_mx(mock_resolve, {'example.com': 'mail.example.com'})
+        mock_smtp = MagicMock()
+        mock_smtp_class.return_value = mock_smtp
+        mock_smtp.mail.return_value = (250, b'OK')
+        mock_smtp.rcpt.side_effect = [
+            (250, b'OK'), (451, b'Greylisted, try again later')]
+        emails = self.EmailValidation.create([
+            {'name': f'grey{i}@example.com'} for i in range(3)])
+
+        results = self.smtp_validator.validate_emails(emails)
+
+        self.assertEqual([results[email.id] for email in emails],
+                         [True, None, None])
+        self.assertEqual(mock_smtp.rcpt.call_count, 2)
+        self.assertEqual(
+            self.smtp_validator._smtp_get_backoff({'mail.example.com'}),
+            {'mail.example.com'})
+        stored = self.env['kw.email.validation.result'].search([
+            ('validator_id', '=', self.smtp_validator.id),
+            ('email_id', 'in', emails.ids),
+        ])
+        self.assertEqual(stored.email_id, emails[0])
+
+        # The host is not contacted again during the back-off
+        mock_smtp.reset_mock()
+        results = self.smtp_validator.validate_emails(emails[1:])
+        self.assertEqual(set(results.values()), {None})
+        mock_smtp.connect.assert_not_called()
+
+    def test_smtp_host_throttle(self):
+        """Test that RCPT commands to one host are spaced by the rate,
+        across workers."""
+        reserve = self.smtp_validator._smtp_reserve_rcpt
+        self.assertEqual(reserve('mx.example.com', 2, 1.0), 0)
+        self.assertAlmostEqual(reserve('mx.example.com', 1, 1.0), 2, 0)
+        self.assertEqual(reserve('mx.other.com', 1, 1.0), 0)
+        self.assertEqual(reserve('mx.example.com', 1, 0), 0)
+
+    @patch('odoo.addons.kw_email_validation_smtp.models.'
+           'email_validator.smtplib.SMTP')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
+    def test_smtp_mail_from_refused(self, mock_resolve, mock_smtp_class):
+        """Test that a host refusing the sender backs off."""
+        self._mock_mx(mock_resolve, {'example.com': 'mail.example.com'})
+        mock_smtp = MagicMock()
+        mock_smtp_class.return_value = mock_smtp
+        mock_smtp.mail.return_value = (550, b'Sender rejected')
+        email = self.EmailValidation.create({'name': 'from@example.com'})
+
+        self.assertIsNone(self.smtp_validator.validate_email_smtp(email))
+        self.assertEqual(
+            self.smtp_validator._smtp_get_backoff({'mail.example.com'}),
+            {'mail.example.com'})
+
+    @patch('odoo.addons.kw_email_validation_smtp.models.'
+           'email_validator.smtplib.SMTP')
+    @patch('odoo.addons.kw_email_validation_dnspython.models.'
+           'email_domain.dns.resolver.resolve')
+    def test_smtp_accepted_unverified(self, mock_resolve, mock_smtp_class):
+        """Test that 251 and 252 answers accept the address."""
+        self._mock_mx(mock_resolve, {'example.com': 'mail.example.com'})
+        mock_smtp = MagicMock()
+        mock_smtp_class.return_value = mock_smtp
+        mock_smtp.mail.return_value = (250, b'OK')
+        mock_smtp.rcpt.side_effect = [
+            (251, b'User not local; will forward'),
+            (252, b'Cannot VRFY user, but will accept message')]
+        emails = self.EmailValidation.create([
+            {'name': 'forward@example.com'},
+            {'name': 'unverified@example.com'}])
+
+        results = self.smtp_validator.validate_emails(emails)
+        self.assertEqual(set(results.values()), {True})